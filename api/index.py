@@ -8,6 +8,8 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookmyseat.settings')
+# Defer admin imports until first /admin/ request to keep cold starts short
+os.environ.setdefault('DJANGO_APP_PROFILE', 'public')
 
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
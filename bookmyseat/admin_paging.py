@@ -0,0 +1,82 @@
+"""Admin changelists that stay cheap on tables with millions of rows.
+
+The stock changelist runs two exact COUNT(*)s per page (filtered and
+unfiltered) and pages with OFFSET, both of which scan more of the table the
+bigger it gets. LargeTableAdmin replaces them with:
+
+* a count that is estimated from the planner statistics (Postgres) for the
+  unfiltered list, and capped at ADMIN_COUNT_CAP rows otherwise;
+* no unfiltered total (show_full_result_count = False);
+* an "Older" link that continues from the last primary key on the page
+  (``?pk__lt=``), so walking back through history never uses a deep OFFSET.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def count_cap():
+    return getattr(settings, 'ADMIN_COUNT_CAP', 10000)
+
+
+def estimate_above():
+    """Unfiltered tables with more rows than this (per the planner) show an estimated count."""
+    return getattr(settings, 'ADMIN_COUNT_ESTIMATE_ABOVE', 100000)
+
+
+def estimated_rows(queryset):
+    """Planner row estimate for the queryset's table, or None where unavailable."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 until the table has been vacuumed or analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count is an estimate or a lower bound on large tables; see ``approximate``."""
+    approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset)
+            if estimate is not None and estimate > estimate_above():
+                self.approximate = True
+                return estimate
+        cap = count_cap()
+        count = queryset.order_by()[:cap].count()
+        self.approximate = count >= cap
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList that links to the next page by primary key while sorted newest first."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.keyset_next_url = None
+        # Only valid for the default -pk ordering; a column sort falls back to page numbers
+        if ORDER_VAR in self.params or self.model_admin.ordering != ['-pk']:
+            return
+        rows = list(self.result_list)  # evaluates the page once; the template reuses the cache
+        if len(rows) == self.list_per_page:
+            self.keyset_next_url = self.get_query_string({'pk__lt': rows[-1].pk}, [PAGE_VAR])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin for tables too big for exact counts and OFFSET paging."""
+    ordering = ['-pk']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/large_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,116 @@
+"""Helpers for serving the same project under WSGI and ASGI.
+
+Under ASGI, Django 3.2 runs every sync-only middleware (and everything
+below it) in one shared thread, so a single sync middleware serializes all
+requests. Project middleware therefore supports both modes; async views run
+their ORM work through db_task(), which uses the thread pool so independent
+queries overlap.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+def mark_async(middleware, get_response):
+    """Tell Django to await ``middleware`` when the handler below it is async.
+
+    Returns True in async mode. Same marker Django's MiddlewareMixin uses.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        middleware._is_coroutine = asyncio.coroutines._is_coroutine
+        return True
+    return False
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# db_task calls waiting for a pool thread / running on one, for readiness stats
+_task_counts = {'queued': 0, 'running': 0}
+_task_counts_lock = threading.Lock()
+
+
+def db_threads():
+    return getattr(settings, 'ASYNC_DB_THREADS', 16)
+
+
+def db_executor():
+    """Thread pool for db_task; its size caps concurrent queries (and connections) per process."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=db_threads(), thread_name_prefix='db-task')
+    return _executor
+
+
+def _count(**deltas):
+    with _task_counts_lock:
+        for name, delta in deltas.items():
+            _task_counts[name] += delta
+
+
+def db_pool_stats():
+    """{'threads_max', 'tasks_running', 'tasks_queued'} for this process's db_task pool."""
+    with _task_counts_lock:
+        return {
+            'threads_max': db_threads(),
+            'tasks_running': _task_counts['running'],
+            'tasks_queued': _task_counts['queued'],
+        }
+
+
+def db_task(func):
+    """Wrap a sync ORM function as a coroutine running on the db_executor() pool.
+
+    Unlike thread_sensitive sync_to_async, calls can run in parallel. Pool
+    threads are outside Django's request cycle, so connections are cleaned up
+    here (honouring CONN_MAX_AGE) instead of on request_finished.
+    """
+    @functools.wraps(func)
+    def run(started, *args, **kwargs):
+        started.set()
+        _count(queued=-1, running=1)
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            _count(running=-1)
+
+    @functools.wraps(func)
+    async def task(*args, **kwargs):
+        started = threading.Event()
+        _count(queued=1)
+        try:
+            return await sync_to_async(run, thread_sensitive=False, executor=db_executor())(started, *args, **kwargs)
+        finally:
+            if not started.is_set():  # cancelled or failed before a thread picked it up
+                _count(queued=-1)
+    return task
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware that can sit in an async middleware chain."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.is_async = mark_async(self, get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,45 @@
+"""Compress HTML, JSON and text responses.
+
+Brotli is used when the ``brotli`` package is installed and the client sends
+``Accept-Encoding: br``; otherwise Django's gzip middleware handles it.
+Static files are left to WhiteNoise, which serves pre-compressed copies.
+"""
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'text/plain')
+MIN_LENGTH = 200
+ACCEPTS_BR = re.compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware for text responses, preferring brotli when available."""
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if brotli is None or response.streaming or not ACCEPTS_BR.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+        if len(response.content) < MIN_LENGTH or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=getattr(settings, 'BROTLI_QUALITY', 5))
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        # Same as GZipMiddleware: the encoded body is no longer byte-identical
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,110 @@
+"""Read-replica routing for catalog models with read-your-writes stickiness.
+
+Catalog reads (Movie, Theater) go to the ``replica`` alias; everything else,
+and every write, goes to ``default``. After a request writes, the client is
+pinned to the primary for REPLICA_PIN_SECONDS via a cookie so it never reads
+stale data from a lagging replica.
+"""
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+
+from .async_support import mark_async
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+
+# Models whose reads may be served from the replica: (app_label, model_name)
+REPLICA_MODELS = {
+    ('movies', 'movie'),
+    ('movies', 'theater'),
+}
+
+_state = Local()
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def pin_to_primary():
+    """Force all reads in the current request/thread onto the primary."""
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def _reset():
+    _state.pinned = False
+    _state.wrote = False
+
+
+class CatalogReplicaRouter:
+    """Send catalog reads to the replica unless the caller is pinned."""
+
+    def db_for_read(self, model, **hints):
+        if REPLICA_ALIAS not in settings.DATABASES or is_pinned():
+            return 'default'
+        if (model._meta.app_label, model._meta.model_name) in REPLICA_MODELS:
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica is a copy of default, so cross-alias relations are the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+class PrimaryPinMiddleware:
+    """Pin requests to the primary for a short window after the client writes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = mark_async(self, get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        is_write_request = self._start(request)
+        try:
+            return self._finish(self.get_response(request), is_write_request)
+        finally:
+            _reset()
+
+    async def __acall__(self, request):
+        is_write_request = self._start(request)
+        try:
+            return self._finish(await self.get_response(request), is_write_request)
+        finally:
+            _reset()
+
+    def _start(self, request):
+        _reset()
+        pinned_until = request.COOKIES.get(PIN_COOKIE)
+        try:
+            if pinned_until and float(pinned_until) > time.time():
+                pin_to_primary()
+        except ValueError:
+            pass
+        is_write_request = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if is_write_request:
+            pin_to_primary()
+        return is_write_request
+
+    def _finish(self, response, is_write_request):
+        # Housekeeping writes on GETs (e.g. expiring holds) don't pin the client
+        if is_write_request and getattr(_state, 'wrote', False):
+            seconds = pin_seconds()
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax')
+        return response
@@ -1,6 +1,12 @@
-"""Health check endpoint for verifying database connectivity."""
+"""Health endpoints: legacy health check, liveness and readiness probes."""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.db import connection
+from django.utils import timezone
 
 def health_check(request):
     """Check if database is connected and responsive."""
@@ -28,3 +34,96 @@ def health_check(request):
             'error': str(e),
             'message': 'Database connection failed'
         }, status=500)
+
+
+def liveness(request):
+    """Process is up and serving requests. No I/O, safe to probe aggressively."""
+    return JsonResponse({'status': 'alive'})
+
+
+# Readiness: each check returns (value, threshold); value > threshold means not ready.
+# Only this instance's own dependencies gate readiness. Backlogs are shared by
+# the whole fleet (and expired holds only drain with user traffic), so failing
+# on them would take every instance out at once; they are reported alongside.
+# Results are cached per process for READINESS_CACHE_SECONDS so frequent probes
+# don't add load to the database.
+
+def _check_db_latency():
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return round((time.perf_counter() - start) * 1000, 2), settings.READINESS_MAX_DB_LATENCY_MS
+
+
+def _check_cache_latency():
+    start = time.perf_counter()
+    cache.set('readiness:probe', 1, 10)
+    cache.get('readiness:probe')
+    return round((time.perf_counter() - start) * 1000, 2), settings.READINESS_MAX_CACHE_LATENCY_MS
+
+
+def _check_expired_holds():
+    from movies.models import SeatReservation
+    backlog = SeatReservation.objects.filter(expires_at__lt=timezone.now()).count()
+    return backlog, settings.READINESS_MAX_EXPIRED_HOLDS
+
+
+def _check_email_outbox():
+    from movies.models import OutboundEmail
+    from movies.utils import OUTBOX_MAX_ATTEMPTS
+    backlog = OutboundEmail.objects.filter(sent_at__isnull=True, attempts__lt=OUTBOX_MAX_ATTEMPTS).count()
+    return backlog, settings.READINESS_MAX_EMAIL_BACKLOG
+
+
+def _pool_stats():
+    """This process's database connection and async db_task pool usage."""
+    from bookmyseat.async_support import db_pool_stats
+    stats = {
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE', 0),
+        'connection_open': connection.connection is not None,
+    }
+    stats.update({f'async_{name}': value for name, value in db_pool_stats().items()})
+    return stats
+
+
+READINESS_CHECKS = {
+    'db_latency_ms': _check_db_latency,
+    'cache_latency_ms': _check_cache_latency,
+}
+
+# Reported with the same shape, but never make the instance not-ready
+BACKLOG_CHECKS = {
+    'expired_holds': _check_expired_holds,
+    'email_outbox': _check_email_outbox,
+}
+
+_readiness_lock = threading.Lock()
+_readiness_result = {'at': 0.0, 'body': None}
+
+
+def _run_check(check):
+    try:
+        value, threshold = check()
+        return {'value': value, 'threshold': threshold, 'ok': value <= threshold}
+    except Exception as e:
+        return {'error': str(e), 'ok': False}
+
+
+def _run_readiness_checks():
+    checks = {name: _run_check(check) for name, check in READINESS_CHECKS.items()}
+    ready = all(result['ok'] for result in checks.values())
+    for name, check in BACKLOG_CHECKS.items():
+        checks[name] = dict(_run_check(check), informational=True)
+    return {'status': 'ready' if ready else 'not_ready', 'checks': checks, 'pool': _pool_stats()}
+
+
+def readiness(request):
+    """Dependency latency checks (503 once one exceeds its threshold), plus backlogs and pool stats."""
+    with _readiness_lock:
+        now = time.monotonic()
+        if _readiness_result['body'] is None or now - _readiness_result['at'] >= settings.READINESS_CACHE_SECONDS:
+            _readiness_result['body'] = _run_readiness_checks()
+            _readiness_result['at'] = now
+        body = _readiness_result['body']
+    return JsonResponse(body, status=200 if body['status'] == 'ready' else 503)
@@ -0,0 +1,34 @@
+"""Deferred admin loading for the "public" app profile.
+
+Under DJANGO_APP_PROFILE=public the admin app is installed with
+SimpleAdminConfig (no autodiscover at startup) and ROOT_URLCONF omits the
+admin site. The first /admin/ request registers the ModelAdmins and switches
+that request to the full URLconf.
+"""
+import threading
+
+from django.utils.deprecation import MiddlewareMixin
+
+FULL_URLCONF = 'bookmyseat.urls'
+
+_lock = threading.Lock()
+_loaded = False
+
+
+def ensure_admin_loaded():
+    """Run admin.autodiscover() once per process."""
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from django.contrib import admin
+            admin.autodiscover()
+            _loaded = True
+
+
+class LazyAdminMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        if request.path_info.startswith('/admin/'):
+            ensure_admin_loaded()
+            request.urlconf = FULL_URLCONF
@@ -0,0 +1,307 @@
+"""Prometheus-style metrics shared across gunicorn workers.
+
+Each process keeps counters and histograms in memory and periodically
+flushes a snapshot to METRICS_DIR/<pid>.json (atomic rename, no locking on
+the hot path). When a worker exits, or a new process finds a file left under
+its recycled PID, that snapshot is folded into METRICS_DIR/retired.json and
+deleted, so totals keep counting and the directory holds one file per live
+worker plus one. The /metrics endpoint sums every snapshot and renders the
+Prometheus text exposition format.
+"""
+import atexit
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; retiring then goes unlocked
+    fcntl = None
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+from .async_support import mark_async
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'holds_created_total': 'Seats placed on temporary hold.',
+    'holds_expired_total': 'Seat holds released after timing out.',
+    'bookings_committed_total': 'Seats booked after successful payment.',
+    'waitlist_allocations_total': 'Released seats handed to waitlisted users.',
+    'bookings_cancelled_total': 'Bookings cancelled and queued for refund, by reason.',
+    'payment_failures_total': 'Payments reported as failed.',
+    'email_sends_total': 'Booking confirmation emails, by result.',
+    'cache_requests_total': 'Application cache lookups, by cache and result.',
+    'http_requests_total': 'HTTP requests, by view, method and status.',
+    'http_request_duration_seconds': 'View latency.',
+    'db_queries_per_request': 'Database queries issued per request.',
+}
+
+_lock = threading.Lock()
+_counters = defaultdict(float)       # (name, labels) -> value
+_histograms = {}                     # (name, labels) -> {'buckets', 'counts', 'sum', 'count'}
+_last_flush = 0.0
+_file_owner = None                   # pid that has claimed <pid>.json in METRICS_DIR
+RETIRED_FILE = 'retired.json'
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'bookmyseat-metrics')
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Increment a counter."""
+    with _lock:
+        _counters[_key(name, labels)] += amount
+    _maybe_flush()
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record a histogram observation."""
+    key = _key(name, labels)
+    with _lock:
+        data = _histograms.get(key)
+        if data is None:
+            data = _histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(data['buckets']):
+            if value <= bound:
+                data['counts'][i] += 1
+        data['sum'] += value
+        data['count'] += 1
+    _maybe_flush()
+
+
+def cache_lookup(cache_name, hit):
+    inc('cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+        flush()
+
+
+def _snapshot_path(pid):
+    return os.path.join(metrics_dir(), f'{pid}.json')
+
+
+@contextlib.contextmanager
+def _dir_lock(exclusive):
+    """Cross-process lock on METRICS_DIR: retiring excludes scrapes, so no total is counted twice."""
+    if fcntl is None:
+        yield
+        return
+    try:
+        f = open(os.path.join(metrics_dir(), '.lock'), 'a')
+    except OSError:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _snapshot(counters, histograms):
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [
+            [name, list(labels), dict(data, counts=list(data['counts']))]
+            for (name, labels), data in histograms.items()
+        ],
+    }
+
+
+def _merge(counters, histograms, snapshot):
+    """Add a snapshot read from disk into (counters, histograms)."""
+    for name, labels, value in snapshot['counters']:
+        counters[name, tuple(map(tuple, labels))] += value
+    for name, labels, data in snapshot['histograms']:
+        key = name, tuple(map(tuple, labels))
+        if key in histograms:
+            merged = histograms[key]
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], data['counts'])]
+            merged['sum'] += data['sum']
+            merged['count'] += data['count']
+        else:
+            histograms[key] = data
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _retire(path):
+    """Fold a finished process's snapshot into retired.json and delete its file."""
+    try:
+        with _dir_lock(exclusive=True):
+            counters, histograms = defaultdict(float), {}
+            for part in (os.path.join(metrics_dir(), RETIRED_FILE), path):
+                snapshot = _read(part)
+                if snapshot is not None:
+                    _merge(counters, histograms, snapshot)
+            _write(os.path.join(metrics_dir(), RETIRED_FILE), _snapshot(counters, histograms))
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def flush():
+    """Write this process's snapshot to its file in METRICS_DIR."""
+    global _last_flush, _file_owner
+    with _lock:
+        snapshot = _snapshot(_counters, _histograms)
+        _last_flush = time.monotonic()
+    try:
+        os.makedirs(metrics_dir(), exist_ok=True)
+        pid = os.getpid()
+        if _file_owner != pid:
+            # A file under our PID belongs to a dead process (PID reuse); don't overwrite its totals
+            if os.path.exists(_snapshot_path(pid)):
+                _retire(_snapshot_path(pid))
+            _file_owner = pid
+        _write(_snapshot_path(pid), snapshot)
+    except OSError:
+        # Metrics must never break a request (e.g. read-only filesystem)
+        pass
+
+
+@atexit.register
+def _flush_on_exit():
+    # Don't lose the last few seconds of counts when a worker exits, then free the PID's file name
+    flush()
+    if _file_owner == os.getpid():
+        _retire(_snapshot_path(os.getpid()))
+
+
+def collect():
+    """Sum snapshots from every worker: ({key: value}, {key: data})."""
+    flush()
+    counters = defaultdict(float)
+    histograms = {}
+    directory = metrics_dir()
+    if not os.path.isdir(directory):
+        return counters, histograms
+    with _dir_lock(exclusive=False):
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                snapshot = _read(os.path.join(directory, filename))
+                if snapshot is not None:
+                    _merge(counters, histograms, snapshot)
+    return counters, histograms
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    # Full precision: large counters rendered with 6 significant digits would appear to stall
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(counters, histograms):
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f'# HELP {name} {HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), data in sorted(histograms.items()):
+        header(name, 'histogram')
+        for bound, count in zip(data['buckets'], data['counts']):
+            lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {count}')
+        lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {data["count"]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(data["sum"])}')
+        lines.append(f'{name}_count{_format_labels(labels)} {data["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Expose aggregated metrics to holders of the METRICS_TOKEN bearer token (open only in DEBUG)."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        allowed = request.META.get('HTTP_AUTHORIZATION') == f'Bearer {token}'
+    else:
+        allowed = settings.DEBUG
+    if not allowed:
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    counters, histograms = collect()
+    return HttpResponse(render(counters, histograms), content_type='text/plain; version=0.0.4')
+
+
+class MetricsMiddleware:
+    """Record per-view latency, status and DB query count for every request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = mark_async(self, get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        # Async views run queries on pool threads, so they aren't counted here
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, None)
+        return response
+
+    def _record(self, request, response, elapsed, queries):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        if view == 'metrics':
+            return
+        inc('http_requests_total', view=view, method=request.method, status=response.status_code)
+        observe('http_request_duration_seconds', elapsed, view=view)
+        if queries is not None:
+            observe('db_queries_per_request', queries, buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200), view=view)
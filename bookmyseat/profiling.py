@@ -0,0 +1,206 @@
+"""On-demand request profiling for staff.
+
+A request is profiled when a staff user sends ``X-Profile: 1`` or
+``?_profile=1``, or when it is picked by PROFILE_SAMPLE_RATE (default 0).
+Profiled requests run under cProfile plus a stack sampler on the request
+thread; the capture (pstats dump, top functions and collapsed stacks for
+flamegraph.pl/speedscope) is stored as a ProfileCapture keyed by request ID
+and listed in the admin. A client-sent X-Request-ID is reused as the key
+when it is free; otherwise the capture gets a fresh one, returned in
+X-Profile-Id. Requests that are not profiled only pay for one header lookup.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .async_support import mark_async
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+STATS_LINES = 40
+# Client-supplied request IDs are used in file names, so only accept safe ones
+REQUEST_ID_RE = re.compile(r'^[\w-]{1,64}$')
+
+
+def sample_rate():
+    return getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Sample one thread's stack every ``interval`` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        """Brendan Gregg's folded format: 'outer;inner count' per line."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+
+def save_capture(request, response, profiler, sampler, duration, request_id, reason):
+    """Store the capture; returns the request ID it was stored under."""
+    from movies.models import ProfileCapture
+
+    stats_stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_stream)
+    stats.sort_stats('cumulative').print_stats(STATS_LINES)
+    # Same bytes as Stats.dump_stats(), so the file opens with pstats/snakeviz
+    profile_name = default_storage.save(f'profiles/{request_id}.prof', ContentFile(marshal.dumps(stats.stats)))
+
+    match = getattr(request, 'resolver_match', None)
+    user = getattr(request, 'user', None)
+    fields = {
+        'method': request.method,
+        'path': request.get_full_path()[:500],
+        'view_name': match.view_name if match else '',
+        'user': user if user is not None and user.is_authenticated else None,
+        'status_code': response.status_code,
+        'duration_ms': duration * 1000,
+        'reason': reason,
+        'profile_file': profile_name,
+        'stats_text': stats_stream.getvalue(),
+        'collapsed_stacks': sampler.collapsed(),
+    }
+    try:
+        try:
+            with transaction.atomic():
+                ProfileCapture.objects.create(request_id=request_id, **fields)
+        except IntegrityError:
+            # X-Request-ID comes from the client and may repeat (retries, replays); don't drop the capture
+            request_id = uuid.uuid4().hex
+            ProfileCapture.objects.create(request_id=request_id, **fields)
+    except Exception:
+        default_storage.delete(profile_name)
+        raise
+    _prune()
+    return request_id
+
+
+def _prune():
+    from movies.models import ProfileCapture
+
+    keep = getattr(settings, 'PROFILE_MAX_CAPTURES', 200)
+    old = ProfileCapture.objects.order_by('-created_at')[keep:]
+    for capture in old:
+        capture.delete_files()
+    ProfileCapture.objects.filter(pk__in=[capture.pk for capture in old]).delete()
+
+
+class ProfilingMiddleware:
+    """Profile staff-requested or sampled requests (place after AuthenticationMiddleware).
+
+    Under ASGI the profile covers the event loop thread, which may include
+    other requests running concurrently.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = mark_async(self, get_response)
+
+    def _asked(self, request):
+        return request.META.get(PROFILE_HEADER) == '1' or (
+            PROFILE_PARAM in request.META.get('QUERY_STRING', '') and request.GET.get(PROFILE_PARAM) == '1'
+        )
+
+    def _reason(self, request):
+        if self._asked(request):
+            return 'staff' if request.user.is_staff else None
+        rate = sample_rate()
+        if rate and random.random() < rate:
+            return 'sampled'
+        return None
+
+    def _start(self, request):
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        interval = getattr(settings, 'PROFILE_SAMPLE_INTERVAL_MS', 1) / 1000
+        sampler = StackSampler(threading.get_ident(), interval)
+        profiler = cProfile.Profile()
+        sampler.start()
+        profiler.enable()
+        return request_id, sampler, profiler
+
+    def _save(self, request, response, profiler, sampler, duration, request_id, reason):
+        try:
+            request_id = save_capture(request, response, profiler, sampler, duration, request_id, reason)
+        except Exception:
+            # A failed capture must never fail the request being profiled
+            logger.exception(f'Could not store profile {request_id}')
+        response['X-Profile-Id'] = request_id
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        reason = self._reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        request_id, sampler, profiler = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            sampler.stop()
+        return self._save(request, response, profiler, sampler, time.perf_counter() - start, request_id, reason)
+
+    async def __acall__(self, request):
+        # request.user may hit the database, so only resolve it when profiling was asked for
+        reason = await sync_to_async(self._reason)(request) if self._asked(request) else self._reason(request)
+        if reason is None:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        request_id, sampler, profiler = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            sampler.stop()
+        return await sync_to_async(self._save)(
+            request, response, profiler, sampler, time.perf_counter() - start, request_id, reason,
+        )
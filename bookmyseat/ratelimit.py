@@ -0,0 +1,107 @@
+"""Token-bucket rate limits backed by the default cache.
+
+A policy in RATE_LIMITS, ``name: (per_minute, burst)``, allows ``burst``
+requests at once and refills at ``per_minute``. A bucket is a run of slot
+keys: slot k is the token issued at k * (60 / per_minute) seconds, and a
+request may take any free slot from the current one to ``burst - 1`` ahead.
+Slots are claimed with cache.add(), which is atomic on every backend, so
+concurrent requests (threads, workers, or hosts sharing the cache) never
+share a token and a bucket admits at most burst + 1 + elapsed * rate
+requests. A check is one get_many plus, when admitted, one add.
+
+With the per-process LocMemCache each worker keeps its own buckets; point
+the default cache at Redis or memcached for limits across workers.
+"""
+import functools
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from bookmyseat import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def policy(name):
+    """(per_minute, burst) for a policy, or None when it isn't limited."""
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    return getattr(settings, 'RATE_LIMITS', {}).get(name)
+
+
+def take(bucket, per_minute, burst, now=None):
+    """Take a token from ``bucket``. Returns 0 if one was free, else seconds until the next one."""
+    interval = 60.0 / per_minute
+    now = time.time() if now is None else now
+    first = int(now // interval)
+    keys = [f'ratelimit:{bucket}:{slot}' for slot in range(first, first + burst)]
+    try:
+        taken = cache.get_many(keys)
+        for slot, key in enumerate(keys, first):
+            # A key only has to outlive its slot; older slots are never looked at again
+            if key not in taken and cache.add(key, 1, math.ceil((slot + 1) * interval - now) + 1):
+                return 0
+    except Exception:
+        logger.warning(f'Rate limit check for {bucket} failed; allowing the request', exc_info=True)
+        return 0
+    return max(1, math.ceil((first + 1) * interval - now))
+
+
+def hit(name, key):
+    """Count a request against policy ``name`` for ``key``. Returns 0 or the Retry-After seconds."""
+    limits = policy(name)
+    if limits is None:
+        return 0
+    return take(f'{name}:{key}', *limits)
+
+
+def client_ip(request):
+    """Client address, trusting the last RATE_LIMIT_PROXY_COUNT hops of X-Forwarded-For."""
+    proxies = getattr(settings, 'RATE_LIMIT_PROXY_COUNT', 0)
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and forwarded:
+        return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def user_or_ip(request, *args, **kwargs):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def exempt(request):
+    """Mark an in-process request (e.g. cache warm-up) so no policy counts it."""
+    request.ratelimit_exempt = True
+
+
+def too_many_requests(request, retry_after):
+    return HttpResponse(f'Too many requests. Try again in {retry_after} seconds.', status=429,
+                        content_type='text/plain; charset=utf-8')
+
+
+def ratelimit(name, key, methods=('POST',), limited=too_many_requests):
+    """Apply policy ``name`` to a view, with one bucket per ``key(request, *args, **kwargs)``.
+
+    Only ``methods`` (None for all) take tokens. Over the limit the view is
+    skipped and ``limited(request, retry_after)`` builds the 429 response;
+    Retry-After is added here.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            exempt = getattr(request, 'ratelimit_exempt', False)
+            if not exempt and (methods is None or request.method in methods):
+                retry_after = hit(name, key(request, *args, **kwargs))
+                if retry_after:
+                    metrics.inc('rate_limited_total', policy=name)
+                    response = limited(request, retry_after)
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
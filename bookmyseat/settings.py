@@ -12,7 +12,6 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-import dj_database_url
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,16 +50,26 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bookmyseat.metrics.MetricsMiddleware',
+    'bookmyseat.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'bookmyseat.async_support.AsyncWhiteNoiseMiddleware',
+    'bookmyseat.db_router.PrimaryPinMiddleware',
+    'movies.snapshots.SnapshotVersionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bookmyseat.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'movies.waiting_room.WaitingRoomMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Sessions: cached_db serves reads from the cache and only writes through on change.
+# Set SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies to skip the DB entirely.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
 # WhiteNoise configuration for serving static files
 WHITENOISE_AUTOREFRESH = True if DEBUG else False
 WHITENOISE_USE_FINDERS = True
@@ -72,6 +81,92 @@ DEFAULT_FROM_EMAIL = 'noreply@bookmyseat.com'
 # Razorpay (set in env for production)
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', '')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
+# Webhook secret from the Razorpay dashboard; when set, bookings are made from verified
+# payment.captured webhooks (movies/payments.py) instead of the browser's return POST
+RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET', '')
+
+# Extra seconds after the seat reservation runs out during which a payment for the hold is still honoured
+HOLD_GRACE_SECONDS = int(os.environ.get('HOLD_GRACE_SECONDS', '120'))
+
+# Public base URL used in emails (e.g. waitlist payment links) and as the cache
+# warm-up host; only defaults to localhost in DEBUG
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000' if DEBUG else '')
+
+# Poster thumbnails (see movies/posters.py). POSTER_FETCHER can point at a
+# local stub (dotted path), e.g. movies.posters.fetch_from_disk, which reads
+# the URL's file name from POSTER_STUB_DIR instead of fetching it.
+POSTER_WIDTHS = (160, 320, 480, 640)
+POSTER_FETCHER = os.environ.get('POSTER_FETCHER') or None
+POSTER_STUB_DIR = os.environ.get('POSTER_STUB_DIR', str(BASE_DIR / 'poster_stubs'))
+
+# Metrics (/metrics): per-worker snapshots under METRICS_DIR are summed on scrape
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_FLUSH_SECONDS = 5
+
+# Fragment cache lifetime for the movie grids on home.html and movie_list.html
+CATALOG_FRAGMENT_SECONDS = int(os.environ.get('CATALOG_FRAGMENT_SECONDS', '60'))
+
+# Response compression (bookmyseat/compression.py); brotli is used when the package is installed
+BROTLI_QUALITY = 5
+
+# JSON API (/api/v1/) response cache lifetime
+API_CACHE_SECONDS = int(os.environ.get('API_CACHE_SECONDS', '30'))
+
+# Cache warm-up (manage.py warm_caches, and each gunicorn worker on start unless WARM_CACHES_ON_START=0)
+WARM_CACHES_WORKERS = int(os.environ.get('WARM_CACHES_WORKERS', '8'))
+WARM_SEATS_HOURS = 24
+WARM_MAX_SEAT_SHOWS = 200
+
+# Trending rail (movies/trending.py): decayed bookings over a sliding window
+TRENDING_BUCKET_MINUTES = 60
+TRENDING_WINDOW_HOURS = 72
+TRENDING_HALF_LIFE_HOURS = 12
+TRENDING_SIZE = 8
+TRENDING_CACHE_SECONDS = 60
+
+# Per-process Movie/Theater snapshots for the booking path (movies/snapshots.py)
+SNAPSHOT_CACHE_SIZE = 2048
+
+# Showtimes page (movies/showtimes.py): days offered by the date picker, per-day schedule cache
+SHOWTIME_PICKER_DAYS = 7
+SHOWTIME_CACHE_SECONDS = 60
+
+# Readiness probe (/health/ready/) thresholds; results cached per process
+READINESS_CACHE_SECONDS = 5
+READINESS_MAX_DB_LATENCY_MS = float(os.environ.get('READINESS_MAX_DB_LATENCY_MS', '250'))
+READINESS_MAX_CACHE_LATENCY_MS = float(os.environ.get('READINESS_MAX_CACHE_LATENCY_MS', '50'))
+# Backlog thresholds are reported (ok: false) but don't fail readiness
+READINESS_MAX_EXPIRED_HOLDS = int(os.environ.get('READINESS_MAX_EXPIRED_HOLDS', '500'))
+READINESS_MAX_EMAIL_BACKLOG = int(os.environ.get('READINESS_MAX_EMAIL_BACKLOG', '5000'))
+
+# Request profiling (bookmyseat/profiling.py): staff send X-Profile: 1 or ?_profile=1;
+# PROFILE_SAMPLE_RATE additionally profiles that fraction of all requests
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SAMPLE_INTERVAL_MS = 1
+PROFILE_MAX_CAPTURES = 200
+
+# Users may cancel a booking up to this many hours before the show
+CANCELLATION_CUTOFF_HOURS = 2
+
+# archive_past_shows moves shows older than this (and their seats/bookings) to the archive tables
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '30'))
+
+# Waiting room for hot shows (Theater.waiting_room), see movies/waiting_room.py
+WAITING_ROOM_ADMIT_PER_MINUTE = int(os.environ.get('WAITING_ROOM_ADMIT_PER_MINUTE', '60'))
+WAITING_ROOM_BURST = int(os.environ.get('WAITING_ROOM_BURST', '20'))
+WAITING_ROOM_ADMISSION_MINUTES = 10
+
+# Token-bucket rate limits (bookmyseat/ratelimit.py): policy -> (requests per minute, burst)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMITS = {
+    'hold': (6, 10),    # seat hold attempts per user per show
+    'auth': (5, 10),    # login, signup and password change attempts per client IP
+    'api': (120, 30),   # /api/v1/ calls per user, or per client IP when anonymous
+}
+# Proxies in front of the app that append to X-Forwarded-For (Render and Vercel add one)
+RATE_LIMIT_PROXY_COUNT = int(os.environ.get(
+    'RATE_LIMIT_PROXY_COUNT', '1' if os.environ.get('RENDER') or os.environ.get('VERCEL') else '0'))
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -79,12 +174,21 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 ROOT_URLCONF = 'bookmyseat.urls'
 LOGIN_URL='/login/'
+# Compiled templates are kept in memory outside DEBUG (cached loader); in DEBUG
+# templates are re-read on every render so edits show up immediately.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': ['templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -97,6 +201,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'bookmyseat.wsgi.application'
 
+# Async catalog views (movies/async_views.py); bookmyseat/asgi.py turns this on
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '') == '1'
+# Threads (and so at most this many DB connections) per process for async views' queries
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', '16'))
+
+# App profile: "public" (serverless) skips admin autodiscovery and the admin
+# URLconf at startup; they load on the first /admin/ request (bookmyseat.lazy_admin).
+APP_PROFILE = os.environ.get('DJANGO_APP_PROFILE', 'full')
+if APP_PROFILE == 'public':
+    INSTALLED_APPS[INSTALLED_APPS.index('django.contrib.admin')] = 'django.contrib.admin.apps.SimpleAdminConfig'
+    ROOT_URLCONF = 'bookmyseat.urls_public'
+    MIDDLEWARE.insert(1, 'bookmyseat.lazy_admin.LazyAdminMiddleware')
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -112,7 +229,22 @@ DATABASES = {
 # For local development, SQLite is used by default
 database_url = os.environ.get('DATABASE_URL')
 if database_url:
-    DATABASES['default'] = dj_database_url.parse(database_url)
+    import dj_database_url
+    # Connections are opened lazily on first query; DB_CONN_MAX_AGE lets warm
+    # serverless/gunicorn workers reuse them instead of reconnecting per request
+    DATABASES['default'] = dj_database_url.parse(
+        database_url, conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '0')))
+
+# Optional read replica for catalog reads (Movie/Theater), e.g.
+# DATABASE_REPLICA_URL=sqlite:///replica.sqlite3 locally. Tests mirror default.
+replica_url = os.environ.get('DATABASE_REPLICA_URL')
+if replica_url:
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(replica_url)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['bookmyseat.db_router.CatalogReplicaRouter']
+# Seconds a client stays pinned to the primary after a write (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '10'))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
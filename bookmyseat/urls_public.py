@@ -0,0 +1,31 @@
+"""Public URLconf: everything except the Django admin site.
+
+Used as ROOT_URLCONF under the "public" app profile (serverless cold starts),
+so admin modules are only imported when an /admin/ URL is first requested.
+See bookmyseat.lazy_admin.
+"""
+from django.urls import path, include
+from django.conf import settings
+from django.conf.urls.static import static
+from movies.views import admin_dashboard
+from bookmyseat.health import health_check, liveness, readiness
+from bookmyseat.metrics import metrics_view
+
+urlpatterns = [
+    # Health check endpoint
+    path('health/', health_check, name='health_check'),
+    path('health/live/', liveness, name='liveness'),
+    path('health/ready/', readiness, name='readiness'),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+    # Custom admin dashboard (must come before admin.site.urls to take precedence)
+    path('admin/dashboard/', admin_dashboard, name='admin_dashboard'),
+    path('users/', include('users.urls')),
+    path('', include('users.urls')),
+    path('movies/', include('movies.urls')),
+    # Read-only JSON API for mobile clients and partners
+    path('api/v1/', include('movies.api')),
+]
+
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
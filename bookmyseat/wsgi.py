@@ -12,6 +12,9 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookmyseat.settings')
+# Vercel sets VERCEL=1; use the slim public profile there (see settings.APP_PROFILE)
+if os.environ.get('VERCEL'):
+    os.environ.setdefault('DJANGO_APP_PROFILE', 'public')
 
 application = get_wsgi_application()
 app = application
\ No newline at end of file
@@ -10,3 +10,7 @@ python manage.py migrate --noinput
 
 # Collect static files
 python manage.py collectstatic --noinput --clear
+
+# Warm catalog/show/seat caches when they are shared (Redis, Memcached, DB);
+# with the default per-process cache each gunicorn worker warms itself (gunicorn.conf.py)
+python manage.py warm_caches --shared-only
@@ -0,0 +1,15 @@
+"""Gunicorn settings (picked up automatically from the working directory)."""
+import os
+import threading
+
+
+def _warm_caches():
+    from movies.warmup import warm
+    warm(workers=int(os.environ.get('WARM_CACHES_WORKERS', '2')))
+
+
+def post_worker_init(worker):
+    # The default cache is per-process, so each worker warms its own copy in
+    # the background while it starts accepting requests.
+    if os.environ.get('WARM_CACHES_ON_START', '1') == '1':
+        threading.Thread(target=_warm_caches, name='warm-caches', daemon=True).start()
@@ -1,7 +1,14 @@
 from django.contrib import admin
 from django.contrib import messages
 from django import forms
-from .models import Movie, Theater, Seat, Booking, SeatReservation
+from django.db.models import Count
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.html import format_html
+from bookmyseat.admin_paging import LargeTableAdmin
+from .models import Movie, Theater, Seat, Booking, Order, SeatReservation, Refund, ArchivedShow, ArchivedBooking, ProfileCapture, PaymentEvent
+from .posters import generate_poster_derivatives
+from .cancellations import cancel_show
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +31,7 @@ class TheaterForm(forms.ModelForm):
     
     class Meta:
         model = Theater
-        fields = ['name', 'movie', 'time']
+        fields = ['name', 'movie', 'time', 'waiting_room']
     
     def clean(self):
         cleaned_data = super().clean()
@@ -42,6 +49,7 @@ class TheaterForm(forms.ModelForm):
 class MovieAdmin(admin.ModelAdmin):
     list_display = ['name', 'rating', 'genre', 'language', 'cast']
     list_filter = ['genre', 'language']
+    search_fields = ['name']
     fieldsets = (
         ('Basic Info', {
             'fields': ('name', 'rating', 'genre', 'language', 'cast', 'description')
@@ -58,6 +66,8 @@ class MovieAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         try:
             super().save_model(request, obj, form, change)
+            if 'image' in form.changed_data or 'external_image_url' in form.changed_data:
+                self._build_posters(request, obj)
             messages.success(request, f'Movie "{obj.name}" saved successfully!')
         except Exception as e:
             error_msg = str(e)
@@ -80,15 +90,44 @@ class MovieAdmin(admin.ModelAdmin):
             messages.error(request, f'Error saving movie: {error_msg}')
             raise
 
+    def _build_posters(self, request, obj):
+        """Generate poster thumbnails; a failure here must not block the save."""
+        try:
+            generate_poster_derivatives(obj, force=True)
+        except Exception as e:
+            logger.warning(f'Poster derivatives failed for movie {obj.pk}: {str(e)}', exc_info=True)
+            messages.warning(request, f'Poster thumbnails could not be generated: {str(e)}')
+
 
 @admin.register(Theater)
 class TheaterAdmin(admin.ModelAdmin):
     form = TheaterForm
-    list_display = ['name', 'movie', 'time', 'seat_count']
+    list_display = ['name', 'movie', 'time', 'waiting_room', 'is_cancelled', 'seat_count']
+    list_select_related = ['movie']
+    search_fields = ['name', 'movie__name']
+    autocomplete_fields = ['movie']
+    actions = ['cancel_shows']
+
+    def get_queryset(self, request):
+        # One grouped query for the page instead of a COUNT per row
+        return super().get_queryset(request).annotate(seat_total=Count('seats'))
+
+    def cancel_shows(self, request, queryset):
+        """Cancel shows: refund all bookings, free seats, queue notification emails."""
+        cancelled = refunded = 0
+        for theater in queryset.filter(is_cancelled=False):
+            refunded += cancel_show(theater)
+            cancelled += 1
+        skipped = queryset.count() - cancelled
+        note = f' {skipped} already cancelled.' if skipped else ''
+        messages.success(request, f'Cancelled {cancelled} show(s); {refunded} booking(s) queued for refund.{note}')
+    cancel_shows.short_description = 'Cancel selected shows and refund bookings'
     
     def seat_count(self, obj):
-        return obj.seats.count()
+        url = reverse('admin:movies_seat_changelist') + f'?theater__id__exact={obj.pk}'
+        return format_html('<a href="{}">{}</a>', url, obj.seat_total)
     seat_count.short_description = 'Total Seats'
+    seat_count.admin_order_field = 'seat_total'
     
     def save_model(self, request, obj, form, change):
         """Save theater and auto-generate seats if rows/columns provided."""
@@ -128,44 +167,142 @@ class TheaterAdmin(admin.ModelAdmin):
 
 
 @admin.register(Seat)
-class SeatAdmin(admin.ModelAdmin):
-    list_display = ['theater', 'seat_number', 'is_booked']
-    list_filter = ['theater', 'is_booked']
-    ordering = ['theater', 'seat_number']
+class SeatAdmin(LargeTableAdmin):
+    list_display = ['seat_number', 'show', 'is_booked']
+    list_filter = ['is_booked']
+    list_select_related = ['theater']
+    search_fields = ['=seat_number', 'theater__name']
+    autocomplete_fields = ['theater']
     change_list_template = 'admin/seat_changelist.html'
-    
+
+    def show(self, obj):
+        # Theater.__str__ would join the movie for every row
+        return f'{obj.theater.name} at {obj.theater.time:%d %b %Y, %H:%M}'
+    show.admin_order_field = 'theater__time'
+
     def changelist_view(self, request, extra_context=None):
-        """Custom changelist view that organizes seats by row."""
+        """Changelist with the seat layout of one theater, when filtered to it."""
         response = super().changelist_view(request, extra_context)
-        
-        if hasattr(response, 'context_data'):
-            # Get all theaters
-            theaters = Theater.objects.all()
-            theater_seats = {}
-            
-            for theater in theaters:
-                seats = theater.seats.all().order_by('seat_number')
+        theater_id = request.GET.get('theater__id__exact', '')
+
+        if hasattr(response, 'context_data') and theater_id.isdigit():
+            theater = Theater.objects.filter(pk=theater_id).first()
+            if theater:
                 rows = {}
-                
                 # Group seats by row letter
-                for seat in seats:
+                for seat in theater.seats.order_by('seat_number'):
                     row_letter = seat.seat_number[0] if seat.seat_number else 'X'
-                    if row_letter not in rows:
-                        rows[row_letter] = []
-                    rows[row_letter].append(seat)
-                
-                theater_seats[theater.name] = rows
-            
-            response.context_data['theater_seats'] = theater_seats
-        
+                    rows.setdefault(row_letter, []).append(seat)
+                response.context_data['theater_seats'] = {theater.name: rows}
+
         return response
 
 
 @admin.register(SeatReservation)
-class SeatReservationAdmin(admin.ModelAdmin):
-    list_display = ['user', 'seat', 'theater', 'expires_at', 'created_at']
+class SeatReservationAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'seat_number', 'theater', 'expires_at', 'created_at']
+    list_select_related = ['user', 'seat', 'theater__movie']
+    autocomplete_fields = ['user', 'seat', 'theater']
+    date_hierarchy = 'expires_at'
+
+    def seat_number(self, obj):
+        return obj.seat.seat_number
+    seat_number.short_description = 'Seat'
+
+
+class BookingInline(admin.TabularInline):
+    model = Booking
+    fields = ['seat', 'amount', 'payment_status', 'cancelled_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'movie', 'theater', 'seat_count', 'total', 'payment_id', 'created_at']
+    list_select_related = ['user', 'movie', 'theater__movie']
+    search_fields = ['=payment_id', '=user__username']
+    raw_id_fields = ['user', 'movie', 'theater']
+    date_hierarchy = 'created_at'
+    inlines = [BookingInline]
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
-    list_display = ['user', 'seat', 'movie', 'theater', 'amount', 'payment_status', 'booked_at']
+class BookingAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'seat_number', 'movie', 'theater', 'amount', 'payment_status', 'booked_at']
+    list_filter = ['payment_status']
+    list_select_related = ['user', 'seat', 'movie', 'theater__movie']
+    search_fields = ['=payment_id', '=user__username']
+    autocomplete_fields = ['user', 'seat', 'movie', 'theater']
+    raw_id_fields = ['order']
+    date_hierarchy = 'booked_at'
+
+    def seat_number(self, obj):
+        return obj.seat.seat_number
+    seat_number.short_description = 'Seat'
+
+
+@admin.register(Refund)
+class RefundAdmin(admin.ModelAdmin):
+    list_display = ['booking', 'payment_id', 'amount', 'reason', 'status', 'created_at']
+    list_filter = ['status', 'reason']
+    search_fields = ['=payment_id']
+    raw_id_fields = ['booking']
+
+
+@admin.register(ArchivedShow)
+class ArchivedShowAdmin(admin.ModelAdmin):
+    list_display = ['name', 'movie_name', 'time', 'booked_count', 'is_cancelled', 'archived_at']
+    search_fields = ['name', 'movie_name']
+    exclude = ['seat_numbers']
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(LargeTableAdmin):
+    list_display = ['original_id', 'user', 'movie_name', 'theater_name', 'show_time', 'seat_number', 'amount', 'payment_status']
+    list_select_related = ['user']
+    list_filter = ['payment_status']
+    raw_id_fields = ['user', 'movie']
+    date_hierarchy = 'show_time'
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ['received_at', 'event_type', 'payment_id', 'outcome', 'attempts', 'processed_at']
+    list_filter = ['outcome', 'event_type']
+    search_fields = ['event_id', 'payment_id']
+    readonly_fields = [f.name for f in PaymentEvent._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'reason', 'user']
+    list_filter = ['reason', 'view_name']
+    search_fields = ['request_id', 'path']
+    readonly_fields = [f.name for f in ProfileCapture._meta.fields]
+    actions = ['download_flamegraph']
+
+    def has_add_permission(self, request):
+        return False
+
+    def download_flamegraph(self, request, queryset):
+        """Collapsed stacks of the selected captures, for flamegraph.pl or speedscope."""
+        captures = list(queryset)
+        response = HttpResponse(''.join(c.collapsed_stacks for c in captures), content_type='text/plain')
+        name = captures[0].request_id if len(captures) == 1 else 'profiles'
+        response['Content-Disposition'] = f'attachment; filename="{name}.folded"'
+        return response
+    download_flamegraph.short_description = 'Download flamegraph stacks (.folded)'
+
+    def delete_model(self, request, obj):
+        obj.delete_files()
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for capture in queryset:
+            capture.delete_files()
+        super().delete_queryset(request, queryset)
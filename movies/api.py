@@ -0,0 +1,208 @@
+"""Read-only JSON API for the catalog, shows and seat availability.
+
+Mirrors the movie_list filters and theater_list. Views read values()
+projections (no model instances), page with opaque keyset cursors and are
+cached per URL. orjson is used when installed, stdlib json otherwise.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.urls import path
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_GET
+
+from bookmyseat.ratelimit import ratelimit, user_or_ip
+from .models import Movie, Theater, Seat
+from .posters import derivative_urls
+from .showtimes import upcoming_shows
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Seat availability changes quickly; cache it for much less than the catalog
+SEATS_CACHE_SECONDS = 5
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+MOVIE_FIELDS = ('id', 'name', 'genre', 'language', 'rating', 'ticket_price',
+                'external_image_url', 'poster_derivatives')
+SHOW_FIELDS = ('id', 'name', 'time', 'movie_id')
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f'{type(obj).__name__} is not JSON serializable')
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(_dumps(data), status=status, content_type='application/json')
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(_dumps(values)).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+
+def _limit(request):
+    try:
+        return max(1, min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+
+
+def _movie_row(row):
+    # Clients get poster URLs, not storage names
+    row['poster_derivatives'] = derivative_urls(row['poster_derivatives'] or {})
+    return row
+
+
+def _page(rows, limit, cursor_of):
+    """Trim the limit+1 probe row and build the next cursor."""
+    rows = list(rows)
+    next_cursor = _encode_cursor(cursor_of(rows[limit - 1])) if len(rows) > limit else None
+    return {'results': rows[:limit], 'next': next_cursor}
+
+
+def _show_cursor(after):
+    """(time, id) from a decoded shows cursor, or None if it isn't one."""
+    if not (isinstance(after, list) and len(after) == 2):
+        return None
+    try:
+        after_time = parse_datetime(after[0]) if isinstance(after[0], str) else None
+    except ValueError:  # well formed but out of range, e.g. month 13
+        return None
+    if after_time is None or isinstance(after[1], bool) or not isinstance(after[1], int):
+        return None
+    if timezone.is_naive(after_time):
+        after_time = timezone.make_aware(after_time)
+    return after_time, after[1]
+
+
+def _bad_cursor():
+    return json_response({'error': 'Invalid cursor'}, status=400)
+
+
+def api_cache(view):
+    return cache_page(getattr(settings, 'API_CACHE_SECONDS', 30))(view)
+
+
+def _rate_limited(request, retry_after):
+    return json_response({'error': 'Too many requests', 'retry_after': retry_after}, status=429)
+
+
+# Every call counts, cached or not: per signed-in user, else per client IP
+api_ratelimit = ratelimit('api', key=user_or_ip, methods=None, limited=_rate_limited)
+
+
+@require_GET
+@api_ratelimit
+@api_cache
+def movies(request):
+    """GET /api/v1/movies/?search=&genre=&language=&cursor=&limit="""
+    qs = Movie.objects.order_by('id')
+    if request.GET.get('search'):
+        qs = qs.filter(name__icontains=request.GET['search'])
+    if request.GET.get('genre'):
+        qs = qs.filter(genre=request.GET['genre'])
+    if request.GET.get('language'):
+        qs = qs.filter(language=request.GET['language'])
+
+    limit = _limit(request)
+    if request.GET.get('cursor'):
+        after = _decode_cursor(request.GET['cursor'])
+        if isinstance(after, bool) or not isinstance(after, int):
+            return _bad_cursor()
+        qs = qs.filter(id__gt=after)
+
+    rows = [_movie_row(row) for row in qs.values(*MOVIE_FIELDS)[:limit + 1]]
+    return json_response(_page(rows, limit, lambda row: row['id']))
+
+
+@require_GET
+@api_ratelimit
+@api_cache
+def facets(request):
+    """GET /api/v1/facets/ -> movie counts per genre and language."""
+    return json_response({
+        field: dict(Movie.objects.values_list(field).annotate(n=Count('id')).order_by(field))
+        for field in ('genre', 'language')
+    })
+
+
+@require_GET
+@api_ratelimit
+@api_cache
+def movie_detail(request, movie_id):
+    """GET /api/v1/movies/<id>/"""
+    fields = MOVIE_FIELDS + ('cast', 'description', 'trailer_url', 'trailer_video_id')
+    movie = get_object_or_404(Movie.objects.values(*fields), id=movie_id)
+    return json_response(_movie_row(movie))
+
+
+@require_GET
+@api_ratelimit
+@api_cache
+def movie_shows(request, movie_id):
+    """GET /api/v1/movies/<id>/shows/ -> shows that haven't started, by time (keyset on time, id)."""
+    get_object_or_404(Movie.objects.values('id'), id=movie_id)
+    qs = upcoming_shows(movie_id, timezone.now()).order_by('time', 'id')
+
+    limit = _limit(request)
+    if request.GET.get('cursor'):
+        after = _show_cursor(_decode_cursor(request.GET['cursor']))
+        if after is None:
+            return _bad_cursor()
+        after_time, after_id = after
+        qs = qs.filter(time__gte=after_time).exclude(time=after_time, id__lte=after_id)
+
+    rows = qs.values(*SHOW_FIELDS)[:limit + 1]
+    return json_response(_page(rows, limit, lambda row: [row['time'].isoformat(), row['id']]))
+
+
+@require_GET
+@api_ratelimit
+@cache_page(SEATS_CACHE_SECONDS)
+def show_seats(request, theater_id):
+    """GET /api/v1/shows/<id>/seats/ -> compact [id, seat_number, is_booked] rows."""
+    show = get_object_or_404(Theater.objects.values(*SHOW_FIELDS), id=theater_id)
+    seats = list(Seat.objects.filter(theater_id=theater_id).order_by('id').values_list('id', 'seat_number', 'is_booked'))
+    booked = sum(1 for seat in seats if seat[2])
+    return json_response({
+        'show': show,
+        'total': len(seats),
+        'available': len(seats) - booked,
+        'seats': seats,
+    })
+
+
+urlpatterns = [
+    path('movies/', movies, name='api_movies'),
+    path('facets/', facets, name='api_facets'),
+    path('movies/<int:movie_id>/', movie_detail, name='api_movie_detail'),
+    path('movies/<int:movie_id>/shows/', movie_shows, name='api_movie_shows'),
+    path('shows/<int:theater_id>/seats/', show_seats, name='api_show_seats'),
+]
@@ -0,0 +1,160 @@
+"""Move past shows and their bookings out of the hot tables.
+
+archive_shows() copies a batch of finished shows into ArchivedShow (seat
+grid kept as a list of seat numbers, plus tickets sold and revenue) and their
+bookings into ArchivedBooking (with the Order each seat was bought in), then
+deletes the shows with their seats, bookings, orders, refunds, holds,
+waitlist and waiting-room entries. Each batch is one transaction that locks
+the shows first (a new booking's foreign key check waits on that lock), so
+nothing is added between reading a show's bookings and deleting them. On PostgreSQL
+ArchivedBooking is range-partitioned by show_time with one partition per
+month, created on demand by ensure_partition().
+"""
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from bookmyseat.db_router import pin_to_primary
+from .models import (
+    ArchivedBooking, ArchivedShow, Booking, Order, Refund, Seat, SeatReservation, Theater, WaitingRoomTicket,
+    WaitlistEntry,
+)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def archive_after_days():
+    return getattr(settings, 'ARCHIVE_AFTER_DAYS', 30)
+
+
+def archivable_shows(older_than_days=None):
+    """Shows that ended long enough ago and have no refund still to be issued."""
+    if older_than_days is None:
+        older_than_days = archive_after_days()
+    cutoff = timezone.now() - timezone.timedelta(days=older_than_days)
+    # Payment refunds without a booking belong to no show (and a NULL would empty the NOT IN)
+    pending = Refund.objects.filter(status='pending', booking__isnull=False).values('booking__theater_id')
+    return Theater.objects.filter(time__lt=cutoff).exclude(id__in=pending).order_by('time', 'id')
+
+
+def _month_start(dt):
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(dt):
+    return dt.replace(year=dt.year + 1, month=1) if dt.month == 12 else dt.replace(month=dt.month + 1)
+
+
+def ensure_partition(month):
+    """Create the monthly ArchivedBooking partition containing ``month`` (PostgreSQL only)."""
+    if connection.vendor != 'postgresql':
+        return False
+    start = _month_start(month)
+    table = ArchivedBooking._meta.db_table
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {table}_y{start:%Y}m{start:%m} PARTITION OF {table} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [start, _next_month(start)],
+            )
+    except DatabaseError:
+        # Rows for this month already sit in the DEFAULT partition; keep using it
+        logger.warning(f'Could not create archive partition for {start:%Y-%m}', exc_info=True)
+        return False
+    return True
+
+
+def delete_shows(theater_ids):
+    """Delete shows and everything hanging off them, children first.
+
+    Deleting Theater directly would make the ORM cascade collect every seat
+    and booking of the batch before deleting anything; children first, each
+    level's cascade only finds empty querysets and most levels delete with
+    one DELETE.
+    """
+    for queryset in (
+        Refund.objects.filter(booking__theater_id__in=theater_ids),
+        Booking.objects.filter(theater_id__in=theater_ids),
+        Order.objects.filter(theater_id__in=theater_ids),
+        SeatReservation.objects.filter(theater_id__in=theater_ids),
+        WaitlistEntry.objects.filter(theater_id__in=theater_ids),
+        WaitingRoomTicket.objects.filter(theater_id__in=theater_ids),
+        Seat.objects.filter(theater_id__in=theater_ids),
+        Theater.objects.filter(id__in=theater_ids),
+    ):
+        queryset.delete()
+
+
+def archive_shows(theater_ids):
+    """Archive the given shows and delete them from the hot tables.
+
+    Returns (shows, bookings) archived.
+    """
+    pin_to_primary()
+    # DDL before the batch transaction, so a failed CREATE can't abort it
+    for month in {_month_start(time) for time in Theater.objects.filter(id__in=theater_ids).values_list('time', flat=True)}:
+        ensure_partition(month)
+
+    with transaction.atomic():
+        archived = _archive_locked(theater_ids)
+    logger.info(f'Archived {archived[0]} shows and {archived[1]} bookings')
+    return archived
+
+
+def _archive_locked(theater_ids):
+    shows = list(
+        Theater.objects.select_for_update(of=('self',)).filter(id__in=theater_ids)
+        .values('id', 'movie_id', 'movie__name', 'name', 'time', 'is_cancelled')
+    )
+    if not shows:
+        return 0, 0
+
+    seat_numbers = {show['id']: [] for show in shows}
+    booked_counts = dict.fromkeys(seat_numbers, 0)
+    for theater_id, seat_number, is_booked in (
+        Seat.objects.filter(theater_id__in=seat_numbers).order_by('id')
+        .values_list('theater_id', 'seat_number', 'is_booked').iterator()
+    ):
+        seat_numbers[theater_id].append(seat_number)
+        booked_counts[theater_id] += is_booked
+
+    bookings = (
+        Booking.objects.select_for_update(of=('self',)).filter(theater_id__in=seat_numbers)
+        .values('id', 'order_id', 'user_id', 'movie_id', 'movie__name', 'theater_id', 'theater__name',
+                'theater__time', 'seat__seat_number', 'amount', 'payment_status', 'payment_id', 'booked_at',
+                'cancelled_at', 'refund__status')
+    )
+    archived_bookings = []
+    sales = {theater_id: [0, 0] for theater_id in seat_numbers}  # theater_id -> [tickets, revenue]
+    for b in bookings.iterator():
+        archived_bookings.append(ArchivedBooking(
+            original_id=b['id'], order_original_id=b['order_id'], user_id=b['user_id'], movie_id=b['movie_id'],
+            movie_name=b['movie__name'], show_original_id=b['theater_id'], theater_name=b['theater__name'],
+            show_time=b['theater__time'], seat_number=b['seat__seat_number'], amount=b['amount'],
+            payment_status=b['payment_status'], payment_id=b['payment_id'], booked_at=b['booked_at'],
+            cancelled_at=b['cancelled_at'], refund_status=b['refund__status'] or '',
+        ))
+        if b['payment_status'] == 'completed':
+            sales[b['theater_id']][0] += 1
+            sales[b['theater_id']][1] += b['amount']
+
+    ArchivedShow.objects.bulk_create(
+        [
+            ArchivedShow(
+                original_id=show['id'], movie_id=show['movie_id'], movie_name=show['movie__name'],
+                name=show['name'], time=show['time'], is_cancelled=show['is_cancelled'],
+                seat_numbers=seat_numbers[show['id']], booked_count=booked_counts[show['id']],
+                tickets_sold=sales[show['id']][0], revenue=sales[show['id']][1],
+            )
+            for show in shows
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    archived = ArchivedBooking.objects.bulk_create(archived_bookings, batch_size=BATCH_SIZE)
+    # The shows' Orders go too; their seats are archived above under order_original_id
+    delete_shows(list(seat_numbers))
+    return len(shows), len(archived)
@@ -0,0 +1,68 @@
+"""Async variants of the read-only catalog pages, used under ASGI.
+
+The URLconfs pick these when settings.ASYNC_VIEWS is on (bookmyseat/asgi.py
+sets it). Django 3.2 has no async ORM, so independent queries run as
+db_task()s on the thread pool and are awaited together; the event loop is
+free while they wait on the database. Templates render on Django's sync
+thread because request.user and the lazy movie grid (inside a cached
+fragment) can still query.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from bookmyseat.async_support import db_task
+from .models import Movie
+from .showtimes import day_schedule, next_shows, selected_day, show_dates
+from .snapshots import get_movie
+from .trending import trending_movies
+from .views import _release_expired_reservations, catalog_fragment_context, movie_list_context, showtimes_context
+
+render_async = sync_to_async(render)
+trending_async = db_task(trending_movies)
+release_expired_async = db_task(_release_expired_reservations)
+
+
+_movie = db_task(get_movie)
+_next_shows = db_task(next_shows)
+_show_dates = db_task(show_dates)
+_day_schedule = db_task(day_schedule)
+
+
+async def _movie_or_404(movie_id):
+    movie = await _movie(movie_id)
+    if movie is None:
+        raise Http404('No Movie matches the given query.')
+    return movie
+
+
+async def home(request):
+    movies = Movie.objects.all()  # lazy: only runs when the cached fragment is cold
+    return await render_async(request, 'home.html', {
+        'movies': movies,
+        'trending_movies': await trending_async(),
+        **catalog_fragment_context(),
+    })
+
+
+async def movie_list(request):
+    _, trending = await asyncio.gather(release_expired_async(), trending_async())
+    return await render_async(request, 'movies/movie_list.html', movie_list_context(request, trending))
+
+
+async def movie_detail(request, movie_id):
+    movie, theaters = await asyncio.gather(_movie_or_404(movie_id), _next_shows(movie_id))
+    return await render_async(request, 'movies/movie_detail.html', {
+        'movie': movie,
+        'theaters': theaters,
+        'embed_url': movie.get_youtube_embed_url(),
+    })
+
+
+async def theater_list(request, movie_id):
+    movie, dates = await asyncio.gather(_movie_or_404(movie_id), _show_dates(movie_id))
+    day = selected_day(request, dates)
+    venues = await _day_schedule(movie_id, day)
+    return await render_async(request, 'movies/theater_list.html', showtimes_context(movie, day, dates, venues))
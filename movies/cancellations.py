@@ -0,0 +1,104 @@
+"""Booking cancellation and bulk show cancellation.
+
+Both paths run in one transaction: bookings are marked refunded, Refund rows
+and notification emails (OutboundEmail, sent later by send_outbox) are
+bulk-inserted, and seats are freed with set-based updates, so cancelling a
+fully booked hall costs a constant number of statements.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bookmyseat import metrics
+from .models import Booking, OutboundEmail, Order, Refund, SeatReservation, Theater, WaitlistEntry
+from .snapshots import bump_version
+from .waitlist import release_seats
+
+BATCH_SIZE = 1000
+CANCELLATION_EMAIL_TEMPLATE = 'emails/booking_cancelled.html'
+
+
+def can_cancel(booking):
+    """Users may cancel completed bookings up to CANCELLATION_CUTOFF_HOURS before the show."""
+    cutoff = timezone.timedelta(hours=getattr(settings, 'CANCELLATION_CUTOFF_HOURS', 2))
+    return booking.payment_status == 'completed' and booking.theater.time - cutoff > timezone.now()
+
+
+def _email(to, username, theater, seats, amount, reason):
+    return OutboundEmail(
+        to=to,
+        subject=f'Booking cancelled - {theater.movie.name}',
+        template=CANCELLATION_EMAIL_TEMPLATE,
+        context={
+            'username': username,
+            'movie_name': theater.movie.name,
+            'theater_name': theater.name,
+            'show_time': theater.time.strftime('%d %b %Y, %I:%M %p'),
+            'seats': seats,
+            'refund_amount': str(amount),
+            'reason': dict(Refund.REASONS)[reason],
+        },
+    )
+
+
+def cancel_booking(booking):
+    """Cancel one booking for its owner; the seat goes to the waitlist or back on sale."""
+    with transaction.atomic():
+        updated = Booking.objects.filter(pk=booking.pk, payment_status='completed').update(
+            payment_status='refunded', cancelled_at=timezone.now(),
+        )
+        if not updated:
+            return False
+        Order.objects.filter(pk=booking.order_id).update(
+            seat_count=F('seat_count') - 1, total=F('total') - booking.amount,
+        )
+        Refund.objects.create(booking=booking, amount=booking.amount, reason='user_cancelled')
+        if booking.user.email:
+            _email(booking.user.email, booking.user.username, booking.theater,
+                   booking.seat.seat_number, booking.amount, 'user_cancelled').save()
+        transaction.on_commit(lambda: release_seats([(booking.theater_id, booking.seat_id)]))
+    metrics.inc('bookings_cancelled_total', reason='user_cancelled')
+    return True
+
+
+def cancel_show(theater):
+    """Cancel a show: refund every active booking and notify each buyer once.
+
+    Returns the number of bookings refunded.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        Theater.objects.filter(pk=theater.pk).update(is_cancelled=True)
+        bump_version()
+        active = Booking.objects.filter(theater=theater, payment_status='completed')
+        rows = list(active.values_list('id', 'amount', 'user_id', 'user__email', 'user__username', 'seat__seat_number'))
+        active.update(payment_status='refunded', cancelled_at=now)
+        Order.objects.filter(theater=theater).update(seat_count=0, total=0)
+
+        Refund.objects.bulk_create(
+            [Refund(booking_id=booking_id, amount=amount, reason='show_cancelled') for booking_id, amount, *_ in rows],
+            batch_size=BATCH_SIZE,
+        )
+
+        # One email per buyer listing all of their seats
+        buyers = OrderedDict()
+        for _, amount, user_id, email, username, seat_number in rows:
+            buyer = buyers.setdefault(user_id, {'email': email, 'username': username, 'seats': [], 'amount': 0})
+            buyer['seats'].append(seat_number)
+            buyer['amount'] += amount
+        OutboundEmail.objects.bulk_create(
+            [
+                _email(b['email'], b['username'], theater, ', '.join(b['seats']), b['amount'], 'show_cancelled')
+                for b in buyers.values() if b['email']
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        SeatReservation.objects.filter(theater=theater).delete()
+        WaitlistEntry.objects.filter(theater=theater).delete()
+        theater.seats.update(is_booked=False)
+    metrics.inc('bookings_cancelled_total', len(rows), reason='show_cancelled')
+    return len(rows)
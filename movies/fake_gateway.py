@@ -0,0 +1,57 @@
+"""Local stand-in for the Razorpay gateway, for tests and development.
+
+Builds webhooks the way Razorpay sends them (JSON body with the payment
+entity, X-Razorpay-Signature and X-Razorpay-Event-Id headers) and delivers
+them to the payment webhook through the Django test client. Delivering the
+same event more than once mimics gateway retries.
+"""
+import json
+import uuid
+
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .payments import sign
+
+
+class FakeGateway:
+    def __init__(self, secret=None, client=None):
+        self.secret = secret
+        self.client = client or Client(HTTP_HOST='localhost')
+
+    def event(self, event_type, payment, event_id=None):
+        """(body, headers) for one webhook delivery."""
+        body = json.dumps({
+            'entity': 'event',
+            'event': event_type,
+            'contains': ['payment'],
+            'payload': {'payment': {'entity': payment}},
+            'created_at': int(timezone.now().timestamp()),
+        }).encode()
+        headers = {
+            'HTTP_X_RAZORPAY_SIGNATURE': sign(body, self.secret),
+            'HTTP_X_RAZORPAY_EVENT_ID': event_id or f'evt_{uuid.uuid4().hex[:14]}',
+        }
+        return body, headers
+
+    def capture(self, hold, amount_paise, payment_id=None):
+        """payment.captured event for a hold token; returns (payment_id, body, headers)."""
+        payment_id = payment_id or f'pay_{uuid.uuid4().hex[:14]}'
+        body, headers = self.event('payment.captured', {
+            'id': payment_id,
+            'entity': 'payment',
+            'amount': amount_paise,
+            'currency': 'INR',
+            'status': 'captured',
+            'notes': {'hold': hold},
+        })
+        return payment_id, body, headers
+
+    def deliver(self, body, headers, times=1):
+        """POST the event to the webhook; returns the status code of each delivery."""
+        url = reverse('payment_webhook')
+        return [
+            self.client.post(url, data=body, content_type='application/json', **headers).status_code
+            for _ in range(times)
+        ]
@@ -0,0 +1,52 @@
+"""Signed hold tokens carrying a pending booking through checkout.
+
+Replaces the ``pending_booking`` session entry: the token travels in the
+payment URL/form, so the checkout path never touches the session table.
+"""
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+HOLD_SALT = 'movies.hold'
+
+# Seat reservation timeout in minutes
+RESERVATION_TIMEOUT_MINUTES = 5
+
+
+def hold_max_age():
+    """Seconds a hold stays valid for completing a payment: the reservation plus HOLD_GRACE_SECONDS."""
+    return RESERVATION_TIMEOUT_MINUTES * 60 + getattr(settings, 'HOLD_GRACE_SECONDS', 120)
+
+
+def make_hold_token(user, theater_id, seat_ids):
+    """Sign a compact {user, theater, seats} payload."""
+    return signing.dumps(
+        {'u': user.pk, 't': int(theater_id), 's': [int(s) for s in seat_ids]},
+        salt=HOLD_SALT,
+        compress=True,
+    )
+
+
+def read_hold_token(token, user, max_age=None):
+    """Return {'theater_id', 'seat_ids'} for a valid token owned by user, else None."""
+    hold = read_hold(token, max_age)
+    if not hold or hold.pop('user_id') != user.pk:
+        return None
+    return hold
+
+
+def read_hold(token, max_age=None, as_of=None):
+    """Return {'user_id', 'theater_id', 'seat_ids'} for a valid token, else None.
+
+    For callers without a request user (payment webhooks). ``as_of`` judges
+    the token's age at that moment (e.g. when the webhook arrived) instead of now.
+    """
+    if not token:
+        return None
+    if max_age is not None and as_of is not None:
+        max_age += max(0.0, (timezone.now() - as_of).total_seconds())
+    try:
+        data = signing.loads(token, salt=HOLD_SALT, max_age=max_age)
+    except signing.BadSignature:  # includes SignatureExpired
+        return None
+    return {'user_id': data.get('u'), 'theater_id': data['t'], 'seat_ids': data['s']}
@@ -0,0 +1,41 @@
+"""Archive past shows in bounded batches so the hot tables only hold upcoming shows."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.archive import archivable_shows, archive_after_days, archive_shows
+
+
+class Command(BaseCommand):
+    help = 'Move finished shows, their seats and bookings into the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help='Archive shows that started at least this many days ago (default ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=20, help='Shows per transaction.')
+        parser.add_argument('--max-batches', type=int, default=0, help='Stop after this many batches (0 = no limit).')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many shows would be archived.')
+
+    def handle(self, *args, **options):
+        days = options['older_than_days'] if options['older_than_days'] is not None else archive_after_days()
+        candidates = archivable_shows(days)
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} shows older than {days} days would be archived')
+            return
+
+        batches = shows_total = bookings_total = 0
+        while not options['max_batches'] or batches < options['max_batches']:
+            batch = list(candidates.values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            shows, bookings = archive_shows(batch)
+            batches += 1
+            shows_total += shows
+            bookings_total += bookings
+            self.stdout.write(f'Batch {batches}: {shows} shows, {bookings} bookings')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {shows_total} shows and {bookings_total} bookings in {batches} batches'
+        ))
@@ -0,0 +1,122 @@
+"""Throughput of the catalog pages: gunicorn sync workers vs uvicorn (async views).
+
+Starts each server on a local port with the same number of worker processes,
+drives home, movie list, movie detail and theater list from --concurrency
+client threads for --duration seconds and reports requests/sec and latency
+percentiles. Uses the database from DATABASE_URL; uvicorn must be installed
+(pip install uvicorn).
+"""
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from movies.models import Movie
+
+HOST = '127.0.0.1'
+
+
+def _server_command(kind, port, workers):
+    if kind == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'bookmyseat.wsgi:application',
+                '--workers', str(workers), '--bind', f'{HOST}:{port}', '--log-level', 'warning']
+    return [sys.executable, '-m', 'uvicorn', 'bookmyseat.asgi:application',
+            '--workers', str(workers), '--host', HOST, '--port', str(port),
+            '--log-level', 'warning', '--no-access-log']
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection(HOST, port, timeout=30)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _client(port, paths, deadline):
+    """Request the paths round-robin until the deadline: (latencies_ms, errors)."""
+    latencies, errors, i = [], 0, 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            ok = _get(port, paths[i % len(paths)]) == 200
+        except OSError:
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors += 1
+        i += 1
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Compare catalog throughput under gunicorn sync workers and uvicorn (ASGI).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='gunicorn,uvicorn')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server.')
+        parser.add_argument('--concurrency', type=int, default=64, help='Concurrent client threads.')
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per server.')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        movie_id = Movie.objects.order_by('id').values_list('id', flat=True).first()
+        if movie_id is None:
+            raise CommandError('No movies in the database; run generate_dataset or add some first.')
+        paths = [reverse('home'), reverse('movie_list'),
+                 reverse('movie_detail', args=[movie_id]), reverse('theater_list', args=[movie_id])]
+
+        self.stdout.write(f"{options['workers']} workers, {options['concurrency']} clients, {options['duration']:.0f}s each")
+        for kind in options['servers'].split(','):
+            self._bench(kind.strip(), paths, options)
+
+    def _bench(self, kind, paths, options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+                   DJANGO_ASYNC_VIEWS='1' if kind == 'uvicorn' else '0', WARM_CACHES_ON_START='0')
+        server = subprocess.Popen(_server_command(kind, options['port'], options['workers']), env=env)
+        try:
+            self._wait_ready(server, options['port'], kind)
+            for path in paths:  # prime caches and lazy imports in at least one worker
+                _get(options['port'], path)
+
+            deadline = time.monotonic() + options['duration']
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results = list(executor.map(
+                    lambda _: _client(options['port'], paths, deadline), range(options['concurrency'])
+                ))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        latencies = sorted(ms for client_latencies, _ in results for ms in client_latencies)
+        errors = sum(client_errors for _, client_errors in results)
+        if not latencies:
+            raise CommandError(f'{kind}: every request failed')
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{kind:9} {len(latencies) / options['duration']:8.1f} req/s  p50 {statistics.median(latencies):7.1f} ms  "
+            f'p99 {p99:7.1f} ms  errors {errors}'
+        )
+
+    def _wait_ready(self, server, port, kind, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'{kind} exited with code {server.returncode} (is it installed?)')
+            try:
+                if _get(port, reverse('liveness')) == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'{kind} did not become ready within {timeout}s')
@@ -0,0 +1,59 @@
+"""Measure serverless cold start: fresh interpreter -> import entry point -> first response."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter; prints timings as JSON on the last line
+COLD_START_SCRIPT = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+t0 = time.perf_counter()
+from api.index import application
+t1 = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'REQUEST_METHOD': 'GET'}
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+t2 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'first_response_ms': (t2 - t0) * 1000, 'status': status[0]}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Benchmark time-to-first-response of the Vercel entry point and fail if over budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/health/', help='URL requested after boot.')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--budget-ms', type=float, default=1500.0,
+                            help='Maximum allowed median time-to-first-response.')
+        parser.add_argument('--profile', choices=['full', 'public'], default='public')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_APP_PROFILE=options['profile'])
+        results = []
+        for _ in range(options['runs']):
+            proc = subprocess.run(
+                [sys.executable, '-c', COLD_START_SCRIPT, options['path']],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(proc.stderr.strip() or 'cold start failed')
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        imports = [r['import_ms'] for r in results]
+        firsts = [r['first_response_ms'] for r in results]
+        median = statistics.median(firsts)
+        self.stdout.write(
+            f"{options['path']} [{results[0]['status']}] profile={options['profile']} runs={len(results)}\n"
+            f'  import:         median {statistics.median(imports):.1f} ms, max {max(imports):.1f} ms\n'
+            f'  first response: median {median:.1f} ms, max {max(firsts):.1f} ms'
+        )
+        if median > options['budget_ms']:
+            raise CommandError(f"Median time-to-first-response {median:.1f} ms exceeds budget {options['budget_ms']:.0f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Within budget ({options['budget_ms']:.0f} ms)"))
@@ -0,0 +1,82 @@
+"""Render-time and bytes-on-wire benchmark for the heaviest HTML pages.
+
+Builds a large hall (26 rows x 100 seats = 2,600 by default) under a
+"bench-" prefix, then times the seat selection page, home and movie list
+through the full middleware stack and reports response sizes raw, gzip and
+(when the brotli package is installed) br.
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from bookmyseat.compression import brotli
+from movies.models import Movie, Seat, Theater
+
+PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark render time and response size of seat selection, home and movie list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=26)
+        parser.add_argument('--columns', type=int, default=100)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark hall afterwards.')
+
+    def handle(self, *args, **options):
+        movie, _ = Movie.objects.get_or_create(name=f'{PREFIX}movie', defaults={'ticket_price': 200})
+        theater = Theater.objects.create(name=f'{PREFIX}hall', movie=movie, time=timezone.now() + timezone.timedelta(days=1))
+        Seat.objects.bulk_create([
+            # Every 7th seat sold so both seat branches are rendered
+            Seat(theater=theater, seat_number=f'{chr(65 + row)}{col}', is_booked=col % 7 == 0)
+            for row in range(options['rows'])
+            for col in range(1, options['columns'] + 1)
+        ])
+        user, _ = User.objects.get_or_create(username=f'{PREFIX}user')
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+
+        self.stdout.write(f"{options['rows'] * options['columns']} seats, {options['runs']} runs per page")
+        try:
+            for label, url in (
+                ('seat selection', reverse('reserve_seats', args=[theater.pk])),
+                ('home', reverse('home')),
+                ('movie list', reverse('movie_list')),
+            ):
+                self._bench(client, label, url, options['runs'])
+        finally:
+            if not options['keep']:
+                Movie.objects.filter(name__startswith=PREFIX).delete()
+                User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _bench(self, client, label, url, runs):
+        cache.clear()
+        started = time.perf_counter()
+        client.get(url)
+        cold_ms = (time.perf_counter() - started) * 1000
+
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = []
+        # queries_log is reset on request_started, so count through a wrapper instead
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            raw = len(client.get(url).content)
+
+        sizes = [f'raw {raw / 1024:.1f} KiB', f"gzip {len(client.get(url, HTTP_ACCEPT_ENCODING='gzip').content) / 1024:.1f} KiB"]
+        if brotli is not None:
+            sizes.append(f"br {len(client.get(url, HTTP_ACCEPT_ENCODING='br').content) / 1024:.1f} KiB")
+        self.stdout.write(
+            f'{label:15} cold {cold_ms:7.1f} ms  p50 {statistics.median(timings):7.1f} ms  '
+            f'p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.1f} ms  {len(queries)} queries  ' + '  '.join(sizes)
+        )
@@ -0,0 +1,28 @@
+"""Generate WebP poster derivatives for movies (uploads and external URLs)."""
+from django.core.management.base import BaseCommand
+
+from movies.models import Movie
+from movies.posters import generate_poster_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP poster thumbnails for movies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate even if the source is unchanged.')
+        parser.add_argument('--movie', type=int, action='append', help='Only process this movie id (repeatable).')
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.all()
+        if options['movie']:
+            movies = movies.filter(id__in=options['movie'])
+
+        built = failed = 0
+        for movie in movies.iterator():
+            try:
+                if generate_poster_derivatives(movie, force=options['force']):
+                    built += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Movie {movie.pk} ({movie.name}): {e}')
+        self.stdout.write(self.style.SUCCESS(f'Posters built: {built}, failed: {failed}'))
@@ -0,0 +1,39 @@
+"""Pay for a hold through the fake gateway's webhook (needs RAZORPAY_WEBHOOK_SECRET).
+
+The hold token is the ``hold`` parameter of the payment page URL. The amount
+defaults to the full price of the held seats.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.fake_gateway import FakeGateway
+from movies.holds import read_hold
+from movies.payments import process_events, webhooks_enabled
+from movies.snapshots import get_show
+
+
+class Command(BaseCommand):
+    help = 'Send a signed payment.captured webhook for a hold, optionally repeated like gateway retries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hold')
+        parser.add_argument('--amount', type=int, default=None, help='Amount in paise (default: full price).')
+        parser.add_argument('--deliveries', type=int, default=1, help='Send the same event this many times.')
+        parser.add_argument('--process', action='store_true', help='Run the booking worker afterwards.')
+
+    def handle(self, *args, **options):
+        if not webhooks_enabled():
+            raise CommandError('Set RAZORPAY_WEBHOOK_SECRET first.')
+        hold = read_hold(options['hold'])
+        theater = hold and get_show(hold['theater_id'])
+        if not theater:
+            raise CommandError('Invalid hold token.')
+        amount = options['amount']
+        if amount is None:
+            amount = int((theater.movie.ticket_price or 0) * 100) * len(set(hold['seat_ids']))
+
+        gateway = FakeGateway()
+        payment_id, body, headers = gateway.capture(options['hold'], amount)
+        statuses = gateway.deliver(body, headers, times=options['deliveries'])
+        self.stdout.write(f'{payment_id}: webhook responses {statuses}')
+        if options['process']:
+            self.stdout.write(f'Outcomes: {process_events(payment_id=payment_id)}')
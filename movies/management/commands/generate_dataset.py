@@ -0,0 +1,250 @@
+"""Deterministic synthetic catalog for performance testing.
+
+Creates movies, venues (Theater names), shows with full seat grids, users,
+orders with their seat bookings, and active holds under a "gen-" prefix.
+The same --seed and --start-date always produce the same data, except that
+holds are only placed on shows that have not started yet. Demand is
+skewed the way real traffic is: a few movies sell most tickets (Zipf popularity), evening and
+weekend shows fill up, and the fullest shows are put behind the waiting
+room. Rows are loaded in batches with bulk_create, or with COPY on
+PostgreSQL.
+
+Presets: smoke (~6k seats), load (~700k) and soak (~6.3M).
+"""
+import csv
+import datetime
+import io
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from movies.holds import RESERVATION_TIMEOUT_MINUTES
+from movies.models import (
+    GENRE_CHOICES, LANGUAGE_CHOICES, Booking, Movie, Order, Refund, Seat, SeatReservation, Theater, TrendingBucket,
+    WaitingRoomTicket, WaitlistEntry,
+)
+from movies.snapshots import bump_version
+
+PREFIX = 'gen-'
+
+PRESETS = {
+    'smoke': {'movies': 20, 'venues': 5, 'days': 2, 'shows_per_day': 4, 'rows': 10, 'columns': 15, 'users': 200},
+    'load': {'movies': 200, 'venues': 40, 'days': 7, 'shows_per_day': 5, 'rows': 20, 'columns': 25, 'users': 20000},
+    'soak': {'movies': 500, 'venues': 120, 'days': 14, 'shows_per_day': 5, 'rows': 25, 'columns': 30, 'users': 100000},
+}
+
+# (hour, minute, demand multiplier); later slots are used first
+SHOW_SLOTS = [(9, 0, 0.4), (12, 0, 0.6), (15, 0, 0.8), (18, 0, 1.2), (20, 30, 1.5), (22, 45, 1.0)]
+WEEKEND_DEMAND = 1.3
+BASE_OCCUPANCY = 0.35
+MAX_OCCUPANCY = 0.97
+HOT_OCCUPANCY = 0.85  # shows at least this full get the waiting room
+HOLD_RATE = 0.01  # share of free seats on upcoming shows held at generation time
+GROUP_SIZES = [1, 2, 2, 2, 3, 4, 4, 5, 6]
+TICKET_PRICES = [150, 180, 200, 250, 300, 350]
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic, skewed dataset of shows, seats, users, holds and bookings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(PRESETS), default='smoke')
+        for name in PRESETS['smoke']:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None, help='Overrides the preset.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--start-date', type=datetime.date.fromisoformat, default=None,
+                            help='First show day, YYYY-MM-DD (default today).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert.')
+        parser.add_argument('--loader', choices=['auto', 'bulk', 'copy'], default='auto',
+                            help='auto uses COPY on PostgreSQL and bulk_create elsewhere.')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first.')
+
+    def handle(self, *args, **options):
+        spec = {name: options[name] if options[name] is not None else value
+                for name, value in PRESETS[options['preset']].items()}
+        if not 1 <= spec['rows'] <= 26:
+            raise CommandError('--rows must be between 1 and 26 (seat rows are lettered A-Z).')
+        if not 1 <= spec['shows_per_day'] <= len(SHOW_SLOTS):
+            raise CommandError(f'--shows-per-day must be between 1 and {len(SHOW_SLOTS)}.')
+        self.use_copy = options['loader'] == 'copy' or (options['loader'] == 'auto' and connection.vendor == 'postgresql')
+        if self.use_copy and connection.vendor != 'postgresql':
+            raise CommandError('--loader copy needs PostgreSQL.')
+        self.batch_size = options['batch_size']
+
+        if options['clear']:
+            self._clear()
+        elif Movie.objects.filter(name__startswith=PREFIX).exists():
+            raise CommandError('Generated data already exists; pass --clear to replace it.')
+
+        rng = random.Random(options['seed'])
+        start_date = options['start_date'] or timezone.localdate()
+        started = time.perf_counter()
+
+        movies = self._movies(rng, spec['movies'])
+        users = self._users(spec['users'])
+        shows = self._shows(rng, spec, movies, start_date)
+        counts = self._seats(rng, spec, shows, users)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(movies)} movies, {spec['venues']} venues, {len(shows)} shows, {counts['seats']} seats, "
+            f"{len(users)} users, {counts['orders']} orders of {counts['bookings']} seats, {counts['holds']} holds in {elapsed:.1f}s "
+            f"({counts['seats'] / elapsed:,.0f} seats/s, {'COPY' if self.use_copy else 'bulk_create'})"
+        ))
+
+    def _clear(self):
+        # Set-based deletes, children first: the ORM cascade would load every seat and booking
+        generated = {'movie__name__startswith': PREFIX}
+        shows = {'theater__movie__name__startswith': PREFIX}
+        with transaction.atomic():
+            for queryset in (
+                Refund.objects.filter(booking__movie__name__startswith=PREFIX),
+                Booking.objects.filter(**generated),
+                Order.objects.filter(**generated),
+                SeatReservation.objects.filter(**shows),
+                WaitlistEntry.objects.filter(**shows),
+                WaitingRoomTicket.objects.filter(**shows),
+                Seat.objects.filter(**shows),
+                TrendingBucket.objects.filter(**generated),
+                Theater.objects.filter(**generated),
+            ):
+                queryset._raw_delete(queryset.db)
+            Movie.objects.filter(name__startswith=PREFIX).delete()
+            bump_version()  # raw deletes send no signals
+        user_ids = list(User.objects.filter(username__startswith=PREFIX).values_list('id', flat=True))
+        for i in range(0, len(user_ids), self.batch_size):
+            User.objects.filter(id__in=user_ids[i:i + self.batch_size]).delete()
+        self.stdout.write('Cleared previously generated data')
+
+    def _movies(self, rng, count):
+        """[(id, ticket_price, popularity)], most popular first."""
+        Movie.objects.bulk_create([
+            Movie(
+                name=f'{PREFIX}movie-{i:04d}',
+                genre=rng.choice(GENRE_CHOICES)[0],
+                language=rng.choice(LANGUAGE_CHOICES)[0],
+                rating=round(rng.uniform(4.0, 9.5), 1),
+                ticket_price=rng.choice(TICKET_PRICES),
+            )
+            for i in range(count)
+        ], batch_size=self.batch_size)
+        rows = Movie.objects.filter(name__startswith=PREFIX).order_by('name').values_list('id', 'ticket_price')
+        return [(movie_id, price, 1 / (rank + 1) ** 1.1) for rank, (movie_id, price) in enumerate(rows)]
+
+    def _users(self, count):
+        password = make_password(None)  # unusable: generated users can't log in
+        for i in range(0, count, self.batch_size):
+            User.objects.bulk_create([
+                User(username=f'{PREFIX}user{n}', email=f'{PREFIX}user{n}@example.com', password=password)
+                for n in range(i, min(i + self.batch_size, count))
+            ])
+        return list(User.objects.filter(username__startswith=PREFIX).order_by('id').values_list('id', flat=True))
+
+    def _shows(self, rng, spec, movies, start_date):
+        """[(theater_id, movie_id, ticket_price, occupancy, time)] in creation order."""
+        popularity = [weight for _, _, weight in movies]
+        mean = sum(popularity) / len(popularity)
+        cum_weights = list(itertools.accumulate(popularity))
+        plan = []
+        for day in range(spec['days']):
+            date = start_date + datetime.timedelta(days=day)
+            weekend = WEEKEND_DEMAND if date.weekday() >= 5 else 1.0
+            for venue in range(spec['venues']):
+                for hour, minute, demand in SHOW_SLOTS[-spec['shows_per_day']:]:
+                    movie_id, price, weight = rng.choices(movies, cum_weights=cum_weights)[0]
+                    occupancy = BASE_OCCUPANCY * (weight / mean) ** 0.5 * demand * weekend * rng.uniform(0.7, 1.3)
+                    show_time = timezone.make_aware(datetime.datetime.combine(date, datetime.time(hour, minute)))
+                    plan.append((venue, movie_id, price, min(occupancy, MAX_OCCUPANCY), show_time))
+
+        Theater.objects.bulk_create([
+            Theater(name=f'{PREFIX}venue-{venue:03d}', movie_id=movie_id, time=show_time,
+                    waiting_room=occupancy >= HOT_OCCUPANCY)
+            for venue, movie_id, _, occupancy, show_time in plan
+        ], batch_size=self.batch_size)
+        theater_ids = Theater.objects.filter(movie__name__startswith=PREFIX).order_by('id').values_list('id', flat=True)
+        return [
+            (theater_id, movie_id, price, occupancy, show_time)
+            for theater_id, (_, movie_id, price, occupancy, show_time) in zip(theater_ids, plan)
+        ]
+
+    def _seats(self, rng, spec, shows, users):
+        """Seat grids plus bookings and holds, a few shows per transaction."""
+        labels = [f'{chr(65 + row)}{col}' for row in range(spec['rows']) for col in range(1, spec['columns'] + 1)]
+        shows_per_batch = max(1, self.batch_size // len(labels))
+        now = timezone.now()
+        expires_at = now + timezone.timedelta(minutes=RESERVATION_TIMEOUT_MINUTES)
+        counts = {'seats': 0, 'orders': 0, 'bookings': 0, 'holds': 0}
+
+        for i in range(0, len(shows), shows_per_batch):
+            batch = shows[i:i + shows_per_batch]
+            ordinal = {show[0]: i + n for n, show in enumerate(batch)}  # stable across runs, unlike ids
+            prices = {show[0]: show[2] for show in batch}
+            seat_rows, taken, orders = [], {}, {}
+            for theater_id, movie_id, price, occupancy, show_time in batch:
+                upcoming = show_time > now
+                group_left, payment_id = 0, None
+                for label in labels:
+                    if rng.random() < occupancy:
+                        # Consecutive booked seats are one order of a small group; a power
+                        # law makes a minority of users buy most tickets
+                        if not group_left:
+                            group_left, payment_id = rng.choice(GROUP_SIZES), f'{PREFIX}{ordinal[theater_id]}-{label}'
+                            orders[payment_id] = [users[int(len(users) * rng.random() ** 3)], movie_id, theater_id, 0, 0]
+                        group_left -= 1
+                        orders[payment_id][3] += 1
+                        orders[payment_id][4] += price
+                        taken[theater_id, label] = ('booked', orders[payment_id][0], payment_id)
+                    elif rng.random() < HOLD_RATE:
+                        # Drawn for past shows too, so the stream doesn't depend on the time of day
+                        holder = users[rng.randrange(len(users))]
+                        if upcoming:
+                            taken[theater_id, label] = ('held', holder, None)
+                    seat_rows.append((theater_id, label, (theater_id, label) in taken))
+
+            with transaction.atomic():
+                self._insert(Seat, ['theater_id', 'seat_number', 'is_booked'], seat_rows)
+                self._insert(Order, ['user_id', 'movie_id', 'theater_id', 'seat_count', 'total', 'payment_id', 'created_at'],
+                             [(*order, payment_id, now) for payment_id, order in orders.items()])
+                order_ids = dict(Order.objects.filter(theater_id__in=ordinal).values_list('payment_id', 'id'))
+                bookings, holds = [], []
+                seats = Seat.objects.filter(theater_id__in=ordinal, is_booked=True)
+                for seat_id, theater_id, label in seats.values_list('id', 'theater_id', 'seat_number'):
+                    kind, user_id, payment_id = taken[theater_id, label]
+                    if kind == 'booked':
+                        bookings.append((order_ids[payment_id], user_id, seat_id, orders[payment_id][1], theater_id, now,
+                                         prices[theater_id], 'completed', payment_id))
+                    else:
+                        holds.append((user_id, seat_id, theater_id, expires_at, now))
+                self._insert(Booking, ['order_id', 'user_id', 'seat_id', 'movie_id', 'theater_id', 'booked_at', 'amount',
+                                       'payment_status', 'payment_id'], bookings)
+                self._insert(SeatReservation, ['user_id', 'seat_id', 'theater_id', 'expires_at', 'created_at'], holds)
+
+            counts['orders'] += len(orders)
+            counts['seats'] += len(seat_rows)
+            counts['bookings'] += len(bookings)
+            counts['holds'] += len(holds)
+            self.stdout.write(f"  {min(i + shows_per_batch, len(shows))}/{len(shows)} shows, {counts['seats']} seats")
+        return counts
+
+    def _insert(self, model, fields, rows):
+        if not rows:
+            return
+        if not self.use_copy:
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in rows], batch_size=self.batch_size,
+            )
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer,
+            )
@@ -0,0 +1,29 @@
+"""Turn captured payments from the webhook inbox (PaymentEvent) into bookings."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.payments import process_events
+
+
+class Command(BaseCommand):
+    help = 'Book captured payments recorded by the payment webhook, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            outcomes = process_events(batch_size=options['batch_size'])
+            for outcome, count in outcomes.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            if outcomes:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        summary = ', '.join(f'{k}={v}' for k, v in sorted(totals.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Processed payment events: {summary}'))
@@ -0,0 +1,60 @@
+"""Report per-module import time for a cold Django start (python -X importtime)."""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_CODE = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def run_importtime(profile):
+    """Boot Django in a fresh interpreter and return [(module, self_us, cumulative_us)]."""
+    env = dict(os.environ, DJANGO_APP_PROFILE=profile)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'bookmyseat.settings')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr else 'startup failed')
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profile import time of a cold Django startup, per module and per top-level package.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=['full', 'public'], default='full',
+                            help='App profile to boot (see settings.APP_PROFILE).')
+        parser.add_argument('--top', type=int, default=20, help='Rows to show per table.')
+
+    def handle(self, *args, **options):
+        rows = run_importtime(options['profile'])
+        top = options['top']
+
+        total_us = sum(self_us for _, self_us, _ in rows)
+        self.stdout.write(f"Profile '{options['profile']}': {len(rows)} modules, {total_us / 1000:.1f} ms total import time\n")
+
+        self.stdout.write('Slowest modules (cumulative ms):')
+        for module, _, cumulative_us in sorted(rows, key=lambda r: -r[2])[:top]:
+            self.stdout.write(f'  {cumulative_us / 1000:9.1f}  {module}')
+
+        packages = defaultdict(int)
+        for module, self_us, _ in rows:
+            packages[module.split('.')[0]] += self_us
+        self.stdout.write('\nBy top-level package (self ms):')
+        for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+            self.stdout.write(f'  {self_us / 1000:9.1f}  {package}')
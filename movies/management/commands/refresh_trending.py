@@ -0,0 +1,44 @@
+"""Prune expired trending buckets and re-cache the trending list."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from movies.models import Booking, TrendingBucket
+from movies.trending import bucket_start, prune_buckets, refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Prune old trending buckets and refresh the cached trending list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help='Rebuild buckets inside the window from existing bookings (one-off).')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self._backfill()
+        pruned = prune_buckets()
+        ids = refresh_trending()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} buckets; trending movie ids: {ids}'))
+
+    def _backfill(self):
+        window_start = timezone.now() - timezone.timedelta(hours=getattr(settings, 'TRENDING_WINDOW_HOURS', 72))
+        rows = (
+            Booking.objects.filter(booked_at__gte=window_start)
+            .annotate(hour=TruncHour('booked_at'))
+            .values('movie_id', 'hour')
+            .annotate(n=Count('id'))
+        )
+        buckets = {}
+        for row in rows:
+            key = (row['movie_id'], bucket_start(row['hour']))
+            buckets[key] = buckets.get(key, 0) + row['n']
+
+        TrendingBucket.objects.filter(bucket_start__gte=window_start).delete()
+        TrendingBucket.objects.bulk_create([
+            TrendingBucket(movie_id=movie_id, bucket_start=start, bookings=n)
+            for (movie_id, start), n in buckets.items()
+        ])
+        self.stdout.write(f'Backfilled {len(buckets)} buckets')
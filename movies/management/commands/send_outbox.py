@@ -0,0 +1,27 @@
+"""Send queued emails (OutboundEmail) in batches."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.utils import send_outbox
+
+
+class Command(BaseCommand):
+    help = 'Render and send queued emails in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            sent = send_outbox(batch_size=options['batch_size'])
+            total += sent
+            if sent:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {total} emails'))
@@ -0,0 +1,186 @@
+"""Flash-sale stress harness: many users racing for the same show.
+
+Each virtual user runs reserve_seats -> payment_success through the Django
+test client from a thread or process pool, then the harness checks booking
+invariants and reports throughput and latency. Point DATABASE_URL at the
+database under test (SQLite file or local Postgres); data is created under a
+"stress-" prefix and removed with --cleanup.
+"""
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from movies.models import Booking, Movie, Seat, SeatReservation, Theater
+
+PREFIX = 'stress-'
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def payment_outcome(response, payment_id):
+    """Classify a payment_success response: every outcome redirects, so look at where to and at the bookings."""
+    if response.status_code != 302:
+        return f'http-{response.status_code}'
+    if Booking.objects.filter(payment_id=payment_id, payment_status='completed').exists():
+        return 'booked'
+    # SeatsTaken sends the buyer back to the show list; the profile without a booking means not yet confirmed
+    return 'unconfirmed' if response.url == reverse('profile') else 'seats-taken'
+
+
+def run_virtual_user(user_id, theater_id, seat_ids, seats_per_user, seed):
+    """One buyer: pick seats (skewed to the front rows), hold them, pay.
+
+    Returns a dict of step latencies and outcome; safe to call from threads or
+    worker processes.
+    """
+    rng = random.Random(seed)
+    # Hot-seat skew: most buyers want the first third of the hall
+    hot = seat_ids[:max(1, len(seat_ids) // 3)]
+    pool = hot if rng.random() < 0.8 else seat_ids
+    wanted = rng.sample(pool, min(seats_per_user, len(pool)))
+
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(User.objects.get(pk=user_id))
+    result = {'hold_ms': None, 'pay_ms': None, 'outcome': 'error'}
+    try:
+        start = time.perf_counter()
+        response = client.post(reverse('reserve_seats', args=[theater_id]), {'seats': wanted})
+        result['hold_ms'] = (time.perf_counter() - start) * 1000
+        if response.status_code != 302:
+            result['outcome'] = 'lost' if response.status_code == 200 else f'http-{response.status_code}'
+            return result
+
+        hold = response.url.split('hold=', 1)[1]
+        payment_id = f'{PREFIX}{user_id}'
+        start = time.perf_counter()
+        response = client.post(reverse('payment_success'), {'hold': hold, 'payment_id': payment_id, 'amount': 0})
+        result['pay_ms'] = (time.perf_counter() - start) * 1000
+        result['outcome'] = payment_outcome(response, payment_id)
+    except Exception as e:
+        result['outcome'] = f'error-{type(e).__name__}'
+    finally:
+        connections.close_all()
+    return result
+
+
+def _process_init():
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Simulate a release-day rush on one show and verify booking invariants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Virtual buyers.')
+        parser.add_argument('--rows', type=int, default=10)
+        parser.add_argument('--columns', type=int, default=20)
+        parser.add_argument('--seats-per-user', type=int, default=2)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--cleanup', action='store_true', help='Delete stress data afterwards.')
+
+    def handle(self, *args, **options):
+        theater, seat_ids, user_ids = self._setup(options)
+        self.stdout.write(
+            f"Show {theater.pk}: {len(seat_ids)} seats, {len(user_ids)} buyers, "
+            f"{options['workers']} {options['mode']} workers"
+        )
+
+        jobs = [
+            (user_id, theater.pk, seat_ids, options['seats_per_user'], options['seed'] + i)
+            for i, user_id in enumerate(user_ids)
+        ]
+        if options['mode'] == 'thread':
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+        else:
+            connections.close_all()  # never share a connection across fork
+            executor = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_process_init,
+            )
+
+        started = time.perf_counter()
+        with executor:
+            results = list(executor.map(run_virtual_user, *zip(*jobs)))
+        elapsed = time.perf_counter() - started
+
+        self._report(results, elapsed)
+        problems = self._check_invariants(theater)
+        if options['cleanup']:
+            self._cleanup()
+        if problems:
+            raise CommandError('Invariant violations:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Invariants hold: no double bookings, no orphaned holds.'))
+
+    def _setup(self, options):
+        movie, _ = Movie.objects.get_or_create(name=f'{PREFIX}movie', defaults={'ticket_price': 200})
+        theater = Theater.objects.create(name=f'{PREFIX}hall', movie=movie, time=timezone.now() + timezone.timedelta(days=1))
+        Seat.objects.bulk_create([
+            Seat(theater=theater, seat_number=f'{chr(65 + row)}{col}')
+            for row in range(options['rows'])
+            for col in range(1, options['columns'] + 1)
+        ])
+        seat_ids = list(theater.seats.order_by('id').values_list('id', flat=True))
+
+        existing = set(User.objects.filter(username__startswith=PREFIX).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'{PREFIX}user{i}')
+            for i in range(options['users'])
+            if f'{PREFIX}user{i}' not in existing
+        ])
+        user_ids = list(
+            User.objects.filter(username__startswith=PREFIX).order_by('id').values_list('id', flat=True)[:options['users']]
+        )
+        return theater, seat_ids, user_ids
+
+    def _report(self, results, elapsed):
+        outcomes = {}
+        for r in results:
+            outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+        holds = [r['hold_ms'] for r in results if r['hold_ms'] is not None]
+        pays = [r['pay_ms'] for r in results if r['pay_ms'] is not None]
+
+        self.stdout.write(f'Finished {len(results)} buyers in {elapsed:.2f}s')
+        self.stdout.write('Outcomes: ' + ', '.join(f'{k}={v}' for k, v in sorted(outcomes.items())))
+        self.stdout.write(f'Holds/sec: {len(holds) / elapsed:.1f}')
+        self.stdout.write(f'Hold latency ms: p50 {_percentile(holds, 50):.1f}, p99 {_percentile(holds, 99):.1f}')
+        self.stdout.write(f'Pay latency ms:  p50 {_percentile(pays, 50):.1f}, p99 {_percentile(pays, 99):.1f}')
+
+    def _check_invariants(self, theater):
+        problems = []
+        doubles = (
+            Booking.objects.filter(theater=theater, payment_status='completed')
+            .values('seat').annotate(n=Count('id')).filter(n__gt=1)
+        )
+        if doubles.exists():
+            problems.append(f'{doubles.count()} seats with more than one booking')
+
+        orphans = SeatReservation.objects.filter(theater=theater).count()
+        if orphans:
+            problems.append(f'{orphans} holds left behind after every buyer finished')
+
+        phantom = theater.seats.filter(is_booked=True).exclude(bookings__payment_status='completed').count()
+        if phantom:
+            problems.append(f'{phantom} seats marked booked without a booking or hold')
+        return problems
+
+    def _cleanup(self):
+        Movie.objects.filter(name__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
@@ -0,0 +1,85 @@
+"""Concurrency check for the rate limiter: many clients draining one bucket.
+
+Workers (threads, or processes when the default cache is shared between
+processes) call ratelimit.take() on the same bucket as fast as they can for
+--duration seconds. The token bucket must never admit more than
+burst + 1 + elapsed * rate requests in total, and must admit at least the
+burst; the command also reports the cost of a check.
+"""
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bookmyseat.ratelimit import take
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def drain(bucket, per_minute, burst, deadline):
+    """Hammer one bucket until the deadline: (admitted, latencies_ms)."""
+    admitted, latencies = 0, []
+    while time.time() < deadline:
+        started = time.perf_counter()
+        retry_after = take(bucket, per_minute, burst)
+        latencies.append((time.perf_counter() - started) * 1000)
+        admitted += not retry_after
+    return admitted, latencies
+
+
+def _process_init():
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Race many clients on one rate-limit bucket and check it never over-admits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-minute', type=int, default=600)
+        parser.add_argument('--burst', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--duration', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES['default']['BACKEND']
+        if options['mode'] == 'process' and backend.endswith('LocMemCache'):
+            raise CommandError('LocMemCache is per process; use --mode thread or a shared cache backend.')
+
+        bucket = f'stress:{uuid.uuid4().hex}'
+        per_minute, burst, workers = options['per_minute'], options['burst'], options['workers']
+        if options['mode'] == 'thread':
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('fork'), initializer=_process_init,
+            )
+
+        started = time.time()
+        deadline = started + options['duration']
+        with executor:
+            results = list(executor.map(drain, *zip(*[(bucket, per_minute, burst, deadline)] * workers)))
+        elapsed = time.time() - started
+
+        admitted = sum(count for count, _ in results)
+        latencies = [ms for _, worker_latencies in results for ms in worker_latencies]
+        limit = burst + 1 + int(elapsed * per_minute / 60)
+        self.stdout.write(
+            f"{workers} {options['mode']} workers, {len(latencies)} checks in {elapsed:.1f}s "
+            f"({backend.rsplit('.', 1)[-1]}): admitted {admitted}, allowed at most {limit}"
+        )
+        self.stdout.write(
+            f'check latency p50 {_percentile(latencies, 50):.3f} ms  p99 {_percentile(latencies, 99):.3f} ms'
+        )
+        if admitted > limit:
+            raise CommandError(f'Over-admitted: {admitted} > {limit}')
+        if admitted < burst:
+            raise CommandError(f'Under-admitted: {admitted} < burst of {burst}')
+        self.stdout.write(self.style.SUCCESS('Token bucket held under contention.'))
@@ -0,0 +1,37 @@
+"""Warm catalog, show and seat caches after a deploy (see movies/warmup.py)."""
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.warmup import cache_is_shared, site_host, warm
+
+
+class Command(BaseCommand):
+    help = 'Pre-populate catalog, movie detail, show listing, facet and seat availability caches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Parallel requests (default WARM_CACHES_WORKERS).')
+        parser.add_argument('--seat-hours', type=int, default=None,
+                            help='Warm seat availability for shows starting within this many hours.')
+        parser.add_argument('--max-seat-shows', type=int, default=None)
+        parser.add_argument('--shared-only', action='store_true',
+                            help='Do nothing unless the cache is shared between processes (for build scripts).')
+        parser.add_argument('--strict', action='store_true', help='Exit non-zero if any page failed to warm.')
+
+    def handle(self, *args, **options):
+        if options['shared_only'] and not cache_is_shared():
+            self.stdout.write('Cache is per-process; skipping (gunicorn workers warm themselves on start).')
+            return
+
+        report, elapsed = warm(
+            workers=options['workers'],
+            seat_hours=options['seat_hours'],
+            max_seat_shows=options['max_seat_shows'],
+        )
+        failed = 0
+        for name, entry in sorted(report.items()):
+            failed += entry['failed']
+            suffix = f", {entry['failed']} failed" if entry['failed'] else ''
+            self.stdout.write(f"  {name}: {entry['ok']} warmed{suffix}")
+        total = sum(entry['ok'] for entry in report.values())
+        self.stdout.write(self.style.SUCCESS(f"Warmed {total} cache entries for {site_host() or 'no SITE_URL'} in {elapsed:.2f}s"))
+        if failed and options['strict']:
+            raise CommandError(f'{failed} cache entries failed to warm')
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.19 on 2026-10-19 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_movie_external_image_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='poster_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='poster_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+    ]
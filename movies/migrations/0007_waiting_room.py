@@ -0,0 +1,34 @@
+# Generated by Django 3.2.19 on 2026-10-19 13:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movies', '0006_movie_poster_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theater',
+            name='waiting_room',
+            field=models.BooleanField(default=False, help_text='Hot show: queue buyers and admit them at WAITING_ROOM_ADMIT_PER_MINUTE'),
+        ),
+        migrations.CreateModel(
+            name='WaitingRoomTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('admitted_at', models.DateTimeField(blank=True, null=True)),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waiting_room_tickets', to='movies.theater')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('theater', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_waiting_room'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(db_index=True)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_buckets', to='movies.movie')),
+            ],
+            options={
+                'unique_together': {('movie', 'bucket_start')},
+            },
+        ),
+    ]
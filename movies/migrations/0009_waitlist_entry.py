@@ -0,0 +1,30 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movies', '0008_trending_bucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats_wanted', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('fulfilled_at', models.DateTimeField(blank=True, null=True)),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='movies.theater')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('theater', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_waitlist_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('template', models.CharField(max_length=100)),
+                ('context', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Refund',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reason', models.CharField(choices=[('user_cancelled', 'Cancelled by user'), ('show_cancelled', 'Show cancelled')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='theater',
+            name='is_cancelled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='payment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], default='completed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='seat',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='movies.seat'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('payment_status', 'completed')), fields=('seat',), name='unique_active_booking_per_seat'),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='booking',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='refund', to='movies.booking'),
+        ),
+    ]
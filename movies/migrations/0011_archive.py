@@ -0,0 +1,105 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# On PostgreSQL the booking archive is declaratively partitioned by show_time.
+# The partition key must be part of the primary key, so the table is created
+# with raw SQL there; other databases get a plain table from the model state.
+POSTGRES_ARCHIVED_BOOKING_SQL = [
+    """
+    CREATE TABLE movies_archivedbooking (
+        id bigserial NOT NULL,
+        original_id bigint NOT NULL,
+        user_id integer NULL,
+        movie_id bigint NULL,
+        movie_name varchar(255) NOT NULL,
+        show_original_id bigint NOT NULL,
+        theater_name varchar(255) NOT NULL,
+        show_time timestamp with time zone NOT NULL,
+        seat_number varchar(10) NOT NULL,
+        amount numeric(10, 2) NOT NULL,
+        payment_status varchar(20) NOT NULL,
+        payment_id varchar(255) NULL,
+        booked_at timestamp with time zone NOT NULL,
+        cancelled_at timestamp with time zone NULL,
+        refund_status varchar(20) NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, show_time)
+    ) PARTITION BY RANGE (show_time)
+    """,
+    "CREATE TABLE movies_archivedbooking_default PARTITION OF movies_archivedbooking DEFAULT",
+    "CREATE INDEX movies_archivedbooking_user_id ON movies_archivedbooking (user_id)",
+    "CREATE INDEX movies_archivedbooking_movie_id ON movies_archivedbooking (movie_id)",
+    "CREATE INDEX movies_archivedbooking_show_original_id ON movies_archivedbooking (show_original_id)",
+    "CREATE INDEX movies_archivedbooking_show_time ON movies_archivedbooking (show_time)",
+]
+
+
+def create_archived_booking_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_ARCHIVED_BOOKING_SQL:
+            schema_editor.execute(sql)
+    else:
+        schema_editor.create_model(apps.get_model('movies', 'ArchivedBooking'))
+
+
+def drop_archived_booking_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE movies_archivedbooking CASCADE")
+    else:
+        schema_editor.delete_model(apps.get_model('movies', 'ArchivedBooking'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movies', '0010_cancellations_and_refunds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedShow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('movie_name', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('time', models.DateTimeField(db_index=True)),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('seat_numbers', models.JSONField(default=list)),
+                ('booked_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('movie', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_shows', to='movies.movie')),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArchivedBooking',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('original_id', models.BigIntegerField()),
+                        ('movie_name', models.CharField(max_length=255)),
+                        ('show_original_id', models.BigIntegerField(db_index=True)),
+                        ('theater_name', models.CharField(max_length=255)),
+                        ('show_time', models.DateTimeField(db_index=True)),
+                        ('seat_number', models.CharField(max_length=10)),
+                        ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                        ('payment_status', models.CharField(max_length=20)),
+                        ('payment_id', models.CharField(blank=True, max_length=255, null=True)),
+                        ('booked_at', models.DateTimeField()),
+                        ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                        ('refund_status', models.CharField(blank=True, default='', max_length=20)),
+                        ('archived_at', models.DateTimeField(auto_now_add=True)),
+                        ('movie', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='movies.movie')),
+                        ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                    ],
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archived_booking_table, drop_archived_booking_table),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:08
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of movies.models.YOUTUBE_VIDEO_ID so later edits don't change this migration
+YOUTUBE_VIDEO_ID = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([\w-]{6,32})'
+)
+
+
+def backfill_trailer_video_ids(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    movies = []
+    for movie in Movie.objects.exclude(trailer_url__isnull=True).exclude(trailer_url='').only('id', 'trailer_url'):
+        match = YOUTUBE_VIDEO_ID.search(movie.trailer_url)
+        if match:
+            movie.trailer_video_id = match.group(1)
+            movies.append(movie)
+    Movie.objects.bulk_update(movies, ['trailer_video_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='trailer_video_id',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_trailer_video_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movies', '0012_movie_trailer_video_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_id', models.CharField(max_length=64, unique=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, db_index=True, default='', max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('reason', models.CharField(choices=[('staff', 'Requested by staff'), ('sampled', 'Sampled')], max_length=10)),
+                ('profile_file', models.CharField(blank=True, default='', max_length=255)),
+                ('stats_text', models.TextField(blank=True, default='')),
+                ('collapsed_stacks', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_profile_capture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('event_type', models.CharField(max_length=50)),
+                ('payment_id', models.CharField(blank=True, db_index=True, default='', max_length=100)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('outcome', models.CharField(blank=True, choices=[('booked', 'Booked'), ('duplicate', 'Already booked'), ('ignored', 'Ignored event type'), ('invalid', 'Invalid or expired hold'), ('amount_mismatch', 'Amount too low'), ('seats_taken', 'Seats no longer available'), ('failed', 'Failed')], default='', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Per-seat bookings of one user and show with the same payment id, made within this many
+# seconds of each other, were one purchase
+SAME_PURCHASE_SECONDS = 60
+USER_BATCH = 500
+
+
+def backfill_orders(apps, schema_editor):
+    Booking = apps.get_model('movies', 'Booking')
+    Order = apps.get_model('movies', 'Order')
+    user_ids = list(Booking.objects.filter(order__isnull=True).values_list('user_id', flat=True).distinct().order_by('user_id'))
+    for i in range(0, len(user_ids), USER_BATCH):
+        rows = (
+            Booking.objects.filter(order__isnull=True, user_id__in=user_ids[i:i + USER_BATCH])
+            .order_by('user_id', 'theater_id', 'payment_id', 'booked_at', 'id')
+            .values_list('id', 'user_id', 'movie_id', 'theater_id', 'payment_id', 'booked_at', 'amount', 'payment_status')
+        )
+        group = []
+        for row in rows:
+            if group and (row[1:5] != group[0][1:5] or (row[5] - group[-1][5]).total_seconds() > SAME_PURCHASE_SECONDS):
+                _create_order(Booking, Order, group)
+                group = []
+            group.append(row)
+        if group:
+            _create_order(Booking, Order, group)
+
+
+def _create_order(Booking, Order, group):
+    _, user_id, movie_id, theater_id, payment_id, booked_at, _, _ = group[0]
+    active = [row for row in group if row[7] == 'completed']
+    order = Order.objects.create(
+        user_id=user_id, movie_id=movie_id, theater_id=theater_id, payment_id=payment_id, created_at=booked_at,
+        seat_count=len(active), total=sum(row[6] for row in active),
+    )
+    Booking.objects.filter(id__in=[row[0] for row in group]).update(order=order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movies', '0014_payment_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat_count', models.PositiveSmallIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('payment_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movies.movie')),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='movies.theater')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='movies.order'),
+        ),
+        migrations.RunPython(backfill_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_order'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='booked_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='seatreservation',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0016_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='theater',
+            index=models.Index(fields=['movie', 'time'], name='theater_movie_time_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_show_sales(apps, schema_editor):
+    """Sales of shows archived before ArchivedShow kept them (their Orders were deleted with the show)."""
+    ArchivedBooking = apps.get_model('movies', 'ArchivedBooking')
+    ArchivedShow = apps.get_model('movies', 'ArchivedShow')
+    sales = (
+        ArchivedBooking.objects.filter(payment_status='completed').values('show_original_id')
+        .annotate(tickets=Count('id'), revenue=Sum('amount')).order_by()
+    )
+    for row in sales.iterator():
+        ArchivedShow.objects.filter(original_id=row['show_original_id']).update(
+            tickets_sold=row['tickets'], revenue=row['revenue'] or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0017_theater_movie_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='order_original_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedshow',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='archivedshow',
+            name='tickets_sold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_show_sales, migrations.RunPython.noop),
+    ]
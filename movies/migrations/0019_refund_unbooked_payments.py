@@ -0,0 +1,29 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0018_archive_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refund',
+            name='payment_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='refund',
+            name='booking',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='refund', to='movies.booking'),
+        ),
+        migrations.AlterField(
+            model_name='refund',
+            name='reason',
+            field=models.CharField(choices=[('user_cancelled', 'Cancelled by user'), ('show_cancelled', 'Show cancelled'), ('seats_taken', 'Seats taken before the payment was confirmed'), ('amount_mismatch', 'Paid amount did not match the seats'), ('invalid_hold', 'Payment without a valid seat hold')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.19 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0019_refund_unbooked_payments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waitingroomticket',
+            index=models.Index(fields=['theater', 'admitted_at'], name='waitingroom_theater_admit_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.19 on 2026-10-19 18:40
+
+import re
+
+from django.db import migrations
+
+# Frozen copy of movies.models.YOUTUBE_VIDEO_ID: only YouTube hosts, 11-character ids
+YOUTUBE_VIDEO_ID = re.compile(
+    r'^(?:https?://)?(?:[\w-]+\.)*'
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)'
+    r'([\w-]{11})(?![\w-])'
+)
+
+
+def reparse_trailer_video_ids(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    changed = []
+    for movie in Movie.objects.exclude(trailer_video_id='').only('id', 'trailer_url', 'trailer_video_id'):
+        match = YOUTUBE_VIDEO_ID.search(movie.trailer_url or '')
+        video_id = match.group(1) if match else ''
+        if video_id != movie.trailer_video_id:
+            movie.trailer_video_id = video_id
+            changed.append(movie)
+    Movie.objects.bulk_update(changed, ['trailer_video_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0020_waiting_room_admission_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(reparse_trailer_video_ids, migrations.RunPython.noop),
+    ]
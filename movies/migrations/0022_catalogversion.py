@@ -0,0 +1,28 @@
+# Generated by Django 3.2.19 on 2026-10-19 19:20
+
+import uuid
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    CatalogVersion = apps.get_model('movies', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1, defaults={'version': uuid.uuid4().hex})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0021_reparse_trailer_video_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
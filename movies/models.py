@@ -1,6 +1,11 @@
+import re
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.core.files.storage import default_storage
+
+from .posters import PLACEHOLDER_IMAGE_URL, poster_source, poster_srcset
 
 
 # Genre and Language choices for filtering
@@ -28,6 +33,20 @@ LANGUAGE_CHOICES = [
 ]
 
 
+# Host must be youtube.com (any subdomain), youtube-nocookie.com or youtu.be; ids are 11 characters
+YOUTUBE_VIDEO_ID = re.compile(
+    r'^(?:https?://)?(?:[\w-]+\.)*'
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)'
+    r'([\w-]{11})(?![\w-])'
+)
+
+
+def youtube_video_id(url):
+    """Video id from any common YouTube URL form, or '' for other URLs."""
+    match = YOUTUBE_VIDEO_ID.search(url or '')
+    return match.group(1) if match else ''
+
+
 class Movie(models.Model):
     name = models.CharField(max_length=255)
     image = models.ImageField(upload_to="movies/", blank=True, null=True)
@@ -38,29 +57,62 @@ class Movie(models.Model):
     genre = models.CharField(max_length=50, choices=GENRE_CHOICES, default='other')
     language = models.CharField(max_length=50, choices=LANGUAGE_CHOICES, default='english')
     trailer_url = models.URLField(blank=True, null=True, help_text="YouTube trailer URL")
+    # Parsed from trailer_url on save so pages don't re-parse it per render
+    trailer_video_id = models.CharField(max_length=32, blank=True, default='', editable=False)
     ticket_price = models.DecimalField(max_digits=8, decimal_places=2, default=150.00)
+    # Resized WebP posters, {width: storage name}; filled by movies.posters
+    poster_hash = models.CharField(max_length=40, blank=True, default='')
+    poster_derivatives = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.name
 
+    @property
+    def display_image_url(self):
+        """Best single poster URL: largest derivative, then the source picked by poster_source."""
+        if self.poster_derivatives:
+            largest = max(self.poster_derivatives, key=int)
+            return default_storage.url(self.poster_derivatives[largest])
+        source = poster_source(self)
+        if source == 'external':
+            return self.external_image_url
+        if source == 'image':
+            try:
+                return self.image.url
+            except Exception:
+                pass
+        return PLACEHOLDER_IMAGE_URL
+
+    @property
+    def poster_srcset(self):
+        """srcset attribute value for the poster derivatives ('' if none)."""
+        return poster_srcset(self.poster_derivatives) if self.poster_derivatives else ''
+
+    def save(self, *args, **kwargs):
+        self.trailer_video_id = youtube_video_id(self.trailer_url)
+        super().save(*args, **kwargs)
+
     def get_youtube_embed_url(self):
-        """Convert YouTube URL to embed format."""
-        if not self.trailer_url:
-            return None
-        url = self.trailer_url
-        if 'youtube.com/watch?v=' in url:
-            vid = url.split('v=')[1].split('&')[0]
-        elif 'youtu.be/' in url:
-            vid = url.split('youtu.be/')[1].split('?')[0]
-        else:
-            return url
-        return f'https://www.youtube.com/embed/{vid}'
+        """Embed URL for the trailer (non-YouTube URLs are returned unchanged)."""
+        if self.trailer_video_id:
+            return f'https://www.youtube.com/embed/{self.trailer_video_id}'
+        return self.trailer_url or None
+
+    @property
+    def trailer_thumbnail_url(self):
+        return f'https://i.ytimg.com/vi/{self.trailer_video_id}/hqdefault.jpg' if self.trailer_video_id else ''
 
 
 class Theater(models.Model):
     name = models.CharField(max_length=255)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='theaters')
     time = models.DateTimeField()
+    is_cancelled = models.BooleanField(default=False)
+    waiting_room = models.BooleanField(default=False, help_text="Hot show: queue buyers and admit them at WAITING_ROOM_ADMIT_PER_MINUTE")
+
+    class Meta:
+        # Upcoming shows of a movie (showtimes page, API) are ranges on this index
+        indexes = [models.Index(fields=['movie', 'time'], name='theater_movie_time_idx')]
 
     def __str__(self):
         return f'{self.name} - {self.movie.name} at {self.time}'
@@ -80,7 +132,7 @@ class SeatReservation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     seat = models.ForeignKey(Seat, on_delete=models.CASCADE)
     theater = models.ForeignKey(Theater, on_delete=models.CASCADE)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -90,20 +142,256 @@ class SeatReservation(models.Model):
         return f'{self.seat.seat_number} reserved by {self.user.username} until {self.expires_at}'
 
 
+class WaitlistEntry(models.Model):
+    """User waiting for seats on a sold-out show; served FIFO as seats are released."""
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    seats_wanted = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    fulfilled_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ['theater', 'user']
+
+    def __str__(self):
+        return f'{self.user.username} waiting for {self.seats_wanted} at {self.theater.name}'
+
+
+class TrendingBucket(models.Model):
+    """Bookings per movie per time bucket; recent buckets feed the trending rail."""
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='trending_buckets')
+    bucket_start = models.DateTimeField(db_index=True)
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['movie', 'bucket_start']
+
+    def __str__(self):
+        return f'{self.movie.name}: {self.bookings} bookings from {self.bucket_start}'
+
+
+class WaitingRoomTicket(models.Model):
+    """FIFO place in a hot show's waiting room; admission is derived from queue rank."""
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='waiting_room_tickets')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    admitted_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ['theater', 'user']
+        # Token bucket window and FIFO dispatch (movies/waiting_room.py)
+        indexes = [models.Index(fields=['theater', 'admitted_at'], name='waitingroom_theater_admit_idx')]
+
+    def __str__(self):
+        return f'{self.user.username} queued for {self.theater.name}'
+
+
+class Order(models.Model):
+    """One purchase: the seats bought together under one payment.
+
+    Its Bookings are the seat line items. seat_count and total cover the
+    still-active (not refunded) items, so history and revenue read one row
+    per purchase instead of one per seat.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='orders')
+    seat_count = models.PositiveSmallIntegerField(default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'Order {self.pk} by {self.user.username}: {self.seat_count} seats at {self.theater.name}'
+
+
 class Booking(models.Model):
     PAYMENT_STATUS = [
         ('pending', 'Pending'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('refunded', 'Refunded'),
     ]
+    # Seat line item of an order; user/movie/theater are repeated for the per-seat constraint and cancellations
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    seat = models.OneToOneField(Seat, on_delete=models.CASCADE, related_name='booking')
+    # One active (completed) booking per seat; refunded bookings keep their seat for history
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='bookings')
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     theater = models.ForeignKey(Theater, on_delete=models.CASCADE)
-    booked_at = models.DateTimeField(auto_now_add=True)
+    booked_at = models.DateTimeField(auto_now_add=True, db_index=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='completed')
     payment_id = models.CharField(max_length=255, blank=True, null=True)
+    cancelled_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['seat'], condition=models.Q(payment_status='completed'), name='unique_active_booking_per_seat',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Booking by {self.user.username} for {self.seat.seat_number} at {self.theater.name}'
+
+
+class Refund(models.Model):
+    """Refund queued for a cancelled booking, or for a captured payment that could not be booked.
+
+    The gateway refund is issued from here. Payments that never became a
+    booking have no booking, only the gateway payment_id.
+    """
+    STATUS = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+    REASONS = [
+        ('user_cancelled', 'Cancelled by user'),
+        ('show_cancelled', 'Show cancelled'),
+        ('seats_taken', 'Seats taken before the payment was confirmed'),
+        ('amount_mismatch', 'Paid amount did not match the seats'),
+        ('invalid_hold', 'Payment without a valid seat hold'),
+    ]
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='refund', null=True, blank=True)
+    payment_id = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    reason = models.CharField(max_length=20, choices=REASONS)
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        if self.booking_id is None:
+            return f'Refund of {self.amount} for payment {self.payment_id} ({self.status})'
+        return f'Refund of {self.amount} for booking {self.booking_id} ({self.status})'
+
+
+class OutboundEmail(models.Model):
+    """Queued email, rendered and sent in batches by the send_outbox command."""
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    template = models.CharField(max_length=100)
+    context = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.subject} -> {self.to}'
+
+
+class ArchivedShow(models.Model):
+    """A past show moved out of Theater/Seat by archive_past_shows.
+
+    The seat grid is kept compactly as a list of seat numbers instead of one
+    row per seat.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    movie = models.ForeignKey(Movie, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_shows')
+    movie_name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    time = models.DateTimeField(db_index=True)
+    is_cancelled = models.BooleanField(default=False)
+    seat_numbers = models.JSONField(default=list)
+    booked_count = models.PositiveIntegerField(default=0)
+    # Completed (not refunded) bookings at archive time, so sales figures survive the Order rows
+    tickets_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} - {self.movie_name} at {self.time} (archived)'
+
+
+class ArchivedBooking(models.Model):
+    """Denormalized booking of an archived show.
+
+    On PostgreSQL the table is range-partitioned by show_time (monthly
+    partitions, see movies/archive.py), so no foreign keys are enforced.
+    """
+    original_id = models.BigIntegerField()
+    # The Order this seat was bought in; archived bookings with the same id were one purchase
+    order_original_id = models.BigIntegerField(blank=True, null=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
+    movie = models.ForeignKey(Movie, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
+    movie_name = models.CharField(max_length=255)
+    show_original_id = models.BigIntegerField(db_index=True)
+    theater_name = models.CharField(max_length=255)
+    show_time = models.DateTimeField(db_index=True)
+    seat_number = models.CharField(max_length=10)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_status = models.CharField(max_length=20)
+    payment_id = models.CharField(max_length=255, blank=True, null=True)
+    booked_at = models.DateTimeField()
+    cancelled_at = models.DateTimeField(blank=True, null=True)
+    refund_status = models.CharField(max_length=20, blank=True, default='')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Archived booking {self.original_id}: {self.seat_number} at {self.theater_name}'
+
+
+class ProfileCapture(models.Model):
+    """Profile of one request, captured by bookmyseat.profiling.ProfilingMiddleware."""
+    REASONS = [
+        ('staff', 'Requested by staff'),
+        ('sampled', 'Sampled'),
+    ]
+    request_id = models.CharField(max_length=64, unique=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True, default='', db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    reason = models.CharField(max_length=10, choices=REASONS)
+    # pstats dump in default storage; summary and collapsed stacks are kept inline for the admin
+    profile_file = models.CharField(max_length=255, blank=True, default='')
+    stats_text = models.TextField(blank=True, default='')
+    collapsed_stacks = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
+
+    def delete_files(self):
+        if self.profile_file:
+            default_storage.delete(self.profile_file)
+
+
+class PaymentEvent(models.Model):
+    """Inbox of verified payment gateway webhooks, one row per gateway event id.
+
+    The webhook only records the event; movies.payments turns captured
+    payments into bookings in batches (process_payments command).
+    """
+    OUTCOMES = [
+        ('booked', 'Booked'),
+        ('duplicate', 'Already booked'),
+        ('ignored', 'Ignored event type'),
+        ('invalid', 'Invalid or expired hold'),
+        ('amount_mismatch', 'Amount too low'),
+        ('seats_taken', 'Seats no longer available'),
+        ('failed', 'Failed'),
+    ]
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=50)
+    payment_id = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOMES, blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f'{self.event_type} {self.payment_id or self.event_id}'
+
+
+class CatalogVersion(models.Model):
+    """Single row whose value changes on every Movie/Theater write; see movies.snapshots."""
+    version = models.CharField(max_length=32)
 
     def __str__(self):
-        return f'Booking by {self.user.username} for {self.seat.seat_number} at {self.theater.name}'
\ No newline at end of file
+        return self.version
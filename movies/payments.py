@@ -0,0 +1,220 @@
+"""Payment gateway webhooks (Razorpay) and turning captured payments into bookings.
+
+The webhook only verifies the signature and records the event in the
+PaymentEvent inbox, keyed by the gateway's event id, so retried deliveries
+are acknowledged without doing any work twice. process_events() books
+captured payments in batches (process_payments command); payment_success
+runs it for the buyer's own payment so the confirmation is usually
+immediate. The hold token travels in the payment's notes, and a payment id
+is only ever booked once, whoever gets to it first. A captured payment that
+can't be booked (seats gone, short amount, bad hold) gets a pending Refund.
+"""
+import hashlib
+import hmac
+import json
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bookmyseat import metrics
+from .holds import hold_max_age, read_hold
+from .models import Booking, Order, PaymentEvent, Refund, Seat, SeatReservation
+from .snapshots import get_show
+from .trending import record_bookings
+from .utils import send_booking_confirmation_email
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_EVENTS = {'payment.captured'}
+# Captured payments with these outcomes kept the buyer's money without booking; they get a Refund
+REFUND_REASONS = {'seats_taken': 'seats_taken', 'amount_mismatch': 'amount_mismatch', 'invalid': 'invalid_hold'}
+# Events that fail this many times stay in the inbox with their error but are no longer retried
+MAX_ATTEMPTS = 5
+
+
+class SeatsTaken(Exception):
+    """A seat in the hold was booked by someone else."""
+
+
+def webhook_secret():
+    return getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', '')
+
+
+def webhooks_enabled():
+    """True when bookings for gateway payments come from verified webhooks, not the browser."""
+    return bool(webhook_secret())
+
+
+def sign(body, secret=None):
+    return hmac.new((secret or webhook_secret()).encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature):
+    return bool(signature) and hmac.compare_digest(sign(body), signature)
+
+
+def payment_entity(payload):
+    return ((payload.get('payload') or {}).get('payment') or {}).get('entity') or {}
+
+
+def record_event(body, event_id=''):
+    """Store a verified webhook body in the inbox. Returns False for a repeat delivery.
+
+    Raises ValueError for a body that isn't a JSON object.
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError('Webhook body is not a JSON object')
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                # Without the gateway's id header, identical bodies are the same event
+                event_id=event_id or hashlib.sha256(body).hexdigest(),
+                event_type=str(payload.get('event', ''))[:50],
+                payment_id=str(payment_entity(payload).get('id', ''))[:100],
+                payload=payload,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def confirm_seats(user, theater, seat_ids, payment_id, amount):
+    """Book the seats for one payment as an Order, all or none. Returns the order.
+
+    Seats still held by the user are booked; seats whose hold already
+    expired (or that were never held, for direct booking) are claimed if
+    nobody else took them. Raises SeatsTaken otherwise.
+    """
+    seat_ids = sorted(set(seat_ids))
+    seats = list(Seat.objects.filter(id__in=seat_ids, theater=theater).order_by('id'))
+    if not seats or len(seats) != len(seat_ids):
+        raise SeatsTaken()
+    held = SeatReservation.objects.filter(seat_id__in=seat_ids, theater=theater, user=user)
+    held_ids = set(held.values_list('seat_id', flat=True))
+    unheld = set(seat_ids) - held_ids
+    # Writes first, so SQLite takes the write lock up front instead of failing to upgrade a read
+    with transaction.atomic():
+        if held_ids and held.delete()[0] != len(held_ids):
+            raise SeatsTaken()  # a hold expired and was released meanwhile
+        if unheld and Seat.objects.filter(id__in=unheld, is_booked=False).update(is_booked=True) != len(unheld):
+            raise SeatsTaken()
+        order = Order.objects.create(
+            user=user, movie=theater.movie, theater=theater, seat_count=len(seats), total=amount * len(seats),
+            payment_id=payment_id,
+        )
+        try:
+            with transaction.atomic():
+                Booking.objects.bulk_create([
+                    Booking(order=order, user=user, seat=seat, movie=theater.movie, theater=theater, amount=amount,
+                            payment_status='completed', payment_id=payment_id)
+                    for seat in seats
+                ])
+        except IntegrityError:  # unique_active_booking_per_seat
+            raise SeatsTaken()
+        seat_numbers = ', '.join(seat.seat_number for seat in seats)
+        metrics.inc('bookings_committed_total', len(seats))
+        record_bookings(theater.movie_id, len(seats))
+        if user.email:
+            transaction.on_commit(lambda: send_booking_confirmation_email(
+                user=user,
+                movie_name=theater.movie.name,
+                theater_name=theater.name,
+                show_time=theater.time.strftime('%d %b %Y, %I:%M %p'),
+                seats=seat_numbers,
+                amount=order.total,
+                booking_id=payment_id or f'BMS-{order.pk}',
+            ))
+    return order
+
+
+def queue_refund(payment_id, amount, reason):
+    """Queue a refund for a captured payment that did not become a booking; at most one per payment."""
+    refund, _ = Refund.objects.get_or_create(
+        payment_id=payment_id, booking=None, defaults={'amount': amount, 'reason': reason},
+    )
+    return refund
+
+
+def process_event(event):
+    """Apply one inbox event. Returns its outcome (see PaymentEvent.OUTCOMES)."""
+    if event.event_type not in CAPTURE_EVENTS:
+        return 'ignored'
+    outcome = _book_payment(event)
+    if outcome in REFUND_REASONS and event.payment_id:
+        paid = Decimal(int(payment_entity(event.payload).get('amount') or 0)) / 100
+        queue_refund(event.payment_id, paid, REFUND_REASONS[outcome])
+        metrics.inc('payment_refunds_queued_total', reason=REFUND_REASONS[outcome])
+    return outcome
+
+
+def _book_payment(event):
+    handled = Order.objects.filter(payment_id=event.payment_id).exists() or Refund.objects.filter(
+        payment_id=event.payment_id, booking=None).exists()
+    if handled:
+        return 'duplicate'
+    payment = payment_entity(event.payload)
+    # A hold that had expired when the payment was reported can't book: the seats may be someone else's
+    hold = read_hold((payment.get('notes') or {}).get('hold'), max_age=hold_max_age(), as_of=event.received_at)
+    if not hold or not event.payment_id:
+        return 'invalid'
+    user = User.objects.filter(pk=hold['user_id']).first()
+    theater = get_show(hold['theater_id'])
+    if user is None or theater is None:
+        return 'invalid'
+
+    ticket_price = theater.movie.ticket_price or 0
+    if int(payment.get('amount') or 0) < int(ticket_price * 100) * len(set(hold['seat_ids'])):
+        return 'amount_mismatch'
+    try:
+        confirm_seats(user, theater, hold['seat_ids'], event.payment_id, ticket_price)
+    except SeatsTaken:
+        return 'seats_taken'
+    return 'booked'
+
+
+def process_events(batch_size=100, payment_id=None, max_attempts=MAX_ATTEMPTS):
+    """Process one batch of unprocessed inbox events, oldest first. Returns {outcome: count}."""
+    pending = PaymentEvent.objects.filter(processed_at__isnull=True, attempts__lt=max_attempts)
+    if payment_id is not None:
+        pending = pending.filter(payment_id=payment_id)
+    outcomes = {}
+    for event_pk in pending.order_by('id').values_list('id', flat=True)[:batch_size]:
+        with transaction.atomic():
+            # Claiming with an UPDATE locks the row, so concurrent workers (and payment_success)
+            # never apply the same event twice; a loser sees it processed and skips it
+            if not pending.filter(id=event_pk).update(attempts=F('attempts') + 1):
+                continue
+            event = PaymentEvent.objects.get(id=event_pk)
+            try:
+                with transaction.atomic():
+                    outcome = process_event(event)
+            except Exception as e:
+                logger.exception(f'Payment event {event.event_id} failed')
+                event.error = str(e)
+                outcome = 'failed'
+                if event.attempts < max_attempts:
+                    event.save(update_fields=['attempts', 'error'])
+                    metrics.inc('payment_events_total', outcome='retry')
+                    continue
+            event.outcome, event.processed_at = outcome, timezone.now()
+            event.save(update_fields=['attempts', 'error', 'outcome', 'processed_at'])
+        metrics.inc('payment_events_total', outcome=outcome)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return outcomes
+
+
+def payment_outcome(payment_id):
+    """Book a payment now if its webhook has arrived. Returns the outcome, or None if not yet known."""
+    if not payment_id:
+        return None
+    process_events(payment_id=payment_id)
+    return (
+        PaymentEvent.objects.filter(payment_id=payment_id, event_type__in=CAPTURE_EVENTS, processed_at__isnull=False)
+        .values_list('outcome', flat=True).first()
+    )
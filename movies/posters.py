@@ -0,0 +1,131 @@
+"""Poster derivative pipeline: resized WebP thumbnails with content-hashed names."""
+import hashlib
+import logging
+import os
+import urllib.parse
+import urllib.request
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Widths (px) generated for every poster; used to build the srcset
+POSTER_WIDTHS = getattr(settings, 'POSTER_WIDTHS', (160, 320, 480, 640))
+POSTER_QUALITY = getattr(settings, 'POSTER_QUALITY', 80)
+POSTER_UPLOAD_DIR = 'movies/posters'
+PLACEHOLDER_IMAGE_URL = 'https://via.placeholder.com/300x300?text=No+Image'
+
+
+def fetch_url(url, timeout=10):
+    """Default fetcher for external poster URLs. Returns raw bytes."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+def get_fetcher():
+    """Return the configured fetcher (settings.POSTER_FETCHER dotted path).
+
+    Local/dev setups can point this at fetch_from_disk to avoid the network.
+    """
+    path = getattr(settings, 'POSTER_FETCHER', None)
+    return import_string(path) if path else fetch_url
+
+
+def fetch_from_disk(url, timeout=None):
+    """Local fetcher: reads the URL's file name from POSTER_STUB_DIR instead of downloading it."""
+    name = os.path.basename(urllib.parse.urlparse(url).path)
+    if not name:
+        raise FileNotFoundError(f'No file name in poster URL {url}')
+    with open(os.path.join(settings.POSTER_STUB_DIR, name), 'rb') as stub:
+        return stub.read()
+
+
+def poster_source(movie):
+    """Where a movie's poster comes from: 'external', 'image' (upload) or None.
+
+    The external URL wins, both for derivatives and for Movie.display_image_url,
+    since uploads don't survive a redeploy on Vercel and a stale image.name
+    would otherwise render a broken poster.
+    """
+    if movie.external_image_url:
+        return 'external'
+    if movie.image and getattr(movie.image, 'name', None):
+        return 'image'
+    return None
+
+
+def build_derivatives(data, widths=POSTER_WIDTHS):
+    """Resize raw image bytes into WebP derivatives.
+
+    Returns (digest, {width: storage_name}). Names are derived from the source
+    content hash, so re-uploading the same image reuses the files already stored.
+    """
+    from PIL import Image
+
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    derivatives = {}
+    with Image.open(BytesIO(data)) as source:
+        source = source.convert('RGB')
+        for width in sorted(widths):
+            # Never upscale; small sources still get one derivative at their own size
+            target = min(width, source.width)
+            name = f'{POSTER_UPLOAD_DIR}/{digest}-{target}w.webp'
+            if not default_storage.exists(name):
+                height = round(source.height * target / source.width)
+                resized = source.resize((target, height), Image.LANCZOS)
+                buf = BytesIO()
+                resized.save(buf, 'WEBP', quality=POSTER_QUALITY, method=4)
+                default_storage.save(name, ContentFile(buf.getvalue()))
+            derivatives[str(target)] = name
+            if target < width:
+                break
+    return digest, derivatives
+
+
+def generate_poster_derivatives(movie, force=False):
+    """Generate derivatives for a movie from its upload or external URL.
+
+    Updates poster_hash/poster_derivatives on the instance and in the DB.
+    Returns True if derivatives were (re)generated.
+    """
+    source = poster_source(movie)
+    if source == 'external':
+        data = get_fetcher()(movie.external_image_url)
+    elif source == 'image':
+        movie.image.open('rb')
+        try:
+            data = movie.image.read()
+        finally:
+            movie.image.close()
+    else:
+        if movie.poster_derivatives:
+            movie.poster_hash, movie.poster_derivatives = '', {}
+            type(movie).objects.filter(pk=movie.pk).update(poster_hash='', poster_derivatives={})
+        return False
+
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    if digest == movie.poster_hash and movie.poster_derivatives and not force:
+        return False
+
+    digest, derivatives = build_derivatives(data)
+    movie.poster_hash = digest
+    movie.poster_derivatives = derivatives
+    type(movie).objects.filter(pk=movie.pk).update(poster_hash=digest, poster_derivatives=derivatives)
+    return True
+
+
+def derivative_urls(derivatives):
+    """{width: public URL} for a {width: storage_name} mapping, narrowest first."""
+    return {
+        width: default_storage.url(name)
+        for width, name in sorted(derivatives.items(), key=lambda item: int(item[0]))
+    }
+
+
+def poster_srcset(derivatives):
+    """Build an HTML srcset string from a {width: storage_name} mapping."""
+    return ', '.join(f'{url} {width}w' for width, url in derivative_urls(derivatives).items())
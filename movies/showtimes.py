@@ -0,0 +1,104 @@
+"""Upcoming showtimes for a movie, one day at a time.
+
+The shows page lists a single day (?date=, else the first day with shows),
+grouped by venue, plus a picker of the days with shows in the
+SHOWTIME_PICKER_DAYS starting from there.
+Every query is a range on the (movie, time) index, and each day's schedule
+is cached for SHOWTIME_CACHE_SECONDS under the snapshot catalog version, so
+any Movie/Theater change shows up at once and the page costs the same
+however many past shows the movie has. Shows that already started (and
+days whose shows all did) are dropped from the cached values when read.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookmyseat import metrics
+from .models import Theater
+from .snapshots import current_version
+
+
+def cache_seconds():
+    return getattr(settings, 'SHOWTIME_CACHE_SECONDS', 60)
+
+
+def picker_days():
+    return getattr(settings, 'SHOWTIME_PICKER_DAYS', 7)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _cached(key, load):
+    key = f'showtimes:{current_version()}:{key}'
+    value = cache.get(key)
+    metrics.cache_lookup('showtimes', value is not None)
+    if value is None:
+        value = load()
+        cache.set(key, value, cache_seconds())
+    return value
+
+
+def upcoming_shows(movie_id, start, end=None):
+    """Non-cancelled shows of a movie starting from ``start`` (and before ``end``)."""
+    shows = Theater.objects.filter(movie_id=movie_id, is_cancelled=False, time__gte=start)
+    return shows if end is None else shows.filter(time__lt=end)
+
+
+def selected_day(request, dates):
+    """The ?date= day; the first picker date (or today) when it is missing, malformed or past."""
+    today = timezone.localdate()
+    try:
+        day = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        day = None
+    if day and day >= today:
+        return day
+    return dates[0] if dates else today
+
+
+def show_dates(movie_id):
+    """Dates with shows that haven't all started, in the picker window from the next show's day."""
+    today = timezone.localdate()
+
+    def load():
+        upcoming = upcoming_shows(movie_id, _day_start(today))
+        first = upcoming.order_by('time').values_list('time', flat=True).first()
+        if first is None:
+            return []
+        start = timezone.localtime(first).date()
+        end = _day_start(start + datetime.timedelta(days=picker_days()))
+        days = upcoming.filter(time__lt=end).annotate(day=TruncDate('time')).values('day').annotate(last=Max('time'))
+        return [(row['day'], row['last']) for row in days.order_by('day')]
+
+    now = timezone.now()
+    return [day for day, last in _cached(f'days:{movie_id}:{today}', load) if last >= now]
+
+
+def day_schedule(movie_id, day):
+    """[(venue name, [show dicts by time])] for one day's shows that haven't started."""
+    def load():
+        shows = upcoming_shows(movie_id, _day_start(day), _day_start(day + datetime.timedelta(days=1)))
+        return list(shows.order_by('time', 'id').values('id', 'name', 'time', 'waiting_room'))
+
+    now = timezone.now()
+    venues = {}
+    for show in _cached(f'day:{movie_id}:{day}', load):
+        if show['time'] >= now:
+            venues.setdefault(show['name'], []).append(show)
+    return sorted(venues.items())
+
+
+def next_shows(movie_id, limit=10):
+    """The next ``limit`` shows from now, as show dicts."""
+    now = timezone.now()
+    shows = _cached(f'next:{movie_id}:{limit}', lambda: list(
+        upcoming_shows(movie_id, now).order_by('time', 'id').values('id', 'name', 'time', 'waiting_room')[:limit]
+    ))
+    return [show for show in shows if show['time'] >= now]
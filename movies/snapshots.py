@@ -0,0 +1,155 @@
+"""Per-process LRU of Movie and Theater (show) snapshots for the booking path.
+
+Every booking step resolves the same show and its movie. Snapshots are kept
+pickled, so each lookup returns a fresh instance that callers can use with
+the ORM (filters, foreign keys) without being able to change the cached copy.
+
+Entries carry the catalog version they were read under. The version is the
+CatalogVersion row in the primary database: any save or delete of a Movie
+or Theater (admin, cancel_show) writes a new random value in the same
+transaction, so every worker sees it exactly when the change commits and
+drops its stale entries on the next lookup. SnapshotVersionMiddleware reads
+the row at most once per request; outside a request it is read per lookup.
+"""
+import pickle
+import threading
+import uuid
+from collections import OrderedDict
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+from bookmyseat import metrics
+from bookmyseat.async_support import mark_async
+from .models import CatalogVersion, Movie, Theater
+
+VERSION_ROW = 1
+
+_request = Local()
+
+
+def max_entries():
+    return getattr(settings, 'SNAPSHOT_CACHE_SIZE', 2048)
+
+
+def _read_version():
+    return CatalogVersion.objects.filter(pk=VERSION_ROW).values_list('version', flat=True).first() or ''
+
+
+def current_version():
+    """Catalog version shared by all workers; memoized for the current request."""
+    if not getattr(_request, 'active', False):
+        return _read_version()
+    if _request.version is None:
+        _request.version = _read_version()
+    return _request.version
+
+
+def bump_version():
+    """Invalidate every worker's snapshots when the current transaction commits."""
+    version = uuid.uuid4().hex
+    if not CatalogVersion.objects.filter(pk=VERSION_ROW).update(version=version):
+        CatalogVersion.objects.get_or_create(pk=VERSION_ROW, defaults={'version': version})
+    # Later lookups in this request must see the write too
+    _request.version = None
+
+
+class SnapshotCache:
+    """Bounded LRU: key -> (version, pickled instance)."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return pickle.loads(entry[1])
+
+    def put(self, key, version, instance):
+        blob = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (version, blob)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries():
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+snapshots = SnapshotCache()
+
+
+def _lookup(key, load):
+    # Read the version before the database so a bump racing the load wins. Loads use
+    # the primary, like the version, so a lagging replica can't be cached as current.
+    version = current_version()
+    instance = snapshots.get(key, version)
+    metrics.cache_lookup('snapshots', instance is not None)
+    if instance is None:
+        instance = load()
+        if instance is not None:
+            snapshots.put(key, version, instance)
+    return instance
+
+
+def get_movie(movie_id):
+    """Movie snapshot, or None."""
+    return _lookup(('movie', movie_id), lambda: Movie.objects.using('default').filter(id=movie_id).first())
+
+
+def get_show(theater_id):
+    """Theater snapshot with its movie loaded, or None."""
+    return _lookup(('show', theater_id), lambda: Theater.objects.using('default').select_related('movie').filter(id=theater_id).first())
+
+
+def get_show_or_404(theater_id, include_cancelled=True):
+    theater = get_show(theater_id)
+    if theater is None or (theater.is_cancelled and not include_cancelled):
+        raise Http404('No Theater matches the given query.')
+    return theater
+
+
+def _catalog_changed(sender, **kwargs):
+    bump_version()
+
+
+for model in (Movie, Theater):
+    post_save.connect(_catalog_changed, sender=model, dispatch_uid=f'snapshots_{model.__name__}_save')
+    post_delete.connect(_catalog_changed, sender=model, dispatch_uid=f'snapshots_{model.__name__}_delete')
+
+
+class SnapshotVersionMiddleware:
+    """Read the catalog version at most once per request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = mark_async(self, get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        _request.active, _request.version = True, None
+        try:
+            return self.get_response(request)
+        finally:
+            _request.active = False
+
+    async def __acall__(self, request):
+        _request.active, _request.version = True, None
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.active = False
@@ -1,3 +1,861 @@
-from django.test import TestCase
+import base64
+import importlib
+import io
+import json
+import re
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+
+from . import async_views, payments, views
+from .holds import hold_max_age, make_hold_token, read_hold, read_hold_token
+from .management.commands.stress_booking import run_virtual_user
+from .models import (
+    ArchivedBooking, ArchivedShow, Booking, CatalogVersion, Movie, Order, OutboundEmail, PaymentEvent, Refund, Seat,
+    SeatReservation, Theater, TrendingBucket, WaitingRoomTicket, WaitlistEntry, youtube_video_id,
+)
+from .snapshots import current_version, get_show, snapshots
+from .showtimes import day_schedule, next_shows, show_dates
+from .posters import PLACEHOLDER_IMAGE_URL, generate_poster_derivatives
+from .trending import compute_scores, prune_buckets, record_bookings, trending_movies
+from .views import _release_expired_reservations, _seat_rows
+from .waiting_room import available_tokens, dispatch, join_queue, queue_status
+
+
+def make_show(seats=4, **kwargs):
+    movie = kwargs.pop('movie', None) or Movie.objects.create(name='Test Movie', ticket_price=Decimal('150.00'))
+    theater = Theater.objects.create(
+        name=kwargs.pop('name', 'Screen 1'), movie=movie,
+        time=kwargs.pop('time', timezone.now() + timezone.timedelta(days=1)), **kwargs,
+    )
+    Seat.objects.bulk_create([Seat(theater=theater, seat_number=f'A{n}') for n in range(1, seats + 1)])
+    return theater, list(theater.seats.order_by('id'))
+
+
+def png_bytes(width, height, color='red'):
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new('RGB', (width, height), color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def fake_fetch(url, timeout=None):
+    """POSTER_FETCHER for tests: a 800x1200 poster for any URL."""
+    return png_bytes(800, 1200, 'blue')
+
+
+@override_settings(POSTER_FETCHER='movies.tests.fake_fetch', RATE_LIMIT_ENABLED=False)
+class PosterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_upload_gets_every_width_without_upscaling(self):
+        movie = Movie.objects.create(name='Small')
+        movie.image.save('small.png', ContentFile(png_bytes(200, 300)))
+        self.assertTrue(generate_poster_derivatives(movie))
+        self.assertEqual(sorted(movie.poster_derivatives, key=int), ['160', '200'])
+        for name in movie.poster_derivatives.values():
+            self.assertTrue(default_storage.exists(name))
+        self.assertEqual(Movie.objects.get(pk=movie.pk).poster_hash, movie.poster_hash)
+
+    def test_same_source_is_not_rebuilt(self):
+        movie = Movie.objects.create(name='Fetched', external_image_url='https://img.example/poster.png')
+        self.assertTrue(generate_poster_derivatives(movie))
+        self.assertEqual(sorted(movie.poster_derivatives, key=int), ['160', '320', '480', '640'])
+        self.assertFalse(generate_poster_derivatives(movie))
+        self.assertTrue(generate_poster_derivatives(movie, force=True))
+
+    def test_removing_the_source_clears_derivatives(self):
+        movie = Movie.objects.create(name='Fetched', external_image_url='https://img.example/poster.png')
+        generate_poster_derivatives(movie)
+        movie.external_image_url = ''
+        self.assertFalse(generate_poster_derivatives(movie))
+        self.assertEqual(Movie.objects.get(pk=movie.pk).poster_derivatives, {})
+
+    def test_srcset_lists_widths_in_order(self):
+        movie = Movie(poster_derivatives={'480': 'p/a-480w.webp', '160': 'p/a-160w.webp'})
+        self.assertEqual(movie.poster_srcset, '/media/p/a-160w.webp 160w, /media/p/a-480w.webp 480w')
+        self.assertEqual(Movie().poster_srcset, '')
+
+    def test_display_image_url_precedence(self):
+        movie = Movie(poster_derivatives={'160': 'p/a-160w.webp', '640': 'p/a-640w.webp'},
+                      external_image_url='https://img.example/poster.png', image='movies/stale.png')
+        self.assertEqual(movie.display_image_url, '/media/p/a-640w.webp')
+        movie.poster_derivatives = {}
+        # External first: uploads don't survive a Vercel redeploy
+        self.assertEqual(movie.display_image_url, 'https://img.example/poster.png')
+        movie.external_image_url = ''
+        self.assertEqual(movie.display_image_url, '/media/movies/stale.png')
+        movie.image = None
+        self.assertEqual(movie.display_image_url, PLACEHOLDER_IMAGE_URL)
+
+    def test_api_returns_poster_urls(self):
+        movie = Movie.objects.create(name='Fetched', poster_derivatives={'160': 'p/a-160w.webp'})
+        detail = self.client.get(reverse('api_movie_detail', args=[movie.pk])).json()
+        self.assertEqual(detail['poster_derivatives'], {'160': '/media/p/a-160w.webp'})
+        listing = self.client.get(reverse('api_movies')).json()
+        self.assertEqual(listing['results'][0]['poster_derivatives'], {'160': '/media/p/a-160w.webp'})
+
+
+class HoldTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+
+    def test_round_trip(self):
+        token = make_hold_token(self.user, 7, ['3', 1])
+        self.assertEqual(read_hold_token(token, self.user), {'theater_id': 7, 'seat_ids': [3, 1]})
+        self.assertEqual(read_hold(token)['user_id'], self.user.pk)
+
+    def test_other_users_hold_is_rejected(self):
+        token = make_hold_token(self.user, 7, [1])
+        self.assertIsNone(read_hold_token(token, self.other))
+
+    def test_tampered_token_is_rejected(self):
+        token = make_hold_token(self.user, 7, [1])
+        self.assertIsNone(read_hold_token(token[:-2] + 'xx', self.user))
+        self.assertIsNone(read_hold_token('', self.user))
+
+    def test_expired_hold_is_rejected(self):
+        with mock.patch('time.time', return_value=time.time() - hold_max_age() - 60):
+            token = make_hold_token(self.user, 7, [1])
+        self.assertIsNone(read_hold_token(token, self.user, max_age=hold_max_age()))
+        self.assertIsNotNone(read_hold_token(token, self.user))
+
+    def test_age_is_judged_as_of_a_past_moment(self):
+        with mock.patch('time.time', return_value=time.time() - hold_max_age() - 60):
+            token = make_hold_token(self.user, 7, [1])
+        arrived = timezone.now() - timezone.timedelta(seconds=120)
+        self.assertIsNotNone(read_hold(token, max_age=hold_max_age(), as_of=arrived))
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ReserveSeatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.theater, self.seats = make_show()
+        self.user = User.objects.create_user('buyer', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+
+    def reserve(self, user, seats):
+        self.client.force_login(user)
+        return self.client.post(reverse('reserve_seats', args=[self.theater.pk]), {'seats': [s.pk for s in seats]})
+
+    def test_hold_claims_seats_and_redirects_with_token(self):
+        response = self.reserve(self.user, self.seats[:2])
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('payment_page', args=[self.theater.pk]), response['Location'])
+        self.assertEqual(Seat.objects.filter(is_booked=True).count(), 2)
+        self.assertEqual(SeatReservation.objects.filter(user=self.user).count(), 2)
+
+    def test_overlapping_hold_claims_nothing(self):
+        self.reserve(self.user, self.seats[:2])
+        response = self.reserve(self.other, self.seats[1:3])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already booked')
+        # All or none: the free seat in the request stays free
+        self.assertFalse(Seat.objects.get(pk=self.seats[2].pk).is_booked)
+        self.assertFalse(SeatReservation.objects.filter(user=self.other).exists())
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, RAZORPAY_WEBHOOK_SECRET='')
+class StressBookingOutcomeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.theater, self.seats = make_show(seats=1)
+        self.seat_ids = [s.pk for s in self.seats]
+        self.users = [User.objects.create_user(f'stress{n}', password='pw') for n in range(2)]
+        # The harness closes connections after each buyer; keep the test transaction open
+        patcher = mock.patch('movies.management.commands.stress_booking.connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def buy(self, user):
+        return run_virtual_user(user.pk, self.theater.pk, self.seat_ids, 1, seed=1)['outcome']
+
+    def test_booked_then_lost(self):
+        self.assertEqual(self.buy(self.users[0]), 'booked')
+        self.assertEqual(Booking.objects.filter(theater=self.theater).count(), 1)
+        self.assertEqual(self.buy(self.users[1]), 'lost')
+
+    def test_seats_taken_is_not_counted_as_booked(self):
+        with mock.patch.object(payments, 'confirm_seats', side_effect=payments.SeatsTaken):
+            self.assertEqual(self.buy(self.users[0]), 'seats-taken')
+
+
+@override_settings(WAITING_ROOM_BURST=5, WAITING_ROOM_ADMIT_PER_MINUTE=60, WAITING_ROOM_ADMISSION_MINUTES=10)
+class WaitingRoomTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.theater, _ = make_show(seats=0, waiting_room=True)
+        self.tickets = [
+            join_queue(self.theater, User.objects.create_user(f'fan{n}', password='pw')) for n in range(8)
+        ]
+
+    def admitted(self):
+        return WaitingRoomTicket.objects.filter(theater=self.theater, admitted_at__isnull=False)
+
+    def test_admits_at_most_one_burst(self):
+        self.assertEqual(dispatch(self.theater.pk), 5)
+        self.assertEqual(dispatch(self.theater.pk), 0)
+        self.assertEqual(set(self.admitted().values_list('id', flat=True)), {t.pk for t in self.tickets[:5]})
+
+    def test_tokens_refill_after_the_window(self):
+        dispatch(self.theater.pk)
+        now = timezone.now()
+        self.assertEqual(available_tokens(self.theater.pk, now), 0)
+        # burst / rate = 5 seconds to refill the whole bucket
+        self.assertEqual(available_tokens(self.theater.pk, now + timezone.timedelta(seconds=6)), 5)
+        self.admitted().update(admitted_at=now - timezone.timedelta(seconds=6))
+        self.assertEqual(dispatch(self.theater.pk), 3)
+
+    def test_queue_position_counts_tickets_ahead(self):
+        status = queue_status(self.tickets[7])
+        self.assertEqual((status['admitted'], status['position'], status['eta_seconds']), (False, 3, 3))
+        self.assertTrue(queue_status(self.tickets[0])['admitted'])
+
+    def test_expired_admission_rejoins_at_the_back(self):
+        dispatch(self.theater.pk)
+        first = self.tickets[0]
+        WaitingRoomTicket.objects.filter(pk=first.pk).update(admitted_at=timezone.now() - timezone.timedelta(minutes=11))
+        first.refresh_from_db()
+        ticket = join_queue(self.theater, first.user)
+        self.assertNotEqual(ticket.pk, first.pk)
+        self.assertIsNone(ticket.admitted_at)
+        self.assertGreater(ticket.pk, self.tickets[-1].pk)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class MovieShowsCursorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.theater, _ = make_show(seats=0)
+        self.movie = self.theater.movie
+        # Same start time, so the cursor has to break ties on id
+        for _ in range(4):
+            Theater.objects.create(name='Screen 2', movie=self.movie, time=self.theater.time)
+        self.url = reverse('api_movie_shows', args=[self.movie.pk])
+
+    def test_pages_cover_every_show_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(self.url, params).json()
+            seen += [show['id'] for show in page['results']]
+            cursor = page['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, list(self.movie.theaters.order_by('time', 'id').values_list('id', flat=True)))
+
+    def test_malformed_cursor_is_400(self):
+        moment = self.theater.time.isoformat()
+        for cursor in ['!!!', encode_cursor(5), encode_cursor(['x', 1]), encode_cursor(['2024-13-01T00:00:00', 1]),
+                       encode_cursor([moment, True]), encode_cursor([moment, '1'])]:
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+    def test_past_and_cancelled_shows_are_left_out(self):
+        Theater.objects.create(name='Matinee', movie=self.movie, time=timezone.now() - timezone.timedelta(hours=1))
+        Theater.objects.create(name='Cancelled', movie=self.movie, time=self.theater.time, is_cancelled=True)
+        names = {show['name'] for show in self.client.get(self.url).json()['results']}
+        self.assertEqual(names, {'Screen 1', 'Screen 2'})
+
+
+@override_settings(TRENDING_BUCKET_MINUTES=60, TRENDING_WINDOW_HOURS=72, TRENDING_HALF_LIFE_HOURS=12, TRENDING_SIZE=2)
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.old, self.fresh, self.quiet = [Movie.objects.create(name=name) for name in ('Old', 'Fresh', 'Quiet')]
+
+    def hours_ago(self, hours):
+        return self.now - timezone.timedelta(hours=hours)
+
+    def test_recent_bookings_outrank_older_ones(self):
+        record_bookings(self.old.pk, 10, at=self.hours_ago(36))  # three half-lives: worth 1.25
+        record_bookings(self.fresh.pk, 3, at=self.now)
+        record_bookings(self.quiet.pk, 1, at=self.now)
+        ranked = [movie_id for movie_id, _ in compute_scores(self.now)]
+        self.assertEqual(ranked, [self.fresh.pk, self.old.pk, self.quiet.pk])
+
+    def test_bookings_in_one_bucket_are_summed(self):
+        record_bookings(self.fresh.pk, 2, at=self.now)
+        record_bookings(self.fresh.pk, 3, at=self.now)
+        self.assertEqual(TrendingBucket.objects.get(movie=self.fresh).bookings, 5)
+
+    def test_window_and_size_limit_the_rail(self):
+        record_bookings(self.old.pk, 100, at=self.hours_ago(80))
+        record_bookings(self.fresh.pk, 3, at=self.now)
+        record_bookings(self.quiet.pk, 1, at=self.now)
+        self.assertEqual(trending_movies(), [self.fresh, self.quiet])
+        self.assertEqual(prune_buckets(), 1)
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.theater, self.seats = make_show(seats=3)
+        self.holder = User.objects.create_user('holder', password='pw')
+        Seat.objects.filter(theater=self.theater).update(is_booked=True)
+        SeatReservation.objects.bulk_create([
+            SeatReservation(user=self.holder, seat=seat, theater=self.theater,
+                            expires_at=timezone.now() - timezone.timedelta(minutes=1))
+            for seat in self.seats
+        ])
+
+    def wait(self, username, seats_wanted):
+        user = User.objects.create_user(username, email=f'{username}@example.com', password='pw')
+        return WaitlistEntry.objects.create(theater=self.theater, user=user, seats_wanted=seats_wanted)
+
+    def test_expired_holds_go_to_the_waitlist_first_in_first_out(self):
+        pair = self.wait('pair', 2)
+        self.wait('party', 3)
+        single = self.wait('single', 1)
+        self.wait('late', 1)
+        _release_expired_reservations()
+        held = dict(SeatReservation.objects.values_list('seat_id', 'user_id'))
+        self.assertEqual(held, {self.seats[0].pk: pair.user_id, self.seats[1].pk: pair.user_id,
+                                self.seats[2].pk: single.user_id})
+        # The party of three didn't fit, so the next entry that did got the last seat
+        fulfilled = set(WaitlistEntry.objects.filter(fulfilled_at__isnull=False).values_list('id', flat=True))
+        self.assertEqual(fulfilled, {pair.pk, single.pk})
+        self.assertEqual(Seat.objects.filter(theater=self.theater, is_booked=True).count(), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['pair@example.com', 'single@example.com'])
+
+    def test_seats_nobody_is_waiting_for_are_freed(self):
+        self.wait('single', 1)
+        _release_expired_reservations()
+        self.assertEqual(SeatReservation.objects.count(), 1)
+        self.assertEqual(Seat.objects.filter(theater=self.theater, is_booked=False).count(), 2)
+
+
+@override_settings(CANCELLATION_CUTOFF_HOURS=2)
+class CancellationTests(TestCase):
+    def setUp(self):
+        self.theater, self.seats = make_show(seats=4)
+        self.alice = User.objects.create_user('alice', email='alice@example.com', password='pw')
+        self.bob = User.objects.create_user('bob', email='bob@example.com', password='pw')
+        payments.confirm_seats(self.alice, self.theater, [s.pk for s in self.seats[:2]], 'pay_a', Decimal('150'))
+        payments.confirm_seats(self.bob, self.theater, [self.seats[2].pk], 'pay_b', Decimal('150'))
+
+    def cancel(self, user, booking):
+        self.client.force_login(user)
+        return self.client.post(reverse('cancel_booking', args=[booking.pk]))
+
+    def test_user_cancels_before_the_cutoff(self):
+        booking = Booking.objects.filter(user=self.alice).first()
+        with self.captureOnCommitCallbacks(execute=True):  # the seat is released after commit
+            self.cancel(self.alice, booking)
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_status, 'refunded')
+        self.assertEqual(Refund.objects.get(booking=booking).reason, 'user_cancelled')
+        self.assertFalse(Seat.objects.get(pk=booking.seat_id).is_booked)
+        order = booking.order
+        order.refresh_from_db()
+        self.assertEqual((order.seat_count, order.total), (1, Decimal('150')))
+        # A second cancel is a no-op
+        self.cancel(self.alice, booking)
+        self.assertEqual(Refund.objects.filter(booking=booking).count(), 1)
+
+    def test_no_cancelling_inside_the_cutoff(self):
+        Theater.objects.filter(pk=self.theater.pk).update(time=timezone.now() + timezone.timedelta(hours=1))
+        booking = Booking.objects.filter(user=self.alice).first()
+        self.cancel(self.alice, booking)
+        self.assertEqual(Booking.objects.get(pk=booking.pk).payment_status, 'completed')
+        self.assertFalse(Refund.objects.exists())
+
+    def test_only_the_owner_can_cancel(self):
+        booking = Booking.objects.filter(user=self.alice).first()
+        self.assertEqual(self.cancel(self.bob, booking).status_code, 404)
+
+    def test_show_cancellation_refunds_every_booking_and_emails_each_buyer_once(self):
+        admin = User.objects.create_superuser('boss', 'boss@example.com', 'pw')
+        already = Theater.objects.create(name='Gone', movie=self.theater.movie, time=self.theater.time, is_cancelled=True)
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:movies_theater_changelist'), {
+            'action': 'cancel_shows', '_selected_action': [self.theater.pk, already.pk],
+        }, follow=True)
+        self.assertContains(response, 'Cancelled 1 show(s); 3 booking(s) queued for refund. 1 already cancelled.')
+        self.assertEqual(Refund.objects.filter(reason='show_cancelled').count(), 3)
+        self.assertFalse(Booking.objects.filter(payment_status='completed').exists())
+        self.assertFalse(Seat.objects.filter(theater=self.theater, is_booked=True).exists())
+        self.assertEqual(sorted(OutboundEmail.objects.values_list('to', flat=True)), ['alice@example.com', 'bob@example.com'])
+
+
+@override_settings(ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user('buyer', password='pw')
+        movie = Movie.objects.create(name='Old Movie', ticket_price=Decimal('150.00'))
+        self.past = []
+        for days in (40, 35):
+            theater, seats = make_show(seats=3, movie=movie, time=timezone.now() - timezone.timedelta(days=days))
+            payments.confirm_seats(self.buyer, theater, [s.pk for s in seats[:2]], f'pay_{days}', Decimal('150'))
+            self.past.append(theater)
+        self.recent, _ = make_show(seats=3, movie=movie, time=timezone.now() - timezone.timedelta(days=1))
+
+    def archive(self, *args):
+        call_command('archive_past_shows', *args, stdout=io.StringIO())
+
+    def test_moves_past_shows_and_keeps_their_sales(self):
+        revenue = sum(Order.objects.values_list('total', flat=True))
+        self.archive('--batch-size', '1')
+        self.assertEqual(list(Theater.objects.values_list('id', flat=True)), [self.recent.pk])
+        self.assertFalse(Booking.objects.exists() or Order.objects.exists())
+        self.assertEqual(Seat.objects.exclude(theater=self.recent).count(), 0)
+
+        shows = ArchivedShow.objects.order_by('time')
+        self.assertEqual([show.original_id for show in shows], [theater.pk for theater in self.past])
+        self.assertEqual([(show.tickets_sold, len(show.seat_numbers)) for show in shows], [(2, 3), (2, 3)])
+        self.assertEqual(sum(show.revenue for show in shows), revenue)
+        self.assertEqual(ArchivedBooking.objects.count(), 4)
+        self.assertEqual(ArchivedBooking.objects.values('order_original_id').distinct().count(), 2)
+
+    def test_show_with_a_pending_refund_waits(self):
+        booking = Booking.objects.filter(theater=self.past[0]).first()
+        Refund.objects.create(booking=booking, amount=booking.amount, reason='user_cancelled')
+        self.archive()
+        self.assertEqual(set(Theater.objects.values_list('id', flat=True)), {self.past[0].pk, self.recent.pk})
+
+    def test_archived_booking_changelist_query_count_is_flat(self):
+        self.archive()
+        self.client.force_login(User.objects.create_superuser('boss', 'boss@example.com', 'pw'))
+        url = reverse('admin:movies_archivedbooking_changelist')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(original_id=1000 + n, user=User.objects.create_user(f'u{n}'), movie_name='m',
+                            show_original_id=1, theater_name='t', show_time=timezone.now(), seat_number='A1',
+                            payment_status='completed', booked_at=timezone.now())
+            for n in range(20)
+        ])
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+
+class TrailerTests(TestCase):
+    def test_video_id_from_youtube_urls(self):
+        for url in ['https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ',
+                    'https://youtu.be/dQw4w9WgXcQ?t=10', 'https://www.youtube.com/embed/dQw4w9WgXcQ',
+                    'https://www.youtube.com/shorts/dQw4w9WgXcQ', 'https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ',
+                    'youtube.com/watch?v=dQw4w9WgXcQ']:
+            self.assertEqual(youtube_video_id(url), 'dQw4w9WgXcQ', url)
+
+    def test_no_video_id_from_other_urls(self):
+        for url in [None, '', 'https://vimeo.com/12345', 'https://www.youtube.com/watch?v=short',
+                    'https://www.youtube.com/watch?v=dQw4w9WgXcQextra', 'https://notyoutube.com/watch?v=dQw4w9WgXcQ',
+                    'https://evil.example/?next=https://youtu.be/dQw4w9WgXcQ']:
+            self.assertEqual(youtube_video_id(url), '', url)
+
+    def test_id_is_stored_on_save(self):
+        movie = Movie.objects.create(name='Trailer', trailer_url='https://youtu.be/dQw4w9WgXcQ')
+        self.assertEqual(movie.get_youtube_embed_url(), 'https://www.youtube.com/embed/dQw4w9WgXcQ')
+        self.assertEqual(movie.trailer_thumbnail_url, 'https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg')
+        movie.trailer_url = 'https://vimeo.com/12345'
+        movie.save()
+        self.assertEqual((movie.trailer_video_id, movie.get_youtube_embed_url()), ('', 'https://vimeo.com/12345'))
+
+    def test_detail_page_loads_the_player_on_click(self):
+        movie = Movie.objects.create(name='Trailer', trailer_url='https://youtu.be/dQw4w9WgXcQ')
+        response = self.client.get(reverse('movie_detail', args=[movie.pk]))
+        self.assertContains(response, 'data-embed="https://www.youtube.com/embed/dQw4w9WgXcQ?autoplay=1"')
+        self.assertNotContains(response, '<iframe')
+
+
+
+class RenderingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seats_are_grouped_by_row_in_id_order(self):
+        theater, _ = make_show(seats=0)
+        Seat.objects.bulk_create([
+            Seat(theater=theater, seat_number=number, is_booked=number == 'B1')
+            for number in ['A1', 'A2', 'B1', 'A3', 'AA10', '7']
+        ])
+        rows = [(row, [(label, booked) for _, label, booked in seats]) for row, seats in _seat_rows(theater.seats.all())]
+        self.assertEqual(rows, [
+            ('A', [('1', False), ('2', False), ('3', False)]),
+            ('B', [('1', True)]),
+            ('AA', [('10', False)]),
+            ('', [('7', False)]),
+        ])
+
+    def test_catalog_fragments_refresh_after_an_edit(self):
+        movie = Movie.objects.create(name='Before Edit')
+        for url in [reverse('home'), reverse('movie_list')]:
+            self.assertContains(self.client.get(url), 'Before Edit')
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.name = 'After Edit'
+            movie.save()
+        for url in [reverse('home'), reverse('movie_list')]:
+            response = self.client.get(url)
+            self.assertContains(response, 'After Edit')
+            self.assertNotContains(response, 'Before Edit')
+
+    def test_html_is_compressed(self):
+        Movie.objects.create(name='Compressed')
+        response = self.client.get(reverse('home'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class AsyncViewParityTests(TransactionTestCase):
+    """The ASGI catalog views render the same pages as the sync ones."""
+
+    def setUp(self):
+        cache.clear()
+        self.theater, _ = make_show(time=timezone.now() + timezone.timedelta(hours=3))
+        self.movie = self.theater.movie
+        self.later, _ = make_show(movie=self.movie, name='Screen 2', time=timezone.now() + timezone.timedelta(days=2))
+
+    def render_both(self, name, path, **kwargs):
+        pages = []
+        for view in [getattr(views, name), async_to_sync(getattr(async_views, name))]:
+            request = RequestFactory().get(path)
+            request.user = AnonymousUser()
+            response = view(request, **kwargs)
+            self.assertEqual(response.status_code, 200)
+            pages.append(re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', response.content.decode()))
+        return pages
+
+    def test_pages_match(self):
+        later = timezone.localtime(self.later.time).date()
+        for name, path, kwargs in [
+            ('movie_list', '/movies/?genre=action', {}),
+            ('movie_detail', f'/movies/movie/{self.movie.id}/', {'movie_id': self.movie.id}),
+            ('theater_list', f'/movies/{self.movie.id}/theaters', {'movie_id': self.movie.id}),
+            ('theater_list', f'/movies/{self.movie.id}/theaters?date={later:%Y-%m-%d}', {'movie_id': self.movie.id}),
+        ]:
+            sync_page, async_page = self.render_both(name, path, **kwargs)
+            self.assertEqual(sync_page, async_page, path)
+        self.assertIn('Screen 2', async_page)
+
+    def test_home_matches(self):
+        from users import views as user_views
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        sync_page = user_views.home(request).content
+        self.assertEqual(async_to_sync(async_views.home)(request).content, sync_page)
+        self.assertIn(b'Test Movie', sync_page)
+
+    def test_missing_movie_is_404_in_both(self):
+        request = RequestFactory().get('/movies/movie/0/')
+        with self.assertRaises(Http404):
+            views.movie_detail(request, movie_id=0)
+        with self.assertRaises(Http404):
+            async_to_sync(async_views.movie_detail)(request, movie_id=0)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        snapshots.clear()
+        self.theater, _ = make_show()
+
+    def test_save_invalidates_cached_show(self):
+        self.assertFalse(get_show(self.theater.id).is_cancelled)
+        Theater.objects.filter(id=self.theater.id).update(is_cancelled=True)  # no signal: still cached
+        self.assertFalse(get_show(self.theater.id).is_cancelled)
+        version = current_version()
+        self.theater.is_cancelled = True
+        self.theater.save()
+        self.assertNotEqual(current_version(), version)
+        self.assertTrue(get_show(self.theater.id).is_cancelled)
+
+    def test_version_lives_in_the_database(self):
+        version = current_version()
+        snapshots.clear()
+        self.assertEqual(current_version(), version)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.theater.movie.save()
+            self.assertNotEqual(current_version(), version)
+            raise RuntimeError
+        self.assertEqual(current_version(), version)
+
+    def test_missing_version_row_is_recreated(self):
+        CatalogVersion.objects.all().delete()
+        self.assertEqual(current_version(), '')
+        self.theater.save()
+        self.assertNotEqual(current_version(), '')
+
+    def test_version_is_read_once_per_request(self):
+        user = User.objects.create_user('buyer', password='pw')
+        self.client.force_login(user)
+        self.client.get(reverse('reserve_seats', args=[self.theater.id]))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('reserve_seats', args=[self.theater.id]))
+        reads = [q['sql'] for q in queries.captured_queries if 'movies_catalogversion' in q['sql']]
+        self.assertEqual(len(reads), 1)
+
+
+class GenerateDatasetTests(TestCase):
+    OPTIONS = ['--seed', '7', '--start-date', '2030-01-05', '--movies', '4', '--venues', '2', '--days', '2',
+               '--shows-per-day', '3', '--rows', '3', '--columns', '6', '--users', '10', '--loader', 'bulk']
+
+    def generate(self, now, *extra):
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            call_command('generate_dataset', *self.OPTIONS, *extra, stdout=io.StringIO())
+        shows = Theater.objects.filter(movie__name__startswith='gen-')
+        return {
+            'movies': list(Movie.objects.filter(name__startswith='gen-').order_by('name').values_list(
+                'name', 'genre', 'language', 'rating', 'ticket_price')),
+            'shows': list(shows.order_by('time', 'name').values_list('name', 'movie__name', 'time', 'waiting_room')),
+            'bookings': list(Booking.objects.filter(theater__in=shows).order_by('payment_id', 'seat__seat_number')
+                             .values_list('payment_id', 'seat__seat_number', 'amount')),
+            'orders': list(Order.objects.filter(movie__name__startswith='gen-').order_by('payment_id').values_list(
+                'payment_id', 'user__username', 'seat_count', 'total')),
+        }
+
+    def test_same_seed_gives_same_data_at_any_time_of_day(self):
+        start = timezone.make_aware(timezone.datetime(2030, 1, 5))
+        before = self.generate(start + timezone.timedelta(hours=8))
+        self.assertTrue(SeatReservation.objects.exists())
+        after = self.generate(start + timezone.timedelta(days=1, hours=23), '--clear')
+        self.assertFalse(SeatReservation.objects.exists())  # every show has started
+        self.assertEqual(after, before)
+        self.assertTrue(before['orders'])
+        self.assertEqual(len(before['shows']), 2 * 2 * 3)
+
+
+class ConfirmSeatsTests(TestCase):
+    def setUp(self):
+        self.theater, self.seats = make_show()
+        self.user = User.objects.create_user('buyer', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+
+    def hold(self, user, seats):
+        Seat.objects.filter(pk__in=[s.pk for s in seats]).update(is_booked=True)
+        expires_at = timezone.now() + timezone.timedelta(minutes=5)
+        SeatReservation.objects.bulk_create([
+            SeatReservation(user=user, seat=seat, theater=self.theater, expires_at=expires_at) for seat in seats
+        ])
+
+    def test_books_held_seats_as_one_order(self):
+        self.hold(self.user, self.seats[:2])
+        order = payments.confirm_seats(self.user, self.theater, [s.pk for s in self.seats[:2]], 'pay_1', Decimal('150'))
+        self.assertEqual(order.seat_count, 2)
+        self.assertEqual(order.total, Decimal('300'))
+        self.assertEqual(order.items.count(), 2)
+        self.assertFalse(SeatReservation.objects.exists())
+
+    def test_seat_held_by_someone_else_is_taken(self):
+        self.hold(self.other, self.seats[:1])
+        with self.assertRaises(payments.SeatsTaken):
+            payments.confirm_seats(self.user, self.theater, [s.pk for s in self.seats[:2]], 'pay_1', Decimal('150'))
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Seat.objects.get(pk=self.seats[1].pk).is_booked)
+
+
+class ProcessEventsTests(TestCase):
+    def setUp(self):
+        self.theater, self.seats = make_show()
+        self.user = User.objects.create_user('buyer', password='pw')
+        self.seat_ids = [s.pk for s in self.seats[:2]]
+
+    def capture(self, event_id, payment_id='pay_1', amount=30000):
+        hold = make_hold_token(self.user, self.theater.pk, self.seat_ids)
+        body = json.dumps({'event': 'payment.captured', 'payload': {'payment': {'entity': {
+            'id': payment_id, 'amount': amount, 'notes': {'hold': hold},
+        }}}}).encode()
+        return payments.record_event(body, event_id)
+
+    def test_books_each_payment_once(self):
+        self.assertTrue(self.capture('evt_1'))
+        self.assertFalse(self.capture('evt_1'))  # redelivery
+        self.assertEqual(payments.process_events(), {'booked': 1})
+        self.capture('evt_2')  # a second event for the same payment
+        self.assertEqual(payments.process_events(), {'duplicate': 1})
+        self.assertEqual(Order.objects.filter(payment_id='pay_1').count(), 1)
+        self.assertEqual(Booking.objects.filter(payment_id='pay_1').count(), 2)
+        self.assertEqual(payments.process_events(), {})
+
+    def test_seats_taken_queues_one_refund(self):
+        Seat.objects.filter(pk=self.seat_ids[0]).update(is_booked=True)
+        self.capture('evt_1')
+        self.assertEqual(payments.process_events(), {'seats_taken': 1})
+        self.capture('evt_2')
+        self.assertEqual(payments.process_events(), {'duplicate': 1})
+        refund = Refund.objects.get(payment_id='pay_1')
+        self.assertEqual((refund.reason, refund.amount, refund.booking), ('seats_taken', Decimal('300'), None))
+        self.assertFalse(Order.objects.exists())
+
+    def test_short_payment_is_refunded(self):
+        self.capture('evt_1', amount=100)
+        self.assertEqual(payments.process_events(), {'amount_mismatch': 1})
+        self.assertEqual(Refund.objects.get(payment_id='pay_1').amount, Decimal('1'))
+        self.assertFalse(Seat.objects.filter(pk__in=self.seat_ids, is_booked=True).exists())
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='whsec_test')
+class PaymentWebhookTests(TestCase):
+    body = json.dumps({'event': 'payment.captured', 'payload': {'payment': {'entity': {'id': 'pay_1'}}}}).encode()
+
+    def post(self, signature):
+        return self.client.post(
+            reverse('payment_webhook'), self.body, content_type='application/json',
+            HTTP_X_RAZORPAY_SIGNATURE=signature, HTTP_X_RAZORPAY_EVENT_ID='evt_1',
+        )
+
+    def test_bad_signature_is_rejected(self):
+        self.assertEqual(self.post('').status_code, 400)
+        self.assertEqual(self.post(payments.sign(self.body, 'wrong')).status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_signed_event_is_recorded_once(self):
+        self.assertEqual(self.post(payments.sign(self.body)).status_code, 200)
+        self.assertEqual(self.post(payments.sign(self.body)).status_code, 200)
+        self.assertEqual(PaymentEvent.objects.filter(payment_id='pay_1').count(), 1)
+
+
+class OrderBackfillTests(TestCase):
+    """The 0015 data migration groups pre-Order per-seat bookings into Orders."""
+
+    def setUp(self):
+        self.theater, self.seats = make_show(seats=6)
+        self.buyer = User.objects.create_user('buyer', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+        self.start = timezone.now() - timezone.timedelta(days=3)
+
+    def booking(self, user, seat, payment_id, seconds, status='completed'):
+        booking = Booking.objects.create(
+            user=user, seat=seat, movie=self.theater.movie, theater=self.theater, amount=Decimal('150'),
+            payment_status=status, payment_id=payment_id,
+        )
+        Booking.objects.filter(pk=booking.pk).update(booked_at=self.start + timezone.timedelta(seconds=seconds))
+        return booking
+
+    def test_bookings_are_grouped_into_orders(self):
+        together = [
+            self.booking(self.buyer, self.seats[0], 'pay_1', 0),
+            self.booking(self.buyer, self.seats[1], 'pay_1', 20),
+            self.booking(self.buyer, self.seats[2], 'pay_1', 45, status='refunded'),
+        ]
+        later = self.booking(self.buyer, self.seats[3], 'pay_1', 600)
+        other = self.booking(self.other, self.seats[4], 'pay_1', 10)
+        migration = importlib.import_module('movies.migrations.0015_order')
+        migration.backfill_orders(apps, None)
+        self.assertFalse(Booking.objects.filter(order__isnull=True).exists())
+        orders = {booking.pk: booking.order_id for booking in Booking.objects.all()}
+        self.assertEqual(len({orders[b.pk] for b in together}), 1)
+        self.assertEqual(len(set(orders.values())), 3)
+        order = Order.objects.get(pk=orders[together[0].pk])
+        self.assertEqual((order.user, order.seat_count, order.total, order.created_at), (self.buyer, 2, Decimal('300'), self.start))
+        self.assertNotEqual(orders[later.pk], orders[other.pk])
+        self.assertEqual(Order.objects.get(pk=orders[other.pk]).user, self.other)
+
+        migration.backfill_orders(apps, None)  # reruns leave grouped bookings alone
+        self.assertEqual(Order.objects.count(), 3)
+
+
+class LargeChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.theater, self.seats = make_show(seats=5)
+        self.bookings = [
+            Booking.objects.create(user=User.objects.create_user(f'buyer{n}'), seat=seat, movie=self.theater.movie,
+                                   theater=self.theater, amount=Decimal('150'))
+            for n, seat in enumerate(self.seats)
+        ]
+
+    def changelist(self, query=''):
+        with mock.patch.object(admin.site._registry[Booking], 'list_per_page', 2):
+            return self.client.get(reverse('admin:movies_booking_changelist') + query)
+
+    def test_older_link_continues_from_the_last_pk(self):
+        ids = sorted((b.pk for b in self.bookings), reverse=True)
+        response = self.changelist()
+        self.assertEqual([b.pk for b in response.context['cl'].result_list], ids[:2])
+        self.assertEqual(response.context['cl'].keyset_next_url, f'?pk__lt={ids[1]}')
+        self.assertContains(response, f'href="?pk__lt={ids[1]}"')
+        older = self.changelist(f'?pk__lt={ids[1]}')
+        self.assertEqual([b.pk for b in older.context['cl'].result_list], ids[2:4])
+        last = self.changelist(f'?pk__lt={ids[3]}')
+        self.assertEqual([b.pk for b in last.context['cl'].result_list], ids[4:])
+        self.assertIsNone(last.context['cl'].keyset_next_url)
+
+    def test_theater_seat_counts_do_not_query_per_row(self):
+        url = reverse('admin:movies_theater_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for n in range(3):
+            make_show(seats=n + 1, movie=self.theater.movie, name=f'Screen {n + 2}')
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+        self.assertEqual(sorted(row.seat_total for row in response.context['cl'].result_list), [1, 2, 3, 5])
+
+
+@override_settings(SHOWTIME_PICKER_DAYS=3)
+class ShowtimeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = timezone.datetime(2030, 3, 4).date()
+        self.movie = Movie.objects.create(name='Showtimes')
+        for name, days, hour, cancelled in [
+            ('Early', 0, 9, False), ('Cancelled', 0, 16, True), ('Matinee', 0, 15, False),
+            ('Evening', 0, 18, False), ('Tomorrow', 1, 10, False), ('Late', 5, 20, False),
+        ]:
+            make_show(seats=0, movie=self.movie, name=name, time=self.at(days, hour), is_cancelled=cancelled)
+
+    def at(self, days, hour):
+        return timezone.make_aware(timezone.datetime(2030, 3, 4 + days, hour))
+
+    def names(self, shows):
+        return [show['name'] for show in shows]
+
+    def test_started_and_cancelled_shows_are_left_out(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.at(0, 12)):
+            self.assertEqual([venue for venue, _ in day_schedule(self.movie.id, self.day)], ['Evening', 'Matinee'])
+            self.assertEqual(self.names(next_shows(self.movie.id)), ['Matinee', 'Evening', 'Tomorrow', 'Late'])
+            self.assertEqual(show_dates(self.movie.id), [self.day, self.day + timezone.timedelta(days=1)])
+
+    def test_cached_shows_drop_out_once_they_start(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.at(0, 12)):
+            day_schedule(self.movie.id, self.day), next_shows(self.movie.id), show_dates(self.movie.id)
+        with mock.patch('django.utils.timezone.now', return_value=self.at(0, 19)), \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(day_schedule(self.movie.id, self.day), [])
+            self.assertEqual(self.names(next_shows(self.movie.id)), ['Tomorrow', 'Late'])
+            self.assertEqual(show_dates(self.movie.id), [self.day + timezone.timedelta(days=1)])
+        self.assertFalse([q for q in queries.captured_queries if 'movies_theater' in q['sql']])
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_page_opens_on_the_next_day_with_shows(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.at(0, 19)):
+            response = self.client.get(reverse('theater_list', args=[self.movie.id]))
+        self.assertEqual(response.context['day'], self.day + timezone.timedelta(days=1))
+        self.assertContains(response, 'Tomorrow Theater')
+        self.assertNotContains(response, 'Evening Theater')
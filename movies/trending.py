@@ -0,0 +1,83 @@
+"""Trending movies from a sliding window of bookings.
+
+Booking commits increment a per-movie counter in the current time bucket.
+Scores are exponentially decayed sums over the buckets inside the window,
+so a request only reads a handful of recent bucket rows, and the ranked list
+is cached for TRENDING_CACHE_SECONDS.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bookmyseat import metrics
+from .models import Movie, TrendingBucket
+
+CACHE_KEY = 'trending:movie_ids'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def bucket_start(at):
+    minutes = _setting('TRENDING_BUCKET_MINUTES', 60)
+    floored = (at.hour * 60 + at.minute) // minutes * minutes
+    return at.replace(hour=floored // 60, minute=floored % 60, second=0, microsecond=0)
+
+
+def record_bookings(movie_id, count, at=None):
+    """Add count bookings for movie_id to the bucket containing `at` (default: now)."""
+    if count <= 0:
+        return
+    start = bucket_start(at or timezone.now())
+    bucket = TrendingBucket.objects.filter(movie_id=movie_id, bucket_start=start)
+    if bucket.update(bookings=F('bookings') + count):
+        return
+    try:
+        with transaction.atomic():
+            TrendingBucket.objects.create(movie_id=movie_id, bucket_start=start, bookings=count)
+    except IntegrityError:
+        # Another request created the bucket first
+        bucket.update(bookings=F('bookings') + count)
+
+
+def compute_scores(now=None):
+    """Return [(movie_id, score)] best first, from buckets inside the window."""
+    now = now or timezone.now()
+    window_start = now - timezone.timedelta(hours=_setting('TRENDING_WINDOW_HOURS', 72))
+    half_life = _setting('TRENDING_HALF_LIFE_HOURS', 12)
+
+    scores = {}
+    rows = TrendingBucket.objects.filter(bucket_start__gte=window_start).values_list('movie_id', 'bucket_start', 'bookings')
+    for movie_id, start, bookings in rows:
+        age_hours = max((now - start).total_seconds() / 3600, 0)
+        scores[movie_id] = scores.get(movie_id, 0.0) + bookings * 0.5 ** (age_hours / half_life)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def refresh_trending():
+    """Recompute and cache the ranked movie ids."""
+    ids = [movie_id for movie_id, _ in compute_scores()[:_setting('TRENDING_SIZE', 8)]]
+    cache.set(CACHE_KEY, ids, _setting('TRENDING_CACHE_SECONDS', 60))
+    return ids
+
+
+def trending_movies():
+    """Movies for the "Trending now" rail, best first."""
+    ids = cache.get(CACHE_KEY)
+    metrics.cache_lookup('trending', ids is not None)
+    if ids is None:
+        ids = refresh_trending()
+    if not ids:
+        return []
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
+
+
+def prune_buckets():
+    """Delete buckets that have left the window. Returns rows deleted."""
+    window_start = timezone.now() - timezone.timedelta(hours=_setting('TRENDING_WINDOW_HOURS', 72))
+    deleted, _ = TrendingBucket.objects.filter(bucket_start__lt=window_start).delete()
+    return deleted
@@ -1,13 +1,25 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Read-only catalog pages have async variants for ASGI (see bookmyseat/asgi.py)
+if settings.ASYNC_VIEWS:
+    from . import async_views as catalog_views
+else:
+    catalog_views = views
+
 urlpatterns = [
-    path('', views.movie_list, name='movie_list'),
-    path('movie/<int:movie_id>/', views.movie_detail, name='movie_detail'),
-    path('<int:movie_id>/theaters', views.theater_list, name='theater_list'),
+    path('', catalog_views.movie_list, name='movie_list'),
+    path('movie/<int:movie_id>/', catalog_views.movie_detail, name='movie_detail'),
+    path('<int:movie_id>/theaters', catalog_views.theater_list, name='theater_list'),
     path('theater/<int:theater_id>/seats/', views.reserve_seats, name='reserve_seats'),
     path('theater/<int:theater_id>/seats/book/', views.book_seats, name='book_seats'),
+    path('theater/<int:theater_id>/waitlist/', views.join_waitlist, name='join_waitlist'),
+    path('theater/<int:theater_id>/queue/', views.waiting_room, name='waiting_room'),
+    path('theater/<int:theater_id>/queue/status/', views.waiting_room_status, name='waiting_room_status'),
     path('theater/<int:theater_id>/payment/', views.payment_page, name='payment_page'),
     path('payment/success/', views.payment_success, name='payment_success'),
     path('payment/failed/', views.payment_failed, name='payment_failed'),
+    path('payment/webhook/', views.payment_webhook, name='payment_webhook'),
+    path('booking/<int:booking_id>/cancel/', views.cancel_booking_view, name='cancel_booking'),
 ]
\ No newline at end of file
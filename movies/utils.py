@@ -1,8 +1,13 @@
 """Utility functions for movies app."""
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 
+from bookmyseat import metrics
+from .models import OutboundEmail
+
 
 def send_booking_confirmation_email(user, movie_name, theater_name, show_time, seats, amount, booking_id):
     """Send email confirmation after successful booking."""
@@ -22,7 +27,68 @@ def send_booking_confirmation_email(user, movie_name, theater_name, show_time, s
         body=text_content,
         from_email=None,  # Uses DEFAULT_FROM_EMAIL from settings
         to=[user.email] if user.email else [],
-        fail_silently=True,
     )
     email.attach_alternative(html_content, "text/html")
-    email.send(fail_silently=True)
+    sent = email.send(fail_silently=True)
+    metrics.inc('email_sends_total', result='sent' if sent else 'failed')
+
+
+def send_waitlist_offer_emails(offers):
+    """Send waitlist seat offers over a single mail connection.
+
+    Each offer is a dict with user, theater, seats, payment_url and minutes.
+    """
+    emails = []
+    for offer in offers:
+        html_content = render_to_string('emails/waitlist_offer.html', offer)
+        email = EmailMultiAlternatives(
+            subject=f'Seats available: {offer["theater"].movie.name}',
+            body=strip_tags(html_content),
+            from_email=None,
+            to=[offer['user'].email],
+        )
+        email.attach_alternative(html_content, "text/html")
+        emails.append(email)
+    sent = get_connection(fail_silently=True).send_messages(emails) or 0
+    metrics.inc('email_sends_total', sent, result='sent')
+    if len(emails) - sent:
+        metrics.inc('email_sends_total', len(emails) - sent, result='failed')
+
+
+# Emails that failed this many times stay in the table but are no longer retried
+OUTBOX_MAX_ATTEMPTS = 5
+
+
+def send_outbox(batch_size=200, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    """Render and send one batch of queued OutboundEmail rows. Returns emails sent."""
+    queued = list(
+        OutboundEmail.objects.filter(sent_at__isnull=True, attempts__lt=max_attempts)
+        .order_by('id')[:batch_size]
+    )
+    if not queued:
+        return 0
+    sent_ids, failed_ids = [], []
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    try:
+        for row in queued:
+            html_content = render_to_string(row.template, row.context)
+            email = EmailMultiAlternatives(
+                subject=row.subject, body=strip_tags(html_content), from_email=None, to=[row.to],
+                connection=connection,
+            )
+            email.attach_alternative(html_content, "text/html")
+            try:
+                email.send()
+                sent_ids.append(row.id)
+            except Exception:
+                failed_ids.append(row.id)
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.filter(id__in=sent_ids).update(sent_at=timezone.now(), attempts=F('attempts') + 1)
+    OutboundEmail.objects.filter(id__in=failed_ids).update(attempts=F('attempts') + 1)
+    metrics.inc('email_sends_total', len(sent_ids), result='sent')
+    if failed_ids:
+        metrics.inc('email_sends_total', len(failed_ids), result='failed')
+    return len(sent_ids)
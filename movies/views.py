@@ -1,75 +1,146 @@
+import re
+from collections import Counter
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.db.models import Sum, Count
+from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.conf import settings
 from django.contrib import messages
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from bookmyseat import metrics
+from bookmyseat.ratelimit import ratelimit
+from .models import ArchivedShow, Movie, Theater, Seat, Booking, Order, SeatReservation, WaitingRoomTicket, WaitlistEntry, GENRE_CHOICES, LANGUAGE_CHOICES
+from . import payments
+from .holds import RESERVATION_TIMEOUT_MINUTES, hold_max_age, make_hold_token, read_hold_token
+from .waitlist import MAX_SEATS_WANTED, release_seats
+from .cancellations import can_cancel, cancel_booking
+from .waiting_room import join_queue, queue_status
+from .trending import trending_movies
+from .snapshots import current_version, get_movie, get_show_or_404
+from .showtimes import day_schedule, next_shows, selected_day, show_dates
 
-from .models import Movie, Theater, Seat, Booking, SeatReservation, GENRE_CHOICES, LANGUAGE_CHOICES
-from .utils import send_booking_confirmation_email
 
-# Seat reservation timeout in minutes
-RESERVATION_TIMEOUT_MINUTES = 5
+def _release_expired_reservations():
+    """Release seats that have exceeded reservation timeout (waitlist first)."""
+    now = timezone.now()
+    expired = SeatReservation.objects.filter(expires_at__lt=now)
+    released = list(expired.values_list('theater_id', 'seat_id'))
+    if not released:
+        return
+    SeatReservation.objects.filter(seat_id__in=[seat_id for _, seat_id in released], expires_at__lt=now).delete()
+    metrics.inc('holds_expired_total', len(released))
+    release_seats(released)
+
+
+# "B12" -> row "B", label "12"
+SEAT_NUMBER_RE = re.compile(r'^([A-Za-z]*)(.*)$')
+
+
+def _seat_rows(seats):
+    """Seats grouped by row in one pass: [(row, [(id, label, is_booked), ...]), ...]."""
+    rows = {}
+    for seat_id, seat_number, is_booked in seats.order_by('id').values_list('id', 'seat_number', 'is_booked'):
+        row, label = SEAT_NUMBER_RE.match(seat_number).groups()
+        rows.setdefault(row, []).append((seat_id, label, is_booked))
+    return list(rows.items())
+
+
+def _render_seat_selection(request, theater, seats, **extra):
+    seat_rows = _seat_rows(seats)
+    return render(request, 'movies/seat_selection.html', {
+        'theaters': theater,
+        'seat_rows': seat_rows,
+        'seat_count': sum(len(row_seats) for _, row_seats in seat_rows),
+        'sold_out': not any(not booked for _, row_seats in seat_rows for _, _, booked in row_seats),
+        **extra,
+    })
 
 
-def _release_expired_reservations():
-    """Release seats that have exceeded reservation timeout."""
-    expired = SeatReservation.objects.filter(expires_at__lt=timezone.now())
-    for res in expired:
-        res.seat.is_booked = False
-        res.seat.save()
-    expired.delete()
+def catalog_fragment_seconds():
+    return getattr(settings, 'CATALOG_FRAGMENT_SECONDS', 60)
 
 
-def movie_list(request):
-    """Movie list with genre and language filters."""
-    _release_expired_reservations()
+def catalog_fragment_context():
+    """Timeout and vary-on version for the cached catalog fragments.
 
+    The version is passed as a callable so the template resolves it at render
+    time (on the sync thread under ASGI); a catalog edit then shows up at once
+    instead of after the fragment times out.
+    """
+    return {'fragment_seconds': catalog_fragment_seconds(), 'catalog_version': current_version}
+
+
+def filtered_movies(request):
+    """Lazy Movie queryset for the movie_list search/genre/language filters."""
     movies = Movie.objects.all()
-    search_query = request.GET.get('search')
-    genre_filter = request.GET.get('genre')
-    language_filter = request.GET.get('language')
-
-    if search_query:
-        movies = movies.filter(name__icontains=search_query)
-    if genre_filter:
-        movies = movies.filter(genre=genre_filter)
-    if language_filter:
-        movies = movies.filter(language=language_filter)
-
-    return render(request, 'movies/movie_list.html', {
-        'movies': movies,
+    if request.GET.get('search'):
+        movies = movies.filter(name__icontains=request.GET['search'])
+    if request.GET.get('genre'):
+        movies = movies.filter(genre=request.GET['genre'])
+    if request.GET.get('language'):
+        movies = movies.filter(language=request.GET['language'])
+    return movies
+
+
+def movie_list_context(request, trending):
+    return {
+        'movies': filtered_movies(request),
+        'trending_movies': trending,
         'genres': GENRE_CHOICES,
         'languages': LANGUAGE_CHOICES,
-        'selected_genre': genre_filter,
-        'selected_language': language_filter,
-    })
+        'selected_genre': request.GET.get('genre'),
+        'selected_language': request.GET.get('language'),
+        **catalog_fragment_context(),
+    }
+
+
+def movie_list(request):
+    """Movie list with genre and language filters."""
+    _release_expired_reservations()
+    return render(request, 'movies/movie_list.html', movie_list_context(request, trending_movies()))
+
+
+def _movie_or_404(movie_id):
+    movie = get_movie(movie_id)
+    if movie is None:
+        raise Http404('No Movie matches the given query.')
+    return movie
 
 
 def movie_detail(request, movie_id):
-    """Movie detail page with YouTube trailer embed."""
-    movie = get_object_or_404(Movie, id=movie_id)
-    theaters = Theater.objects.filter(movie=movie)
+    """Movie detail page; the trailer iframe loads on click (see movie_detail.html)."""
+    movie = _movie_or_404(movie_id)
     embed_url = movie.get_youtube_embed_url()
     return render(request, 'movies/movie_detail.html', {
         'movie': movie,
-        'theaters': theaters,
+        'theaters': next_shows(movie_id),
         'embed_url': embed_url,
     })
 
 
+def showtimes_context(movie, day, dates, venues):
+    return {'movie': movie, 'day': day, 'dates': dates, 'venues': venues, 'today': timezone.localdate()}
+
+
 def theater_list(request, movie_id):
-    movie = get_object_or_404(Movie, id=movie_id)
-    theaters = Theater.objects.filter(movie=movie)
-    return render(request, 'movies/theater_list.html', {'movie': movie, 'theaters': theaters})
+    """Upcoming shows of one day (?date=), grouped by venue, with a date picker."""
+    movie = _movie_or_404(movie_id)
+    dates = show_dates(movie_id)
+    day = selected_day(request, dates)
+    return render(request, 'movies/theater_list.html', showtimes_context(movie, day, dates, day_schedule(movie_id, day)))
 
 
 @login_required(login_url='/login/')
+@ratelimit('hold', key=lambda request, theater_id: f'{request.user.pk}:{theater_id}')
 def reserve_seats(request, theater_id):
     """Reserve seats temporarily (5 min). Returns to payment page."""
-    theater = get_object_or_404(Theater, id=theater_id)
+    theater = get_show_or_404(theater_id, include_cancelled=False)
     seats = Seat.objects.filter(theater=theater)
 
     _release_expired_reservations()
@@ -77,58 +148,94 @@ def reserve_seats(request, theater_id):
     if request.method == 'POST':
         selected_seats = request.POST.getlist('seats')
         if not selected_seats:
-            return render(request, 'movies/seat_selection.html', {
-                'theaters': theater,
-                'seats': seats,
-                'error': 'Please select at least one seat.',
-            })
+            return _render_seat_selection(request, theater, seats, error='Please select at least one seat.')
+
+        try:
+            seat_ids = sorted({int(s) for s in selected_seats})
+        except ValueError:
+            raise Http404('Invalid seat.')
+        if seats.filter(id__in=seat_ids).count() != len(seat_ids):
+            raise Http404('Seat not found.')
 
+        # Claim all seats atomically or none: the conditional UPDATE only flips
+        # free seats, so concurrent requests can never hold the same seat.
         expires_at = timezone.now() + timezone.timedelta(minutes=RESERVATION_TIMEOUT_MINUTES)
-        error_seats = []
-
-        for seat_id in selected_seats:
-            seat = get_object_or_404(Seat, id=seat_id, theater=theater)
-            if seat.is_booked:
-                error_seats.append(seat.seat_number)
-                continue
-            SeatReservation.objects.update_or_create(
-                seat=seat,
-                theater=theater,
-                defaults={'user': request.user, 'expires_at': expires_at}
-            )
-            seat.is_booked = True
-            seat.save()
+        with transaction.atomic():
+            claimed = seats.filter(id__in=seat_ids, is_booked=False).update(is_booked=True)
+            if claimed == len(seat_ids):
+                SeatReservation.objects.filter(seat_id__in=seat_ids).delete()
+                SeatReservation.objects.bulk_create([
+                    SeatReservation(user=request.user, seat_id=seat_id, theater=theater, expires_at=expires_at)
+                    for seat_id in seat_ids
+                ])
+                metrics.inc('holds_created_total', len(seat_ids))
+            else:
+                transaction.set_rollback(True)
+
+        if claimed != len(seat_ids):
+            error_seats = seats.filter(id__in=seat_ids, is_booked=True).values_list('seat_number', flat=True)
+            return _render_seat_selection(request, theater, seats, error=f'Seats {", ".join(error_seats)} are already booked.')
+
+        # Redirect to payment, carrying the hold as a signed token (no session write)
+        hold = make_hold_token(request.user, theater_id, seat_ids)
+        return redirect(f"{reverse('payment_page', args=[theater_id])}?hold={hold}")
+
+    return _render_seat_selection(request, theater, seats)
+
+
+@login_required(login_url='/login/')
+def join_waitlist(request, theater_id):
+    """Join the waitlist for a sold-out show."""
+    theater = get_show_or_404(theater_id)
+    if request.method != 'POST':
+        return redirect('reserve_seats', theater_id=theater_id)
+    try:
+        seats_wanted = max(1, min(int(request.POST.get('seats_wanted', 1)), MAX_SEATS_WANTED))
+    except ValueError:
+        seats_wanted = 1
+    WaitlistEntry.objects.update_or_create(
+        theater=theater, user=request.user,
+        defaults={'seats_wanted': seats_wanted, 'fulfilled_at': None},
+    )
+    messages.success(request, "You're on the waitlist. We'll email you if seats open up.")
+    return redirect('theater_list', movie_id=theater.movie_id)
 
-        if error_seats:
-            return render(request, 'movies/seat_selection.html', {
-                'theaters': theater,
-                'seats': seats,
-                'error': f'Seats {", ".join(error_seats)} are already booked.',
-            })
 
-        # Redirect to payment
-        seat_ids = request.POST.getlist('seats')
-        request.session['pending_booking'] = {
-            'theater_id': theater_id,
-            'seat_ids': [int(s) for s in seat_ids],
-            'reserved_at': timezone.now().isoformat(),
-        }
-        return redirect('payment_page', theater_id=theater_id)
+@login_required(login_url='/login/')
+def waiting_room(request, theater_id):
+    """Queue page for hot shows; polls waiting_room_status until admitted."""
+    theater = get_show_or_404(theater_id)
+    ticket = join_queue(theater, request.user)
+    status = queue_status(ticket)
+    if status['admitted']:
+        return redirect('reserve_seats', theater_id=theater_id)
+    return render(request, 'movies/waiting_room.html', {'theater': theater, 'status': status})
+
 
-    return render(request, 'movies/seat_selection.html', {'theaters': theater, 'seats': seats})
+@login_required(login_url='/login/')
+def waiting_room_status(request, theater_id):
+    """Lightweight JSON poll: queue position and ETA."""
+    ticket = WaitingRoomTicket.objects.filter(theater_id=theater_id, user=request.user).first()
+    if not ticket:
+        return JsonResponse({'error': 'Not in queue'}, status=404)
+    status = queue_status(ticket)
+    if status['admitted']:
+        status['redirect'] = reverse('reserve_seats', args=[theater_id])
+    return JsonResponse(status)
 
 
 @login_required(login_url='/login/')
 def payment_page(request, theater_id):
     """Payment page with Razorpay integration."""
-    theater = get_object_or_404(Theater, id=theater_id)
-    pending = request.session.get('pending_booking', {})
+    theater = get_show_or_404(theater_id)
+    hold = request.GET.get('hold', '')
+    pending = read_hold_token(hold, request.user, max_age=RESERVATION_TIMEOUT_MINUTES * 60)
 
-    if pending.get('theater_id') != theater_id:
+    if not pending or pending['theater_id'] != theater_id:
         messages.error(request, 'Session expired. Please select seats again.')
-        return redirect('theater_list', movie_id=theater.movie.id)
+        return redirect('theater_list', movie_id=theater.movie_id)
 
-    seat_ids = pending.get('seat_ids', [])
+    seat_ids = pending['seat_ids']
     seats = Seat.objects.filter(id__in=seat_ids, theater=theater)
 
     # Verify seats are still reserved
@@ -137,7 +244,7 @@ def payment_page(request, theater_id):
         if not res or res.expires_at < timezone.now():
             _release_expired_reservations()
             messages.error(request, 'Your reservation has expired. Please select seats again.')
-            return redirect('theater_list', movie_id=theater.movie.id)
+            return redirect('theater_list', movie_id=theater.movie_id)
 
     ticket_price = theater.movie.ticket_price
     total_amount = float(ticket_price) * len(seats)
@@ -147,79 +254,85 @@ def payment_page(request, theater_id):
         'seats': seats,
         'total_amount': total_amount,
         'razorpay_key': settings.RAZORPAY_KEY_ID,
+        'hold': hold,
     })
 
 
 @login_required(login_url='/login/')
 def payment_success(request):
-    """Handle successful payment - create booking, send email."""
+    """Browser return from checkout: book the held seats and send the confirmation.
+
+    With gateway webhooks enabled the browser is not trusted: the booking is
+    made from the verified webhook (movies.payments), here if it has already
+    arrived, otherwise by the process_payments worker shortly after.
+    """
     if request.method != 'POST':
         return redirect('profile')
 
-    theater_id = request.POST.get('theater_id')
-    seat_ids = request.POST.getlist('seat_ids')
+    # Seats come from the signed hold, not from client-editable form fields
+    pending = read_hold_token(request.POST.get('hold'), request.user, max_age=hold_max_age())
+    if not pending:
+        messages.error(request, 'Session expired. Please select seats again.')
+        return redirect('profile')
     payment_id = request.POST.get('payment_id', '')
-    amount = request.POST.get('amount', 0)
 
-    theater = get_object_or_404(Theater, id=theater_id)
-    seats = Seat.objects.filter(id__in=seat_ids, theater=theater)
-
-    # Clean up reservations and create bookings
-    ticket_price = theater.movie.ticket_price or 0
-    seat_numbers = []
-    for seat in seats:
-        SeatReservation.objects.filter(seat=seat, theater=theater).delete()
-        Booking.objects.create(
-            user=request.user,
-            seat=seat,
-            movie=theater.movie,
-            theater=theater,
-            amount=ticket_price,
-            payment_status='completed',
-            payment_id=payment_id,
-        )
-        seat.is_booked = True
-        seat.save()
-        seat_numbers.append(seat.seat_number)
-
-    # Clear session
-    if 'pending_booking' in request.session:
-        del request.session['pending_booking']
-
-    # Send email confirmation
-    if request.user.email:
-        send_booking_confirmation_email(
-            user=request.user,
-            movie_name=theater.movie.name,
-            theater_name=theater.name,
-            show_time=theater.time.strftime('%d %b %Y, %I:%M %p'),
-            seats=', '.join(seat_numbers),
-            amount=amount,
-            booking_id=payment_id or f'BMS-{timezone.now().strftime("%Y%m%d%H%M")}',
-        )
+    if payments.webhooks_enabled() and settings.RAZORPAY_KEY_ID:
+        outcome = payments.payment_outcome(payment_id)
+        if outcome in ('booked', 'duplicate'):
+            messages.success(request, 'Booking confirmed! Check your email for details.')
+        elif outcome is None:
+            messages.info(request, "Payment received. Your booking will be confirmed by email in a moment.")
+        else:
+            messages.error(request, 'We could not confirm this booking. Your payment will be refunded.')
+        return redirect('profile')
 
+    theater = get_show_or_404(pending['theater_id'])
+    try:
+        payments.confirm_seats(request.user, theater, pending['seat_ids'], payment_id, theater.movie.ticket_price or 0)
+    except payments.SeatsTaken:
+        if payment_id and settings.RAZORPAY_KEY_ID:
+            price = theater.movie.ticket_price or 0
+            payments.queue_refund(payment_id, price * len(set(pending['seat_ids'])), 'seats_taken')
+            messages.error(request, 'Some of these seats were taken after your hold expired. '
+                                    'Your payment will be refunded; please select seats again.')
+        else:
+            messages.error(request, 'Some of these seats were taken after your hold expired. Please select seats again.')
+        return redirect('theater_list', movie_id=theater.movie_id)
     messages.success(request, 'Booking confirmed! Check your email for details.')
     return redirect('profile')
 
 
+@csrf_exempt
+@require_POST
+def payment_webhook(request):
+    """Gateway webhook: verify the signature, record the event once, acknowledge."""
+    if not payments.webhooks_enabled():
+        raise Http404('Webhooks are not configured.')
+    if not payments.verify_signature(request.body, request.headers.get('X-Razorpay-Signature', '')):
+        metrics.inc('payment_webhooks_total', result='bad_signature')
+        return JsonResponse({'error': 'Invalid signature'}, status=400)
+    try:
+        created = payments.record_event(request.body, request.headers.get('X-Razorpay-Event-Id', ''))
+    except ValueError:
+        metrics.inc('payment_webhooks_total', result='bad_payload')
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+    metrics.inc('payment_webhooks_total', result='accepted' if created else 'duplicate')
+    return JsonResponse({'status': 'ok'})
+
+
 @login_required(login_url='/login/')
 def payment_failed(request):
     """Handle failed payment - release reserved seats."""
-    theater_id = request.GET.get('theater_id') or request.POST.get('theater_id')
-    if theater_id:
-        pending = request.session.get('pending_booking', {})
-        if pending.get('theater_id') == int(theater_id):
-            theater = Theater.objects.filter(id=theater_id).first()
-            if theater:
-                for seat_id in pending.get('seat_ids', []):
-                    seat = Seat.objects.filter(id=seat_id, theater=theater).first()
-                    if seat:
-                        SeatReservation.objects.filter(seat=seat, theater=theater).delete()
-                        seat.is_booked = False
-                        seat.save()
-            if 'pending_booking' in request.session:
-                del request.session['pending_booking']
+    pending = read_hold_token(request.GET.get('hold') or request.POST.get('hold'), request.user, max_age=hold_max_age())
+    if pending:
+        held = SeatReservation.objects.filter(
+            user=request.user, theater_id=pending['theater_id'], seat_id__in=pending['seat_ids'],
+        )
+        released = list(held.values_list('theater_id', 'seat_id'))
+        held.delete()
+        release_seats(released)
 
+    metrics.inc('payment_failures_total')
     messages.error(request, 'Payment failed. Your seats have been released.')
     return redirect('profile')
 
@@ -229,62 +342,49 @@ def book_seats(request, theater_id):
     """Legacy direct booking (no payment) - for backwards compatibility.
     New flow: reserve_seats -> payment -> payment_success.
     """
-    theater = get_object_or_404(Theater, id=theater_id)
+    theater = get_show_or_404(theater_id, include_cancelled=False)
     seats = Seat.objects.filter(theater=theater)
 
     if request.method == 'POST':
         selected_seats = request.POST.getlist('seats')
-        error_seats = []
-
         if not selected_seats:
-            return render(request, 'movies/seat_selection.html', {
-                'theaters': theater,
-                'seats': seats,
-                'error': 'No seat selected.',
-            })
-
-        for seat_id in selected_seats:
-            seat = get_object_or_404(Seat, id=seat_id, theater=theater)
-            if seat.is_booked:
-                error_seats.append(seat.seat_number)
-                continue
+            return _render_seat_selection(request, theater, seats, error='No seat selected.')
+        try:
+            seat_ids = {int(s) for s in selected_seats}
+        except ValueError:
+            raise Http404('Invalid seat.')
+        if seats.filter(id__in=seat_ids).count() != len(seat_ids):
+            raise Http404('Seat not found.')
+
+        error_seats = list(seats.filter(id__in=seat_ids, is_booked=True).values_list('seat_number', flat=True))
+        free_ids = seats.filter(id__in=seat_ids, is_booked=False).values_list('id', flat=True)
+        if free_ids:
             try:
-                ticket_price = theater.movie.ticket_price or 0
-                Booking.objects.create(
-                    user=request.user,
-                    seat=seat,
-                    movie=theater.movie,
-                    theater=theater,
-                    amount=ticket_price,
-                    payment_status='completed',
-                )
-                seat.is_booked = True
-                seat.save()
-
-                # Send email
-                if request.user.email:
-                    send_booking_confirmation_email(
-                        user=request.user,
-                        movie_name=theater.movie.name,
-                        theater_name=theater.name,
-                        show_time=theater.time.strftime('%d %b %Y, %I:%M %p'),
-                        seats=seat.seat_number,
-                        amount=str(ticket_price),
-                        booking_id=f'BMS-{timezone.now().strftime("%Y%m%d%H%M")}',
-                    )
-            except IntegrityError:
-                error_seats.append(seat.seat_number)
+                payments.confirm_seats(request.user, theater, list(free_ids), None, theater.movie.ticket_price or 0)
+            except payments.SeatsTaken:
+                error_seats = list(seats.filter(id__in=seat_ids).values_list('seat_number', flat=True))
 
         if error_seats:
-            return render(request, 'movies/seat_selection.html', {
-                'theaters': theater,
-                'seats': seats,
-                'error': f'Seats already booked: {", ".join(error_seats)}',
-            })
+            return _render_seat_selection(request, theater, seats, error=f'Seats already booked: {", ".join(error_seats)}')
         messages.success(request, 'Booking confirmed! Check your email.')
         return redirect('profile')
 
-    return render(request, 'movies/seat_selection.html', {'theaters': theater, 'seats': seats})
+    return _render_seat_selection(request, theater, seats)
+
+
+@login_required(login_url='/login/')
+def cancel_booking_view(request, booking_id):
+    """Let a user cancel their own booking before the cutoff; refund is queued."""
+    booking = get_object_or_404(
+        Booking.objects.select_related('theater__movie', 'seat', 'user'), id=booking_id, user=request.user,
+    )
+    if request.method != 'POST':
+        return redirect('profile')
+    if not can_cancel(booking):
+        messages.error(request, 'This booking can no longer be cancelled.')
+    elif cancel_booking(booking):
+        messages.success(request, f'Booking for seat {booking.seat.seat_number} cancelled. Your refund is on its way.')
+    return redirect('profile')
 
 
 @login_required
@@ -296,35 +396,49 @@ def admin_dashboard(request):
         return redirect('home')
     
     try:
-        total_revenue = Booking.objects.filter(payment_status='completed').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-
-        # Get popular movies by counting bookings
-        popular_movies = Booking.objects.values('movie').annotate(
-            booking_count=Count('id')
-        ).order_by('-booking_count')[:5]
-        
-        # Enhance with movie details - use only() to avoid new fields that may not exist in DB yet
-        popular_movie_ids = [item['movie'] for item in popular_movies]
-        popular_movies = Movie.objects.filter(id__in=popular_movie_ids).only('id', 'name', 'genre', 'ticket_price')
-
-        # Get busiest theaters by counting bookings
-        busiest_theaters = Booking.objects.values('theater').annotate(
-            booking_count=Count('id')
-        ).order_by('-booking_count')[:5]
-        
-        # Enhance with theater details
-        busiest_theater_ids = [item['theater'] for item in busiest_theaters]
-        busiest_theaters = Theater.objects.filter(id__in=busiest_theater_ids)
+        # Orders are one row per purchase, so these scan far fewer rows than per-seat bookings.
+        # Archived shows' Orders are gone; their sales are kept on ArchivedShow.
+        total_revenue = (
+            (Order.objects.aggregate(total=Sum('total'))['total'] or 0)
+            + (ArchivedShow.objects.aggregate(total=Sum('revenue'))['total'] or 0)
+        )
 
-        recent_bookings = Booking.objects.select_related('user', 'movie', 'theater', 'seat').order_by('-booked_at')[:10]
+        # Get popular movies by seats sold
+        movie_seats = Counter(dict(Order.objects.values_list('movie').annotate(n=Sum('seat_count')).order_by()))
+        movie_seats.update(dict(
+            ArchivedShow.objects.exclude(movie=None).values_list('movie').annotate(n=Sum('tickets_sold')).order_by()
+        ))
+        top_movies = movie_seats.most_common(5)
+        # Enhance with movie details - use only() to avoid new fields that may not exist in DB yet
+        movies = Movie.objects.only('id', 'name', 'genre', 'ticket_price').in_bulk([movie_id for movie_id, _ in top_movies])
+        popular_movies = [
+            {'name': movies[movie_id].name, 'booking_count': seats} for movie_id, seats in top_movies if movie_id in movies
+        ]
+
+        # Get busiest shows by seats sold, live and archived
+        live_shows = Order.objects.values('theater').annotate(booking_count=Sum('seat_count')).order_by('-booking_count')[:5]
+        theaters = Theater.objects.select_related('movie').in_bulk([item['theater'] for item in live_shows])
+        busiest_theaters = [
+            {'name': theaters[item['theater']].name, 'movie_name': theaters[item['theater']].movie.name,
+             'booking_count': item['booking_count']}
+            for item in live_shows if item['theater'] in theaters
+        ]
+        busiest_theaters += [
+            {'name': show.name, 'movie_name': show.movie_name, 'booking_count': show.tickets_sold}
+            for show in ArchivedShow.objects.order_by('-tickets_sold')[:5]
+        ]
+        busiest_theaters = sorted(busiest_theaters, key=lambda row: -row['booking_count'])[:5]
+
+        recent_orders = (
+            Order.objects.select_related('user', 'movie', 'theater').prefetch_related('items__seat')
+            .order_by('-created_at')[:10]
+        )
 
         return render(request, 'admin/dashboard.html', {
             'total_revenue': total_revenue,
             'popular_movies': popular_movies,
             'busiest_theaters': busiest_theaters,
-            'recent_bookings': recent_bookings,
+            'recent_orders': recent_orders,
         })
     except Exception as e:
         messages.error(request, f'Error loading dashboard: {str(e)}')
@@ -0,0 +1,130 @@
+"""Virtual waiting room (admission control) for hot shows.
+
+Buyers for a show with ``Theater.waiting_room`` set join a FIFO queue. No
+background worker is needed: whoever polls dispatches the queue. Admission
+is a token bucket of WAITING_ROOM_BURST tokens refilled at
+WAITING_ROOM_ADMIT_PER_MINUTE, kept as a sliding window over admitted_at: at
+most ``burst`` tickets are admitted in any ``burst / admit_per_minute``
+minutes, so a quiet spell never saves up more than one burst. The oldest
+waiting tickets are admitted first, whether or not their owners are still
+polling. Each admission is valid for WAITING_ROOM_ADMISSION_MINUTES, which
+bounds concurrent booking traffic for the show.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.deprecation import MiddlewareMixin
+
+from bookmyseat import metrics
+from .models import Theater, WaitingRoomTicket
+
+# URL names guarded by the waiting room (all take a theater_id kwarg)
+GUARDED_URL_NAMES = {'reserve_seats', 'book_seats', 'payment_page'}
+HOT_SHOWS_CACHE_KEY = 'waiting_room:hot_shows'
+HOT_SHOWS_CACHE_SECONDS = 30
+
+
+def admit_per_minute():
+    return getattr(settings, 'WAITING_ROOM_ADMIT_PER_MINUTE', 60)
+
+
+def burst():
+    return getattr(settings, 'WAITING_ROOM_BURST', 20)
+
+
+def admission_minutes():
+    return getattr(settings, 'WAITING_ROOM_ADMISSION_MINUTES', 10)
+
+
+def hot_show_ids():
+    """Ids of shows behind the waiting room (cached briefly; checked on every booking request)."""
+    ids = cache.get(HOT_SHOWS_CACHE_KEY)
+    metrics.cache_lookup('hot_shows', ids is not None)
+    if ids is None:
+        ids = set(Theater.objects.filter(waiting_room=True).values_list('id', flat=True))
+        cache.set(HOT_SHOWS_CACHE_KEY, ids, HOT_SHOWS_CACHE_SECONDS)
+    return ids
+
+
+def join_queue(theater, user):
+    """Get or create the user's ticket; an expired admission goes to the back of the queue."""
+    ticket, created = WaitingRoomTicket.objects.get_or_create(theater=theater, user=user)
+    if not created and ticket.admitted_at and _admission_expired(ticket):
+        ticket.delete()
+        try:
+            ticket = WaitingRoomTicket.objects.create(theater=theater, user=user)
+        except IntegrityError:
+            # A concurrent request from the same user re-queued first
+            ticket = WaitingRoomTicket.objects.get(theater=theater, user=user)
+    return ticket
+
+
+def _admission_expired(ticket):
+    return ticket.admitted_at < timezone.now() - timezone.timedelta(minutes=admission_minutes())
+
+
+def available_tokens(theater_id, now=None):
+    """Admissions the bucket allows right now: burst minus those in the last refill window."""
+    now = now or timezone.now()
+    window = timezone.timedelta(minutes=burst() / max(admit_per_minute(), 1))
+    recent = WaitingRoomTicket.objects.filter(theater_id=theater_id, admitted_at__gt=now - window).count()
+    return max(burst() - recent, 0)
+
+
+def dispatch(theater_id):
+    """Admit the oldest waiting tickets the bucket has tokens for. Returns how many were admitted."""
+    lock = f'waiting_room:dispatch:{theater_id}'
+    # One dispatcher per show at a time, so concurrent pollers can't spend the same tokens
+    if not cache.add(lock, 1, 10):
+        return 0
+    try:
+        now = timezone.now()
+        tokens = available_tokens(theater_id, now)
+        if not tokens:
+            return 0
+        waiting = WaitingRoomTicket.objects.filter(theater_id=theater_id, admitted_at__isnull=True)
+        ids = list(waiting.order_by('id').values_list('id', flat=True)[:tokens])
+        return waiting.filter(id__in=ids).update(admitted_at=now)
+    finally:
+        cache.delete(lock)
+
+
+def queue_status(ticket):
+    """Return {'admitted', 'position', 'eta_seconds'}, dispatching the queue first."""
+    if not ticket.admitted_at:
+        dispatch(ticket.theater_id)
+        ticket.admitted_at = WaitingRoomTicket.objects.filter(pk=ticket.pk).values_list('admitted_at', flat=True).first()
+    if ticket.admitted_at:
+        return {'admitted': not _admission_expired(ticket), 'position': 0, 'eta_seconds': 0}
+
+    position = WaitingRoomTicket.objects.filter(
+        theater_id=ticket.theater_id, admitted_at__isnull=True, id__lt=ticket.id,
+    ).count() + 1
+    return {
+        'admitted': False,
+        'position': position,
+        'eta_seconds': int(position * 60 / max(admit_per_minute(), 1)),
+    }
+
+
+def is_admitted(theater_id, user):
+    ticket = WaitingRoomTicket.objects.filter(theater_id=theater_id, user=user).first()
+    return bool(ticket) and queue_status(ticket)['admitted']
+
+
+class WaitingRoomMiddleware(MiddlewareMixin):
+    """Send buyers of hot shows to the waiting room until they are admitted."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if not match or match.url_name not in GUARDED_URL_NAMES:
+            return None
+        theater_id = view_kwargs.get('theater_id')
+        # Anonymous users fall through to login_required on the view itself
+        if not request.user.is_authenticated or theater_id not in hot_show_ids():
+            return None
+        if is_admitted(theater_id, request.user):
+            return None
+        return redirect('waiting_room', theater_id=theater_id)
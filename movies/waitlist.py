@@ -0,0 +1,103 @@
+"""Waitlist for sold-out shows.
+
+Whenever held seats are released (hold expiry or a failed payment) they go
+through release_seats(), which hands them to waiting users in FIFO order as
+fresh timed holds and only frees what is left. A release of any size costs a
+fixed handful of queries plus one batched email send.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from bookmyseat import metrics
+from .holds import RESERVATION_TIMEOUT_MINUTES, make_hold_token
+from .models import Seat, SeatReservation, WaitlistEntry
+from .utils import send_waitlist_offer_emails
+
+logger = logging.getLogger(__name__)
+
+MAX_SEATS_WANTED = 10
+
+
+class _AlreadyReleased(Exception):
+    """Another process handled the same release first."""
+
+
+def release_seats(released):
+    """Release (theater_id, seat_id) pairs whose holds were just deleted.
+
+    Returns (allocated, freed) seat counts.
+    """
+    if not released:
+        return 0, 0
+    free = {}
+    for theater_id, seat_id in sorted(released):
+        free.setdefault(theater_id, []).append(seat_id)
+
+    waiting = (
+        WaitlistEntry.objects.filter(theater_id__in=free, fulfilled_at__isnull=True)
+        .select_related('user', 'theater', 'theater__movie')
+        .order_by('created_at', 'id')
+    )
+    now = timezone.now()
+    expires_at = now + timezone.timedelta(minutes=RESERVATION_TIMEOUT_MINUTES)
+    offers, reservations = [], []
+    for entry in waiting:
+        seats = free.get(entry.theater_id, [])
+        # First entry that fits wins; a larger party waits for a bigger release
+        if len(seats) < entry.seats_wanted:
+            continue
+        taken, free[entry.theater_id] = seats[:entry.seats_wanted], seats[entry.seats_wanted:]
+        reservations += [
+            SeatReservation(user=entry.user, seat_id=seat_id, theater_id=entry.theater_id, expires_at=expires_at)
+            for seat_id in taken
+        ]
+        offers.append((entry, taken))
+
+    leftover = [seat_id for seat_ids in free.values() for seat_id in seat_ids]
+    try:
+        with transaction.atomic():
+            if offers:
+                # Unique (seat, theater) makes a concurrent duplicate release fail here
+                SeatReservation.objects.bulk_create(reservations)
+                entry_ids = [entry.id for entry, _ in offers]
+                if WaitlistEntry.objects.filter(id__in=entry_ids, fulfilled_at__isnull=True).update(fulfilled_at=now) != len(entry_ids):
+                    raise _AlreadyReleased()
+            if leftover:
+                # Never free a seat that was re-held or booked in the meantime
+                Seat.objects.filter(id__in=leftover, seatreservation__isnull=True).exclude(
+                    bookings__payment_status='completed',
+                ).update(is_booked=False)
+    except (IntegrityError, _AlreadyReleased):
+        logger.info('Seat release already handled by another request')
+        return 0, 0
+
+    allocated = len(reservations)
+    if allocated:
+        metrics.inc('waitlist_allocations_total', allocated)
+        _notify(offers)
+    return allocated, len(leftover)
+
+
+def _notify(offers):
+    seat_numbers = dict(
+        Seat.objects.filter(id__in=[seat_id for _, taken in offers for seat_id in taken]).values_list('id', 'seat_number')
+    )
+    site_url = getattr(settings, 'SITE_URL', '').rstrip('/')
+    messages = []
+    for entry, taken in offers:
+        if not entry.user.email:
+            continue
+        hold = make_hold_token(entry.user, entry.theater_id, taken)
+        messages.append({
+            'user': entry.user,
+            'theater': entry.theater,
+            'seats': ', '.join(seat_numbers.get(seat_id, '') for seat_id in taken),
+            'payment_url': f"{site_url}{reverse('payment_page', args=[entry.theater_id])}?hold={hold}",
+            'minutes': RESERVATION_TIMEOUT_MINUTES,
+        })
+    if messages:
+        send_waitlist_offer_emails(messages)
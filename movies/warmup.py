@@ -0,0 +1,118 @@
+"""Pre-populate caches so the first visitors after a deploy don't pay for them.
+
+Cached API pages (catalog, facets, movie detail, show listings and seat
+availability for upcoming shows) are warmed by calling their views
+in-process with the public host from SITE_URL, so the cache_page keys match
+real traffic. The views are called without the middleware stack and marked
+exempt from rate limits, so warm-up neither shows up in http_requests_total
+nor drains anyone's API bucket. Without SITE_URL the keys can't match, so
+only the function caches (trending rail, hot shows) are refreshed.
+Rendering also warms imports and the template loader of the calling process.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from bookmyseat import ratelimit
+from .models import GENRE_CHOICES, LANGUAGE_CHOICES, Movie, Theater
+from .trending import refresh_trending
+from .waiting_room import hot_show_ids
+
+logger = logging.getLogger(__name__)
+
+# Function caches: name -> callable that refreshes the cache entry
+FUNCTION_WARMERS = {
+    'trending': refresh_trending,
+    'hot_shows': hot_show_ids,
+}
+
+
+def cache_is_shared():
+    """False when every process has its own cache (warming elsewhere wouldn't help)."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def site_host():
+    """Public host from SITE_URL, or '' when it isn't configured."""
+    return urlparse(getattr(settings, 'SITE_URL', '')).netloc
+
+
+def page_targets(seat_hours=None, max_seat_shows=None):
+    """(cache name, path) for every cached page worth warming."""
+    if seat_hours is None:
+        seat_hours = getattr(settings, 'WARM_SEATS_HOURS', 24)
+    if max_seat_shows is None:
+        max_seat_shows = getattr(settings, 'WARM_MAX_SEAT_SHOWS', 200)
+
+    catalog = reverse('api_movies')
+    targets = [('pages', reverse('home')), ('pages', reverse('movie_list')),
+               ('catalog', catalog), ('facets', reverse('api_facets'))]
+    targets += [('catalog', f'{catalog}?{urlencode({"genre": value})}') for value, _ in GENRE_CHOICES]
+    targets += [('catalog', f'{catalog}?{urlencode({"language": value})}') for value, _ in LANGUAGE_CHOICES]
+    for movie_id in Movie.objects.order_by('id').values_list('id', flat=True):
+        targets.append(('movie_detail', reverse('api_movie_detail', args=[movie_id])))
+        targets.append(('shows', reverse('api_movie_shows', args=[movie_id])))
+
+    now = timezone.now()
+    upcoming = (
+        Theater.objects.filter(is_cancelled=False, time__gte=now, time__lt=now + timezone.timedelta(hours=seat_hours))
+        .order_by('time').values_list('id', flat=True)[:max_seat_shows]
+    )
+    targets += [('seats', reverse('api_show_seats', args=[theater_id])) for theater_id in upcoming]
+    return targets
+
+
+def _fetch(path):
+    request = RequestFactory(HTTP_HOST=site_host()).get(path)
+    request.user = AnonymousUser()
+    ratelimit.exempt(request)
+    try:
+        match = resolve(request.path_info)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response.status_code == 200
+    finally:
+        connections.close_all()
+
+
+def _call(func):
+    try:
+        func()
+        return True
+    finally:
+        connections.close_all()
+
+
+def warm(workers=None, **target_options):
+    """Warm everything in parallel; returns ({name: {'ok', 'failed'}}, seconds)."""
+    if workers is None:
+        workers = getattr(settings, 'WARM_CACHES_WORKERS', 8)
+    started = time.perf_counter()
+    jobs = [(name, _call, func) for name, func in FUNCTION_WARMERS.items()]
+    if site_host():
+        jobs += [(name, _fetch, path) for name, path in page_targets(**target_options)]
+    else:
+        logger.warning('SITE_URL is not set; warming function caches only')
+
+    report = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(name, executor.submit(run, arg)) for name, run, arg in jobs]
+        for name, future in futures:
+            try:
+                ok = future.result()
+            except Exception:
+                ok = False
+            entry = report.setdefault(name, {'ok': 0, 'failed': 0})
+            entry['ok' if ok else 'failed'] += 1
+    return report, time.perf_counter() - started
@@ -1,3 +1,205 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from bookmyseat import health, metrics
+from bookmyseat.async_support import db_pool_stats, db_task
+from bookmyseat.ratelimit import take
+from movies.models import Movie, ProfileCapture, Seat, SeatReservation, Theater
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        settings = override_settings(METRICS_DIR=self.dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def dead_worker(self, pid, value):
+        with open(os.path.join(self.dir, f'{pid}.json'), 'w') as f:
+            json.dump({'counters': [['test_total', [], value]], 'histograms': [
+                ['test_seconds', [], {'buckets': [1.0], 'counts': [1], 'sum': 0.5, 'count': 1}],
+            ]}, f)
+        return os.path.join(self.dir, f'{pid}.json')
+
+    def total(self):
+        counters, histograms = metrics.collect()
+        return counters.get(('test_total', ()), 0), histograms[('test_seconds', ())]['count']
+
+    def test_retired_workers_fold_into_one_file(self):
+        for pid, value in [(900001, 3), (900002, 4), (900003, 5)]:
+            metrics._retire(self.dead_worker(pid, value))
+        self.assertEqual(self.total(), (12, 3))
+        snapshots = sorted(name for name in os.listdir(self.dir) if name.endswith('.json'))
+        self.assertEqual(snapshots, sorted([metrics.RETIRED_FILE, f'{os.getpid()}.json']))
+
+    def test_values_keep_full_precision(self):
+        self.assertEqual(metrics._format_value(12345678.0), '12345678')
+        self.assertEqual(metrics._format_value(1234567.891), '1234567.891')
+
+    def test_endpoint_needs_a_token_outside_debug(self):
+        request = RequestFactory().get('/metrics')
+        with override_settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertEqual(metrics.metrics_view(request).status_code, 401)
+        with override_settings(METRICS_TOKEN='secret', DEBUG=False):
+            self.assertEqual(metrics.metrics_view(request).status_code, 401)
+            authorized = RequestFactory().get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(metrics.metrics_view(authorized).status_code, 200)
+
+
+class ReadinessTests(TestCase):
+    def setUp(self):
+        health._readiness_result.update(at=0.0, body=None)
+
+    def get(self):
+        health._readiness_result.update(at=0.0, body=None)
+        return self.client.get(reverse('readiness'))
+
+    def test_ready_reports_checks_and_pool(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertEqual(set(body['checks']), {'db_latency_ms', 'cache_latency_ms', 'expired_holds', 'email_outbox'})
+        self.assertIn('conn_max_age', body['pool'])
+
+    @override_settings(READINESS_MAX_DB_LATENCY_MS=-1)
+    def test_slow_database_is_not_ready(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['checks']['db_latency_ms']['ok'])
+
+    @override_settings(READINESS_MAX_EXPIRED_HOLDS=0)
+    def test_backlogs_do_not_gate_readiness(self):
+        movie = Movie.objects.create(name='Test Movie')
+        theater = Theater.objects.create(name='Screen 1', movie=movie, time=timezone.now())
+        seat = Seat.objects.create(theater=theater, seat_number='A1', is_booked=True)
+        SeatReservation.objects.create(
+            user=User.objects.create_user('buyer', password='pw'), seat=seat, theater=theater,
+            expires_at=timezone.now() - timezone.timedelta(minutes=1),
+        )
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        check = response.json()['checks']['expired_holds']
+        self.assertEqual((check['value'], check['ok'], check['informational']), (1, False, True))
+
+    def test_result_is_cached_between_probes(self):
+        first = self.get().json()
+        with override_settings(READINESS_MAX_DB_LATENCY_MS=-1):
+            self.assertEqual(self.client.get(reverse('readiness')).json(), first)
+
+    def test_pool_stats_count_running_db_tasks(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=async_to_sync(db_task(blocking)))
+        worker.start()
+        started.wait(5)
+        self.assertEqual(self.get().json()['pool']['async_tasks_running'], 1)
+        release.set()
+        worker.join(5)
+        self.assertEqual(db_pool_stats()['tasks_running'], 0)
+        self.assertEqual(db_pool_stats()['tasks_queued'], 0)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+
+    def profile(self, request_id):
+        return self.client.get(reverse('home'), HTTP_X_PROFILE='1', HTTP_X_REQUEST_ID=request_id)
+
+    def profile_files(self):
+        path = os.path.join(self.media, 'profiles')
+        return os.listdir(path) if os.path.isdir(path) else []
+
+    def test_repeated_request_id_gets_a_fresh_one(self):
+        self.assertEqual(self.profile('retry-1')['X-Profile-Id'], 'retry-1')
+        second = self.profile('retry-1')['X-Profile-Id']
+        self.assertNotEqual(second, 'retry-1')
+        self.assertEqual(set(ProfileCapture.objects.values_list('request_id', flat=True)), {'retry-1', second})
+        self.assertEqual(len(self.profile_files()), 2)
+
+    def test_unsafe_request_id_is_replaced(self):
+        self.assertNotEqual(self.profile('../../etc/passwd')['X-Profile-Id'], '../../etc/passwd')
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+    def test_failed_insert_removes_the_profile_file(self):
+        with mock.patch.object(ProfileCapture.objects, 'create', side_effect=RuntimeError('db down')), \
+                self.assertLogs('bookmyseat.profiling', 'ERROR'):
+            response = self.profile('broken-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profile_files(), [])
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_requests_from_non_staff_are_not_profiled(self):
+        self.client.force_login(User.objects.create_user('guest', password='pw'))
+        self.assertNotIn('X-Profile-Id', self.profile('guest-1'))
+        self.assertFalse(ProfileCapture.objects.exists())
+
+
+class TakeTests(TestCase):
+    def setUp(self):
+        self.bucket = f'test:{uuid.uuid4().hex}'
+        self.now = 1_000_000.0
+
+    def test_allows_a_burst_then_limits(self):
+        # One token per second, three at once
+        self.assertEqual([take(self.bucket, 60, 3, now=self.now) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(take(self.bucket, 60, 3, now=self.now), 1)
+
+    def test_refills_at_the_rate(self):
+        for _ in range(3):
+            take(self.bucket, 60, 3, now=self.now)
+        self.assertEqual(take(self.bucket, 60, 3, now=self.now + 1), 0)
+        self.assertEqual(take(self.bucket, 60, 3, now=self.now + 1), 1)
+
+    def test_quiet_spell_saves_no_more_than_a_burst(self):
+        later = self.now + 3600
+        self.assertEqual([take(self.bucket, 60, 3, now=later) for _ in range(4)], [0, 0, 0, 1])
+
+    def test_retry_after_rounds_up_to_the_next_slot(self):
+        for _ in range(2):
+            take(self.bucket, 6, 2, now=self.now)
+        self.assertEqual(take(self.bucket, 6, 2, now=self.now), 10)
+
+
+# One token a minute, so slow password hashing can't refill the bucket mid-test
+@override_settings(RATE_LIMITS={'auth': (1, 2)})
+class LoginRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_login_attempts_are_limited_per_ip(self):
+        codes = [self.client.post(reverse('login'), {'username': 'x', 'password': 'y'}).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+        response = self.client.post(reverse('login'), {'username': 'x', 'password': 'y'})
+        self.assertTrue(response.has_header('Retry-After'))
+        # Other clients have their own bucket
+        other = self.client.post(reverse('login'), {'username': 'x', 'password': 'y'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, 200)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_limits_can_be_turned_off(self):
+        codes = {self.client.post(reverse('login'), {'username': 'x', 'password': 'y'}).status_code for _ in range(4)}
+        self.assertEqual(codes, {200})
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from .views import register, login_view, profile, reset_password, home
 from django.contrib.auth import views as auth_views
 
+if settings.ASYNC_VIEWS:
+    from movies.async_views import home
+
 class CustomLogoutView(auth_views.LogoutView):
     def get(self, request, *args, **kwargs):
         return self.post(request, *args, **kwargs)
@@ -3,24 +3,22 @@ from .forms import UserRegisterForm, UserUpdateForm
 from django.shortcuts import render,redirect
 from django.contrib.auth import login,authenticate
 from django.contrib.auth.decorators import login_required
-from movies.models import Movie , Booking
+from django.db.models import Prefetch
+from bookmyseat.ratelimit import client_ip, ratelimit
+from movies.models import Movie , Booking, Order, ArchivedBooking
+from movies.trending import trending_movies
+from movies.cancellations import can_cancel
+from movies.views import catalog_fragment_context
+
+PAST_BOOKINGS_SHOWN = 20
 
 def home(request):
+    # Poster URL/srcset come from Movie.display_image_url / poster_srcset.
+    # The queryset is lazy: it only runs when the cached catalog fragment is cold.
     movies = Movie.objects.all()
-    # Add image URL - prefer external_image_url, fall back to image field, then placeholder
-    for movie in movies:
-        movie.display_image_url = "https://via.placeholder.com/300x300?text=No+Image"
-        try:
-            # Try to get external image URL first
-            if movie.external_image_url:
-                movie.display_image_url = movie.external_image_url
-            # Then try image field - check name attribute to see if file actually exists
-            elif hasattr(movie, 'image') and hasattr(movie.image, 'name') and movie.image.name:
-                movie.display_image_url = movie.image.url
-        except Exception as e:
-            # If any error occurs, just use the placeholder already set above
-            pass
-    return render(request,'home.html',{'movies':movies})
+    return render(request,'home.html',{'movies':movies,'trending_movies':trending_movies(),
+                                       **catalog_fragment_context()})
+@ratelimit('auth', key=client_ip)
 def register(request):
     if request.method == 'POST':
         form=UserRegisterForm(request.POST)
@@ -35,6 +33,7 @@ def register(request):
         form=UserRegisterForm()
     return render(request,'users/register.html',{'form':form})
 
+@ratelimit('auth', key=client_ip)
 def login_view(request):
     if request.method == 'POST':
         form=AuthenticationForm(request,data=request.POST)
@@ -48,7 +47,15 @@ def login_view(request):
 
 @login_required
 def profile(request):
-    bookings= Booking.objects.filter(user=request.user)
+    # One row per purchase; seats are the order's line items
+    orders = (
+        Order.objects.filter(user=request.user).select_related('movie', 'theater').order_by('-created_at')
+        .prefetch_related(Prefetch('items', queryset=Booking.objects.select_related('seat').order_by('id')))
+    )
+    for order in orders:
+        for booking in order.items.all():
+            booking.theater = order.theater
+            booking.cancellable = can_cancel(booking)
     if request.method == 'POST':
         u_form = UserUpdateForm(request.POST, instance=request.user)
         if u_form.is_valid():
@@ -57,9 +64,12 @@ def profile(request):
     else:
         u_form = UserUpdateForm(instance=request.user)
 
-    return render(request, 'users/profile.html', {'u_form': u_form,'bookings':bookings})
+    # Bookings for shows moved out by archive_past_shows
+    past_bookings = ArchivedBooking.objects.filter(user=request.user).order_by('-show_time')[:PAST_BOOKINGS_SHOWN]
+    return render(request, 'users/profile.html', {'u_form': u_form, 'orders': orders, 'past_bookings': past_bookings})
 
 @login_required
+@ratelimit('auth', key=client_ip)
 def reset_password(request):
     if request.method == 'POST':
         form=PasswordChangeForm(user=request.user,data=request.POST)